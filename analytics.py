@@ -0,0 +1,318 @@
+"""Інкрементні зведення продажів для аналітики адміністратора
+
+Запити аналітики читають не bookings/booked_seats, а невеликі таблиці
+зведень (міграція 12):
+- sales_daily - бронювання, квитки й виручка за днем сеансу, фільмом і залом;
+- sales_hourly - те саме за днем і годиною оформлення (UTC), для кривих
+  пікових годин;
+- seat_sales - скільки разів продано кожне місце залу (теплова карта).
+
+run_rollup() додає до зведень бронювання з id, більшим за межу
+app_meta.analytics_booking_id, пачками по Config.ANALYTICS_ROLLUP_BATCH
+(кожна пачка разом із новою межею - одна транзакція). Бронювання, скасовані
+після того, як потрапили в зведення, тригер записує в rollup_cancellations,
+і наступне оновлення віднімає їхній внесок. Оновлення запускає фоновий
+потік кожні Config.ANALYTICS_ROLLUP_INTERVAL секунд або flask rollup-analytics.
+"""
+import logging
+
+try:
+    import numpy as np
+except ImportError:  # NumPy необов'язковий: теплова карта рахується і без нього
+    np = None
+
+from config import Config
+from database import PeriodicWorker, begin_immediate, ensure_database, get_db_connection, get_meta, set_meta
+
+logger = logging.getLogger(__name__)
+
+HIGH_WATER_MARK = 'analytics_booking_id'
+GROUPS = ('film', 'day', 'hall')
+
+# Внесок бронювань, що задовольняють {bookings}, у кожне зведення; :sign -
+# 1 для нових бронювань і -1 для скасованих
+_ROLLUPS = (
+    """
+    INSERT INTO sales_daily (day, film_id, hall_id, bookings, tickets, revenue)
+    SELECT s.session_date, s.film_id, s.hall_id,
+           :sign * COUNT(DISTINCT b.id), :sign * COUNT(*), :sign * SUM(s.price)
+    FROM bookings b
+    JOIN sessions s ON s.id = b.session_id
+    JOIN booked_seats bs ON bs.booking_id = b.id
+    WHERE {bookings}
+    GROUP BY s.session_date, s.film_id, s.hall_id
+    ON CONFLICT (day, film_id, hall_id) DO UPDATE
+    SET bookings = bookings + excluded.bookings, tickets = tickets + excluded.tickets,
+        revenue = revenue + excluded.revenue
+    """,
+    """
+    INSERT INTO sales_hourly (day, hour, bookings, tickets, revenue)
+    SELECT date(b.created_at), CAST(strftime('%H', b.created_at) AS INTEGER),
+           :sign * COUNT(DISTINCT b.id), :sign * COUNT(*), :sign * SUM(s.price)
+    FROM bookings b
+    JOIN sessions s ON s.id = b.session_id
+    JOIN booked_seats bs ON bs.booking_id = b.id
+    WHERE {bookings}
+    GROUP BY 1, 2
+    ON CONFLICT (day, hour) DO UPDATE
+    SET bookings = bookings + excluded.bookings, tickets = tickets + excluded.tickets,
+        revenue = revenue + excluded.revenue
+    """,
+    """
+    INSERT INTO seat_sales (hall_id, row_number, seat_number, tickets)
+    SELECT st.hall_id, st.row_number, st.seat_number, :sign * COUNT(*)
+    FROM bookings b
+    JOIN booked_seats bs ON bs.booking_id = b.id
+    JOIN seats st ON st.id = bs.seat_id
+    WHERE {bookings}
+    GROUP BY st.hall_id, st.row_number, st.seat_number
+    ON CONFLICT (hall_id, row_number, seat_number) DO UPDATE
+    SET tickets = tickets + excluded.tickets
+    """,
+)
+
+# Продані - усі бронювання, крім скасованих ('active' і 'completed')
+_NEW_BOOKINGS = "b.id > :first AND b.id <= :last AND b.status != 'cancelled'"
+_CANCELLED_BOOKINGS = "b.id IN (SELECT booking_id FROM rollup_cancellations)"
+
+def _apply(cursor, bookings, **params):
+    for sql in _ROLLUPS:
+        cursor.execute(sql.format(bookings=bookings), params)
+
+def run_rollup(batch_size=None):
+    """Додати до зведень нові бронювання і відняти скасовані
+
+    Повертає {'bookings', 'cancellations', 'high_water_mark'}: скільки
+    бронювань і скасувань враховано і нову межу.
+    """
+    ensure_database()
+    batch_size = batch_size or Config.ANALYTICS_ROLLUP_BATCH
+    result = {'bookings': 0, 'cancellations': 0}
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.row_factory = None
+
+        begin_immediate(conn)
+        cancellations = cursor.execute("SELECT COUNT(*) FROM rollup_cancellations").fetchone()[0]
+        if cancellations:
+            _apply(cursor, _CANCELLED_BOOKINGS, sign=-1)
+            cursor.execute("DELETE FROM rollup_cancellations")
+        conn.commit()
+        result['cancellations'] = cancellations
+
+        while True:
+            begin_immediate(conn)
+            first = int(get_meta(conn, HIGH_WATER_MARK, 0))
+            last, count = cursor.execute("""
+                SELECT MAX(id), COUNT(*) FROM (
+                    SELECT id FROM bookings WHERE id > ? ORDER BY id LIMIT ?
+                )
+            """, (first, batch_size)).fetchone()
+            if not count:
+                conn.rollback()
+                result['high_water_mark'] = first
+                return result
+            _apply(cursor, _NEW_BOOKINGS, sign=1, first=first, last=last)
+            set_meta(conn, HIGH_WATER_MARK, last)
+            conn.commit()
+            result['bookings'] += count
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+def rebuild_rollups(batch_size=None):
+    """Очистити зведення і порахувати їх заново з усіх бронювань"""
+    ensure_database()
+    conn = get_db_connection()
+    try:
+        begin_immediate(conn)
+        for table in ('sales_daily', 'sales_hourly', 'seat_sales', 'rollup_cancellations'):
+            conn.execute(f"DELETE FROM {table}")
+        set_meta(conn, HIGH_WATER_MARK, 0)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    return run_rollup(batch_size)
+
+def get_rollup_status():
+    """Межа врахованих бронювань, скільки нових і скасованих ще не враховано"""
+    ensure_database()
+    conn = get_db_connection()
+    try:
+        high_water_mark = int(get_meta(conn, HIGH_WATER_MARK, 0))
+        pending = conn.execute("SELECT COUNT(*) FROM bookings WHERE id > ?", (high_water_mark,)).fetchone()[0]
+        cancellations = conn.execute("SELECT COUNT(*) FROM rollup_cancellations").fetchone()[0]
+        return {
+            'high_water_mark': high_water_mark,
+            'pending_bookings': pending,
+            'pending_cancellations': cancellations,
+        }
+    finally:
+        conn.close()
+
+def _filters(date_from=None, date_to=None, film_id=None, hall_id=None, column='day'):
+    conditions = []
+    params = []
+    if date_from:
+        conditions.append(f"{column} >= ?")
+        params.append(date_from)
+    if date_to:
+        conditions.append(f"{column} <= ?")
+        params.append(date_to)
+    if film_id is not None:
+        conditions.append("d.film_id = ?")
+        params.append(film_id)
+    if hall_id is not None:
+        conditions.append("d.hall_id = ?")
+        params.append(hall_id)
+    return (f"WHERE {' AND '.join(conditions)}" if conditions else ''), params
+
+def get_revenue(group_by='film', date_from=None, date_to=None, film_id=None, hall_id=None):
+    """Бронювання, квитки й виручка з sales_daily, згруповані за фільмом, днем сеансу або залом"""
+    if group_by not in GROUPS:
+        raise ValueError(f"Невідоме групування: {group_by}")
+    ensure_database()
+    key, columns, join = {
+        'film': ("d.film_id", "d.film_id, f.title AS film_title", "JOIN films f ON f.id = d.film_id"),
+        'day': ("d.day", "d.day", ""),
+        'hall': ("d.hall_id", "d.hall_id, h.name AS hall_name", "JOIN halls h ON h.id = d.hall_id"),
+    }[group_by]
+    where, params = _filters(date_from, date_to, film_id, hall_id, column='d.day')
+    order = 'd.day' if group_by == 'day' else 'revenue DESC'
+    conn = get_db_connection()
+    try:
+        cursor = conn.execute(f"""
+            SELECT {columns}, SUM(d.bookings) AS bookings, SUM(d.tickets) AS tickets,
+                   ROUND(SUM(d.revenue), 2) AS revenue
+            FROM sales_daily d {join}
+            {where}
+            GROUP BY {key}
+            ORDER BY {order}
+        """, params)
+        return [dict(row) for row in cursor.fetchall()]
+    finally:
+        conn.close()
+
+def get_peak_hours(date_from=None, date_to=None):
+    """Продажі за годиною доби (UTC) за період: 24 записи, години без продажів - нулі"""
+    ensure_database()
+    where, params = _filters(date_from, date_to)
+    conn = get_db_connection()
+    try:
+        cursor = conn.execute(f"""
+            SELECT hour, SUM(bookings), SUM(tickets), ROUND(SUM(revenue), 2)
+            FROM sales_hourly {where}
+            GROUP BY hour
+        """, params)
+        hours = {row[0]: row for row in cursor.fetchall()}
+    finally:
+        conn.close()
+    return [
+        {
+            'hour': hour,
+            'bookings': hours[hour][1] if hour in hours else 0,
+            'tickets': hours[hour][2] if hour in hours else 0,
+            'revenue': hours[hour][3] if hour in hours else 0,
+        }
+        for hour in range(24)
+    ]
+
+def _heat_grid(seats, sales, rows, columns):
+    """Матриця продажів rows x columns: None там, де місця немає"""
+    grid = [[None] * columns for _ in range(rows)]
+    for row_number, seat_number in seats:
+        grid[row_number - 1][seat_number - 1] = 0
+    for row_number, seat_number, tickets in sales:
+        if grid[row_number - 1][seat_number - 1] is not None:
+            grid[row_number - 1][seat_number - 1] += tickets
+    peak = max((value for line in grid for value in line if value), default=0)
+    heat = [[None if value is None else (round(value / peak, 4) if peak else 0.0) for value in line]
+            for line in grid]
+    return grid, heat, peak
+
+def _heat_grid_numpy(seats, sales, rows, columns):
+    """Те саме, що _heat_grid, векторно: місця і продажі розкладаються в матрицю за індексами"""
+    grid = np.full((rows, columns), np.nan)
+    if seats:
+        positions = np.asarray(seats, dtype=np.int64) - 1
+        grid[positions[:, 0], positions[:, 1]] = 0
+    if sales:
+        sold = np.asarray(sales, dtype=np.int64)
+        np.add.at(grid, (sold[:, 0] - 1, sold[:, 1] - 1), sold[:, 2])
+    peak = int(np.nanmax(grid)) if seats else 0
+    heat = np.round(grid / peak, 4) if peak else np.where(np.isnan(grid), np.nan, 0.0)
+    missing = np.isnan(grid)
+
+    def to_lists(matrix, cast):
+        return [[None if gap else cast(value) for value, gap in zip(line, gaps)]
+                for line, gaps in zip(matrix.tolist(), missing.tolist())]
+
+    return to_lists(grid, int), to_lists(heat, float), peak
+
+def get_seat_heatmap(hall_id, use_numpy=None):
+    """Теплова карта залу: продажі кожного місця і частка від найпопулярнішого
+
+    Повертає None, якщо в залі немає місць. grid[ряд-1][місце-1] - кількість
+    проданих квитків, heat - те саме, поділене на максимум (0..1).
+    """
+    ensure_database()
+    use_numpy = Config.ANALYTICS_USE_NUMPY if use_numpy is None else use_numpy
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        seats = cursor.execute("SELECT row_number, seat_number FROM seats WHERE hall_id = ?",
+                               (hall_id,)).fetchall()
+        sales = cursor.execute("SELECT row_number, seat_number, tickets FROM seat_sales WHERE hall_id = ?",
+                               (hall_id,)).fetchall()
+    finally:
+        conn.close()
+    if not seats:
+        return None
+    rows = max(row_number for row_number, _ in seats)
+    columns = max(seat_number for _, seat_number in seats)
+    # Місця, яких уже немає в схемі залу, на карту не потрапляють
+    sales = [sale for sale in sales if sale[0] <= rows and sale[1] <= columns]
+    build = _heat_grid_numpy if use_numpy and np is not None else _heat_grid
+    grid, heat, peak = build(seats, sales, rows, columns)
+    return {
+        'hall_id': hall_id,
+        'rows': rows,
+        'seats_per_row': columns,
+        'max_tickets': peak,
+        'grid': grid,
+        'heat': heat,
+        'engine': 'numpy' if build is _heat_grid_numpy else 'python',
+    }
+
+class AnalyticsRollupWorker(PeriodicWorker):
+    """Фоновий потік, що додає нові бронювання до зведень аналітики"""
+
+    def __init__(self, interval):
+        super().__init__('analytics-rollup', interval)
+
+    def run_once(self):
+        result = run_rollup()
+        if result['bookings'] or result['cancellations']:
+            logger.info(f"Зведення аналітики: +{result['bookings']} бронювань, "
+                        f"-{result['cancellations']} скасованих")
+        return result
+
+_rollup_worker = None
+
+def start_analytics_rollup():
+    """Запустити фонове оновлення зведень, якщо інтервал > 0"""
+    global _rollup_worker
+    if Config.ANALYTICS_ROLLUP_INTERVAL <= 0:
+        return None
+    if _rollup_worker is not None and _rollup_worker.is_alive():
+        return _rollup_worker
+    _rollup_worker = AnalyticsRollupWorker(Config.ANALYTICS_ROLLUP_INTERVAL)
+    _rollup_worker.start()
+    return _rollup_worker
@@ -1,26 +1,63 @@
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for
+from flask import Flask, render_template, request, jsonify, session, redirect, url_for, make_response
+import base64
+import click
+import functools
+import hashlib
+import json
+import queue
 import re
 import logging
 import os
+import secrets
+import threading
+import time
+import analytics
+import cache
+import exports
+import scheduling
+import synthetic_data
+import waiting_room
+from events import seat_events
+from datetime import datetime, timedelta, timezone
+from config import Config
 from werkzeug.security import generate_password_hash, check_password_hash
 from database import (
     get_films_with_sessions, 
     get_film_by_id, 
+    search_films,
     get_session_by_id, 
-    get_available_seats, 
+    get_seat_map,
+    get_hall_layout,
+    hold_seats,
+    release_seats,
+    start_seat_hold_sweeper,
     create_booking,
+    get_idempotent_result,
+    IdempotencyKeyReused,
+    seat_map_namespace,
     get_booking_by_code,
     cancel_booking,
     init_database,
-    get_unique_sessions_for_film,
+    seed_database,
+    get_db_connection,
+    close_db_connection,
+    start_wal_checkpointer,
+    get_pool_stats,
+    check_query_plans,
+    rebuild_session_occupancy,
     create_user,
     get_user_by_email,
     get_user_by_id,
     update_user_profile,
+    get_profile_dashboard,
     get_user_bookings,
     add_notification,
     get_user_notifications,
-    mark_notification_read
+    get_unread_count,
+    notify_users,
+    broadcast_notification,
+    mark_notification_read,
+    mark_notifications_read
 )
 
 # Налаштування логування
@@ -31,8 +68,210 @@ app = Flask(__name__)
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'cinema-secret-key-2024')
 app.config['DEBUG'] = os.environ.get('DEBUG', False)
 
-# Ініціалізація бази даних при запуску
-init_database()
+_services_lock = threading.Lock()
+_services_started = False
+
+def start_app_services(start_workers=None):
+    """Підготувати базу і запустити фонові потоки процесу (один раз)
+
+    init_database() ідемпотентна: на готовій базі це лише перевірка версій.
+    Фонові потоки (checkpoint WAL, прибирання утримань, зведення аналітики)
+    запускаються, лише якщо start_workers (за замовчуванням -
+    Config.START_BACKGROUND_WORKERS). Викликається з python app.py або
+    перед першим запитом процесу, тобто вже у воркері після fork, а не при
+    імпорті модуля (CLI-команди й тести потоків не запускають).
+    """
+    global _services_started
+    with _services_lock:
+        if _services_started:
+            return
+        init_database()
+        if Config.START_BACKGROUND_WORKERS if start_workers is None else start_workers:
+            start_wal_checkpointer()
+            start_seat_hold_sweeper()
+            analytics.start_analytics_rollup()
+        _services_started = True
+
+@app.before_request
+def ensure_app_services():
+    if not _services_started:
+        start_app_services()
+
+# Повертаємо з'єднання запиту в пул
+app.teardown_appcontext(close_db_connection)
+
+# Кеш відрендерених сторінок (HTML/JSON) для анонімних відвідувачів
+page_cache = cache.create_backend()
+
+def catalog_version(**kwargs):
+    """Версія даних афіші: (версія, час зміни)"""
+    version, changed_at = cache.get_version_info('catalog')
+    return (version, cache.utc_today()), changed_at
+
+def listing_version(**kwargs):
+    """Версія афіші з лічильниками вільних місць: версія каталогу і інтервал OCCUPANCY_CACHE_TTL"""
+    (version, today), changed_at = catalog_version()
+    ttl = Config.OCCUPANCY_CACHE_TTL
+    bucket = int(time.time() // ttl)
+    return (version, today, bucket), max(changed_at, bucket * ttl)
+
+def seat_map_version(session_id, **kwargs):
+    """Версія схеми місць сеансу: змінюється при бронюванні/скасуванні/утриманні"""
+    return cache.get_version_info(seat_map_namespace(session_id))
+
+def cached_page(version_func, ttl=None, anonymous_only=True):
+    """Кешувати відповідь за (маршрут, аргументи, версія даних) з ETag/304
+
+    Умовний GET з актуальним ETag отримує 304 з пам'яті: з бази читається
+    лише версія (спільна для всіх воркерів, тож зміна з іншого процесу чи
+    CLI-команди одразу дає нову сторінку й новий ETag).
+    Сторінки з навігацією для авторизованого користувача не кешуються.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(**kwargs):
+            if anonymous_only and 'user_id' in session:
+                return view(**kwargs)
+            
+            version, changed_at = version_func(**kwargs)
+            key = ('page', request.endpoint, tuple(sorted(kwargs.items())),
+                   request.query_string, version)
+            entry = page_cache.get(key)
+            if entry is cache.MISSING:
+                cache.count_access('pages', 'misses')
+                response = make_response(view(**kwargs))
+                if response.status_code != 200:
+                    return response
+                body = response.get_data()
+                entry = {
+                    'body': body,
+                    'mimetype': response.mimetype,
+                    'etag': hashlib.sha256(body).hexdigest(),
+                    'last_modified': datetime.fromtimestamp(int(changed_at), tz=timezone.utc),
+                }
+                page_cache.set(key, entry, ttl or Config.PAGE_CACHE_TTL)
+            else:
+                cache.count_access('pages', 'hits')
+            
+            response = app.response_class(entry['body'], mimetype=entry['mimetype'])
+            response.set_etag(entry['etag'])
+            response.last_modified = entry['last_modified']
+            # Браузер зберігає сторінку, але перевіряє її актуальність при кожному відкритті
+            response.cache_control.no_cache = True
+            response.make_conditional(request)
+            if response.status_code == 304:
+                cache.count_access('pages', 'not_modified')
+            return response
+        return wrapper
+    return decorator
+
+def queue_ticket():
+    """Ідентифікатор покупця в черзі (у підписаній cookie сесії, без БД)"""
+    ticket = session.get('queue_ticket')
+    if not ticket:
+        ticket = session['queue_ticket'] = secrets.token_urlsafe(12)
+    return ticket
+
+def queue_response(admission, session_id):
+    """429 з Retry-After для тих, хто не пройшов у сеанс"""
+    if request.path.startswith('/api/'):
+        message = ('Забагато покупців, спробуйте пізніше' if admission.status == waiting_room.REJECTED
+                   else 'Ви в черзі на цей сеанс')
+        response = jsonify({'success': False, 'message': message, **admission.to_dict()})
+    else:
+        response = make_response(render_template('waiting_room.html', session_id=session_id,
+                                                 admission=admission))
+    response.status_code = 429
+    response.headers['Retry-After'] = str(admission.retry_after)
+    return response
+
+def admin_required(view):
+    """Лише для адміністраторів: 401 без входу, 403 для звичайного користувача"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if 'user_id' not in session:
+            return jsonify({'success': False, 'message': 'Необхідно увійти в систему'}), 401
+        user = get_user_by_id(session['user_id'])
+        if not user or not user['is_admin']:
+            return jsonify({'success': False, 'message': 'Доступно лише адміністраторам'}), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+def admission_control(release_on_success=False):
+    """Пропускати до сеансу не більше WAITING_ROOM_CONCURRENCY покупців одночасно
+
+    Решта отримують 429 з позицією в черзі, не звертаючись до БД. Сеанс
+    береться з аргументу маршруту або з поля session_id JSON-запиту.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(**kwargs):
+            session_id = kwargs.get('session_id')
+            if session_id is None:
+                session_id = (request.get_json(silent=True) or {}).get('session_id')
+            try:
+                session_id = int(session_id)
+            except (TypeError, ValueError):
+                return view(**kwargs)  # некоректний запит відхилить сам обробник
+            
+            ticket = queue_ticket()
+            admission = waiting_room.get_backend().admit(session_id, ticket)
+            if not admission.admitted:
+                return queue_response(admission, session_id)
+            
+            response = make_response(view(**kwargs))
+            if release_on_success and response.status_code == 200:
+                waiting_room.get_backend().release(session_id, ticket)
+            return response
+        return wrapper
+    return decorator
+
+def idempotency_key():
+    """Заголовок Idempotency-Key; ValueError, якщо він порожній або задовгий"""
+    key = request.headers.get('Idempotency-Key')
+    if key is None:
+        return None
+    key = key.strip()
+    if not key or len(key) > 255:
+        raise ValueError('Некоректний заголовок Idempotency-Key')
+    return key
+
+def request_fingerprint(data):
+    """Відбиток тіла запиту: той самий ключ з іншими даними - помилка клієнта"""
+    canonical = json.dumps(data, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+def booking_created_response(booking_code, replayed=False):
+    response = jsonify({
+        'success': True,
+        'booking_code': booking_code,
+        'message': 'Бронювання успішне!'
+    })
+    if replayed:
+        response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+def replay_idempotent_booking(view):
+    """Повтор уже виконаного бронювання з тим самим Idempotency-Key
+
+    Збережений результат віддається до admission_control (тому декоратор
+    стоїть над ним): клієнт, що повторює вже зафіксований запит, не займає
+    місця в черзі сеансу і не отримує 429 замість свого коду бронювання.
+    """
+    @functools.wraps(view)
+    def wrapper(**kwargs):
+        data = request.get_json(silent=True)
+        try:
+            key = idempotency_key()
+            booking_code = get_idempotent_result('book', key, request_fingerprint(data)) if key and data else None
+        except ValueError as e:
+            return jsonify({'success': False, 'message': f'Помилка бронювання: {str(e)}'}), 400
+        except IdempotencyKeyReused as e:
+            return jsonify({'success': False, 'message': str(e)}), 422
+        if booking_code:
+            return booking_created_response(booking_code, replayed=True)
+        return view(**kwargs)
+    return wrapper
 
 def validate_email(email):
     """Валідація email формату"""
@@ -46,32 +285,38 @@ def validate_name(name):
     return True
 
 @app.route('/')
+@cached_page(listing_version, ttl=Config.OCCUPANCY_CACHE_TTL)
 def index():
     """Головна сторінка з афішею"""
     films = get_films_with_sessions()
     return render_template('index.html', films=films)
 
 @app.route('/film/<int:film_id>')
+@cached_page(listing_version, ttl=Config.OCCUPANCY_CACHE_TTL)
 def film_details(film_id):
     """Сторінка деталей фільму"""
+    # get_film_by_id вже містить унікальні сеанси фільму (film['sessions']);
+    # результат береться з кешу, тому змінювати його не можна
     film = get_film_by_id(film_id)
     if not film:
         return render_template('404.html'), 404
     
-    # Використовуємо функцію для унікальних сеансів
-    film['sessions'] = get_unique_sessions_for_film(film_id)
-    
     return render_template('film.html', film=film)
 
 @app.route('/booking/<int:session_id>')
+@admission_control()
+@cached_page(seat_map_version, ttl=Config.BOOKING_PAGE_CACHE_TTL)
 def booking_seats(session_id):
     """Сторінка вибору місць"""
     session = get_session_by_id(session_id)
     if not session:
         return render_template('404.html'), 404
     
-    seats = get_available_seats(session_id)
-    return render_template('booking.html', session=session, seats=seats)
+    seat_map = get_seat_map(session_id)
+    layout = get_hall_layout(session['hall_id'])
+    rows = layout.render_rows(seat_map['seats']) if layout else []
+    return render_template('booking.html', session=session, rows=rows,
+                           seat_map_version=seat_map['version'])
 
 @app.route('/booking/<booking_code>')
 def booking_details(booking_code):
@@ -82,6 +327,8 @@ def booking_details(booking_code):
     return render_template('booking_details.html', booking=booking)
 
 @app.route('/api/book', methods=['POST'])
+@replay_idempotent_booking
+@admission_control(release_on_success=True)
 def book_tickets():
     """API для бронювання квитків"""
     try:
@@ -93,6 +340,11 @@ def book_tickets():
                 'message': 'Некоректний формат даних'
             }), 400
         
+        # Повтор уже зафіксованого запиту відповів replay_idempotent_booking; повтор,
+        # що розминувся з першим запитом, create_booking розпізнає в транзакції
+        key = idempotency_key()
+        fingerprint = request_fingerprint(data) if key else None
+        
         # Валідація обов'язкових полів
         required_fields = ['session_id', 'customer_email', 'customer_name', 'selected_seats']
         for field in required_fields:
@@ -123,7 +375,7 @@ def book_tickets():
                 'message': 'Оберіть хоча б одне місце'
             }), 400
         
-        max_seats = 10  # Максимальна кількість місць за бронювання
+        max_seats = Config.MAX_SEATS_PER_BOOKING
         if len(data['selected_seats']) > max_seats:
             return jsonify({
                 'success': False,
@@ -144,17 +396,18 @@ def book_tickets():
             data['session_id'], 
             data['customer_email'], 
             data['customer_name'], 
-            selected_seats
+            selected_seats,
+            hold_token=data.get('hold_token'),
+            idempotency_key=key,
+            fingerprint=fingerprint
         )
         
         logger.info(f"Створено бронювання {booking_code} для {data['customer_email']}")
         
-        return jsonify({
-            'success': True,
-            'booking_code': booking_code,
-            'message': 'Бронювання успішне!'
-        })
+        return booking_created_response(booking_code)
         
+    except IdempotencyKeyReused as e:
+        return jsonify({'success': False, 'message': str(e)}), 422
     except Exception as e:
         logger.error(f"Помилка бронювання: {str(e)}")
         return jsonify({
@@ -164,9 +417,9 @@ def book_tickets():
 
 @app.route('/api/cancel-booking/<booking_code>', methods=['POST'])
 def api_cancel_booking(booking_code):
-    """API для скасування бронювання"""
+    """API для скасування бронювання (з заголовком Idempotency-Key повтор теж успішний)"""
     try:
-        success = cancel_booking(booking_code)
+        success = cancel_booking(booking_code, idempotency_key=idempotency_key())
         if success:
             logger.info(f"Скасовано бронювання {booking_code}")
             return jsonify({
@@ -179,6 +432,8 @@ def api_cancel_booking(booking_code):
                 'message': 'Бронювання не знайдено або вже скасовано'
             }), 404
             
+    except IdempotencyKeyReused as e:
+        return jsonify({'success': False, 'message': str(e)}), 422
     except Exception as e:
         logger.error(f"Помилка скасування бронювання {booking_code}: {str(e)}")
         return jsonify({
@@ -187,6 +442,7 @@ def api_cancel_booking(booking_code):
         }), 400
 
 @app.route('/api/films')
+@cached_page(listing_version, ttl=Config.OCCUPANCY_CACHE_TTL, anonymous_only=False)
 def api_films():
     """API для отримання фільмів"""
     try:
@@ -199,12 +455,55 @@ def api_films():
             'message': 'Помилка отримання даних фільмів'
         }), 500
 
+@app.route('/api/films/search')
+def api_search_films():
+    """Пошук фільмів за назвою, описом і жанром (?q=..., ?upcoming=1, ?cursor=..., ?limit=...)"""
+    after, limit = page_args()
+    try:
+        page = search_films(request.args.get('q', ''),
+                            upcoming_only=request.args.get('upcoming') == '1',
+                            after=after, limit=limit)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    return page_response(page)
+
+def pack_seat_availability(seats):
+    """Доступність місць бітовим рядком у base64 (біт 1 - місце вільне)
+
+    Біти йдуть у порядку (ряд, місце), старший біт байта - перше місце.
+    """
+    bits = bytearray((len(seats) + 7) // 8)
+    for index, seat in enumerate(seats):
+        if seat['is_available']:
+            bits[index >> 3] |= 0x80 >> (index & 7)
+    return base64.b64encode(bytes(bits)).decode('ascii')
+
 @app.route('/api/sessions/<int:session_id>/seats')
 def api_session_seats(session_id):
-    """API для отримання місць сеансу"""
+    """API для отримання місць сеансу
+
+    Без параметрів - повний список місць (версія схеми в заголовку
+    X-Seat-Map-Version). ?since=<версія> - лише місця, змінені після неї,
+    та нова версія. ?format=bitmap - повна схема як бітовий рядок доступності.
+    """
     try:
-        seats = get_available_seats(session_id)
-        return jsonify(seats)
+        since = request.args.get('since', type=int)
+        compact = request.args.get('format') == 'bitmap'
+        seat_map = get_seat_map(session_id, hold_token=request.args.get('hold_token'), since=since)
+        
+        if seat_map['full'] and compact:
+            return jsonify({
+                'version': seat_map['version'],
+                'full': True,
+                'count': len(seat_map['seats']),
+                'available': pack_seat_availability(seat_map['seats'])
+            })
+        if since is not None:
+            return jsonify(seat_map)
+        
+        response = jsonify(seat_map['seats'])
+        response.headers['X-Seat-Map-Version'] = str(seat_map['version'])
+        return response
     except Exception as e:
         logger.error(f"Помилка отримання місць для сеансу {session_id}: {str(e)}")
         return jsonify({
@@ -212,6 +511,191 @@ def api_session_seats(session_id):
             'message': 'Помилка отримання даних місць'
         }), 500
 
+@app.route('/api/sessions/<int:session_id>/seats/stream')
+def api_session_seats_stream(session_id):
+    """Потік змін схеми місць сеансу (Server-Sent Events)
+
+    Кожна подія - різниця [{seat_id, state}], опублікована database.py після
+    коміту. Подія resync означає, що клієнт має перечитати схему повністю.
+    """
+    def stream():
+        subscription = seat_events.subscribe(session_id)
+        try:
+            yield 'retry: 3000\n\n'
+            while True:
+                try:
+                    event = subscription.get(timeout=Config.SSE_KEEPALIVE_INTERVAL)
+                except queue.Empty:
+                    yield ': keepalive\n\n'
+                    continue
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            seat_events.unsubscribe(session_id, subscription)
+    
+    return app.response_class(stream(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',  # Вимкнути буферизацію в nginx
+    })
+
+def parse_seat_ids(data):
+    """Отримати список ID місць з JSON запиту або None, якщо формат некоректний"""
+    seat_ids = data.get('seat_ids') if data else None
+    if not isinstance(seat_ids, list):
+        return None
+    try:
+        return [int(seat_id) for seat_id in seat_ids]
+    except (ValueError, TypeError):
+        return None
+
+@app.route('/api/sessions/<int:session_id>/hold', methods=['POST'])
+def api_hold_seats(session_id):
+    """API для тимчасового утримання місць, поки покупець заповнює форму"""
+    data = request.get_json(silent=True)
+    seat_ids = parse_seat_ids(data)
+    if not seat_ids:
+        return jsonify({
+            'success': False,
+            'message': 'Некоректний формат ID місць'
+        }), 400
+    
+    max_seats = Config.MAX_SEATS_PER_BOOKING
+    if len(seat_ids) > max_seats:
+        return jsonify({
+            'success': False,
+            'message': f'Максимум {max_seats} місць за бронювання'
+        }), 400
+    
+    try:
+        hold = hold_seats(session_id, seat_ids, hold_token=data.get('hold_token'))
+        return jsonify({'success': True, **hold})
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 409
+
+@app.route('/api/sessions/<int:session_id>/release', methods=['POST'])
+def api_release_seats(session_id):
+    """API для зняття утримання з місць"""
+    # sendBeacon при закритті сторінки надсилає JSON без Content-Type
+    data = request.get_json(silent=True, force=True)
+    if not data or not data.get('hold_token'):
+        return jsonify({
+            'success': False,
+            'message': 'Відсутній hold_token'
+        }), 400
+    
+    seat_ids = parse_seat_ids(data) if 'seat_ids' in data else None
+    released = release_seats(session_id, data['hold_token'], seat_ids)
+    return jsonify({'success': True, 'released': released})
+
+@app.route('/api/sessions/<int:session_id>/queue')
+def api_session_queue(session_id):
+    """Позиція покупця в черзі сеансу; опитування утримує місце в черзі"""
+    admission = waiting_room.get_backend().admit(session_id, queue_ticket())
+    response = jsonify(admission.to_dict())
+    if not admission.admitted:
+        response.headers['Retry-After'] = str(admission.retry_after)
+    return response
+
+@app.route('/api/waiting-room/stats')
+@admin_required
+def api_waiting_room_stats():
+    """Стан віртуальної черги (активні покупці, довжина черги)"""
+    return jsonify(waiting_room.get_backend().stats())
+
+@app.route('/api/health')
+def api_health():
+    """Перевірка для балансувальника: процес відповідає (без БД і без подробиць)"""
+    return jsonify({'status': 'ok'})
+
+@app.route('/api/health/db')
+@admin_required
+def api_db_health():
+    """API для перевірки стану пулу з'єднань"""
+    return jsonify({
+        'success': True,
+        'pool': get_pool_stats()
+    })
+
+def report_filters(args):
+    """Фільтри звітів з параметрів запиту; ValueError для некоректних значень"""
+    filters = {}
+    try:
+        for name in ('date_from', 'date_to'):
+            if args.get(name):
+                filters[name] = datetime.strptime(args[name], '%Y-%m-%d').date().isoformat()
+        for name in ('film_id', 'hall_id'):
+            if args.get(name):
+                filters[name] = int(args[name])
+    except ValueError as e:
+        raise ValueError('Некоректний фільтр: дати - YYYY-MM-DD, id - числа') from e
+    return filters
+
+@app.route('/api/admin/exports/bookings')
+@admin_required
+def api_export_bookings():
+    """Вивантаження бронювань потоком (?format=csv|ndjson, date_from, date_to, film_id, hall_id)
+
+    Відповідь формується генератором по мірі читання з бази, тож розмір
+    звіту не обмежений пам'яттю процесу.
+    """
+    fmt = request.args.get('format', 'csv')
+    if fmt not in exports.FORMATS:
+        return jsonify({'success': False, 'message': f'Невідомий формат: {fmt}'}), 400
+    try:
+        filters = report_filters(request.args)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    
+    period = '_'.join(filters.get(name, 'all') for name in ('date_from', 'date_to'))
+    return app.response_class(exports.export_bookings(fmt, **filters), mimetype=exports.FORMATS[fmt], headers={
+        'Content-Disposition': f'attachment; filename="bookings_{period}.{fmt}"',
+        'Cache-Control': 'no-store',
+        'X-Accel-Buffering': 'no',
+    })
+
+@app.route('/api/admin/analytics/revenue')
+@admin_required
+def api_analytics_revenue():
+    """Виручка зі зведень (?group_by=film|day|hall, date_from, date_to, film_id, hall_id)"""
+    try:
+        filters = report_filters(request.args)
+        rows = analytics.get_revenue(request.args.get('group_by', 'film'), **filters)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    return jsonify({'success': True, 'rollup': analytics.get_rollup_status(), 'items': rows})
+
+@app.route('/api/admin/analytics/peak-hours')
+@admin_required
+def api_analytics_peak_hours():
+    """Продажі за годинами доби (UTC) за період (?date_from, date_to)"""
+    try:
+        filters = report_filters(request.args)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    hours = analytics.get_peak_hours(filters.get('date_from'), filters.get('date_to'))
+    return jsonify({'success': True, 'rollup': analytics.get_rollup_status(), 'hours': hours})
+
+@app.route('/api/admin/analytics/heatmap/<int:hall_id>')
+@admin_required
+def api_analytics_heatmap(hall_id):
+    """Теплова карта продажів місць залу"""
+    heatmap = analytics.get_seat_heatmap(hall_id)
+    if heatmap is None:
+        return jsonify({'success': False, 'message': 'Зал не знайдено'}), 404
+    return jsonify({'success': True, 'rollup': analytics.get_rollup_status(), **heatmap})
+
+@app.route('/api/cache/stats')
+@admin_required
+def api_cache_stats():
+    """API для статистики кешу каталогу"""
+    return jsonify({
+        'success': True,
+        'cache': cache.get_stats(),
+        'pages': page_cache.stats()
+    })
+
 # === КОРИСТУВАЧСЬКИЙ КАБІНЕТ ===
 
 @app.route('/register', methods=['GET', 'POST'])
@@ -289,18 +773,12 @@ def profile():
     if 'user_id' not in session:
         return redirect(url_for('login'))
     
-    user = get_user_by_id(session['user_id'])
-    if not user:
+    dashboard = get_profile_dashboard(session['user_id'])
+    if not dashboard:
         session.clear()
         return redirect(url_for('login'))
     
-    bookings = get_user_bookings(user['id'])
-    notifications = get_user_notifications(user['id'], unread_only=True)
-    
-    return render_template('profile.html', 
-                         user=user, 
-                         bookings=bookings,
-                         notifications=notifications)
+    return render_template('profile.html', **dashboard)
 
 @app.route('/profile/update', methods=['POST'])
 def update_profile():
@@ -318,23 +796,96 @@ def update_profile():
     else:
         return jsonify({'success': False, 'message': 'Помилка оновлення профілю'})
 
+def page_response(page):
+    """Список записів сторінки; курсор наступної сторінки - в заголовку X-Next-Cursor"""
+    response = jsonify(page['items'])
+    if page['next_cursor']:
+        response.headers['X-Next-Cursor'] = page['next_cursor']
+    return response
+
+def page_args():
+    """Параметри сторінки із запиту: (cursor, limit)"""
+    limit = request.args.get('limit', type=int)
+    if limit is not None:
+        limit = max(1, min(limit, Config.MAX_PAGE_SIZE))
+    return request.args.get('cursor') or None, limit
+
 @app.route('/api/notifications')
 def api_get_notifications():
-    """API для отримання сповіщень"""
+    """API для отримання сповіщень (?unread=1, ?cursor=..., ?limit=...)"""
     if 'user_id' not in session:
         return jsonify([])
     
-    notifications = get_user_notifications(session['user_id'])
-    return jsonify(notifications)
+    after, limit = page_args()
+    try:
+        page = get_user_notifications(session['user_id'],
+                                      unread_only=request.args.get('unread') == '1',
+                                      after=after, limit=limit)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    return page_response(page)
+
+@app.route('/api/bookings')
+def api_get_bookings():
+    """Історія бронювань користувача сторінками (?cursor=..., ?limit=...)"""
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'message': 'Необхідно увійти в систему'}), 401
+    
+    after, limit = page_args()
+    try:
+        page = get_user_bookings(session['user_id'], after=after, limit=limit)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    return page_response(page)
 
-@app.route('/api/notifications/mark-read/<int:notification_id>', methods=['POST'])
+@app.route('/api/notifications/mark-read/<int(signed=True):notification_id>', methods=['POST'])
 def api_mark_notification_as_read(notification_id):
-    """API для позначення сповіщення як прочитаного"""
+    """API для позначення сповіщення як прочитаного (від'ємний id - розсилка)"""
+    if 'user_id' not in session:
+        return jsonify({'success': False}), 401
+    
+    success = mark_notification_read(notification_id, session['user_id'])
+    if not success:
+        return jsonify({'success': False, 'message': 'Сповіщення не знайдено'}), 404
+    return jsonify({'success': True})
+
+@app.route('/api/notifications/mark-read', methods=['POST'])
+def api_mark_notifications_as_read():
+    """Позначити прочитаними кілька сповіщень: {"ids": [...]}"""
     if 'user_id' not in session:
         return jsonify({'success': False}), 401
     
-    success = mark_notification_read(notification_id)
-    return jsonify({'success': success})
+    data = request.get_json(silent=True) or {}
+    ids = data.get('ids')
+    if not isinstance(ids, list) or not ids or len(ids) > Config.MAX_PAGE_SIZE \
+            or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+        return jsonify({'success': False,
+                        'message': f'Потрібен список від 1 до {Config.MAX_PAGE_SIZE} id сповіщень'}), 400
+    
+    try:
+        marked, unread = mark_notifications_read(session['user_id'], ids)
+    except Exception:
+        return jsonify({'success': False, 'message': 'Помилка сервера'}), 500
+    return jsonify({'success': True, 'marked': marked, 'unread_count': unread})
+
+@app.route('/api/notifications/mark-all-read', methods=['POST'])
+def api_mark_all_notifications_as_read():
+    """Позначити прочитаними всі сповіщення користувача"""
+    if 'user_id' not in session:
+        return jsonify({'success': False}), 401
+    
+    try:
+        marked, unread = mark_notifications_read(session['user_id'])
+    except Exception:
+        return jsonify({'success': False, 'message': 'Помилка сервера'}), 500
+    return jsonify({'success': True, 'marked': marked, 'unread_count': unread})
+
+@app.route('/api/notifications/unread-count')
+def api_unread_notifications_count():
+    """Кількість непрочитаних сповіщень (з лічильника, без підрахунку рядків)"""
+    if 'user_id' not in session:
+        return jsonify({'unread_count': 0})
+    return jsonify({'unread_count': get_unread_count(session['user_id'])})
 
 # Додати middleware для перевірки авторизації
 @app.before_request
@@ -342,13 +893,173 @@ def check_auth():
     # Список публічних маршрутів
     public_routes = ['index', 'film_details', 'booking_seats', 
                     'booking_details', 'login', 'register', 'static',
-                    'api_films', 'api_session_seats', 'book_tickets',
-                    'api_cancel_booking', 'api_get_notifications', 
-                    'api_mark_notification_as_read']
+                    'api_films', 'api_search_films', 'api_session_seats', 'book_tickets',
+                    'api_cancel_booking', 'api_get_notifications', 'api_get_bookings', 
+                    'api_mark_notification_as_read', 'api_mark_notifications_as_read',
+                    'api_mark_all_notifications_as_read', 'api_unread_notifications_count',
+                    'api_health',
+                    'api_hold_seats', 'api_release_seats',
+                    'api_session_seats_stream', 'api_session_queue',
+                    'api_export_bookings',
+                    'api_analytics_revenue', 'api_analytics_peak_hours', 'api_analytics_heatmap']
     
     if request.endpoint not in public_routes and 'user_id' not in session:
         return redirect(url_for('login'))
 
+def with_database(command):
+    """CLI-команда, що спершу застосовує міграції (базу не готує імпорт застосунку)"""
+    @functools.wraps(command)
+    def wrapper(*args, **kwargs):
+        init_database()
+        return command(*args, **kwargs)
+    return wrapper
+
+@app.cli.command('check-query-plans')
+@with_database
+def check_query_plans_command():
+    """Перевірити, що гарячі запити не роблять повних сканувань таблиць"""
+    problems = check_query_plans()
+    for sql, plan in problems:
+        click.echo(f"Повне сканування:\n{sql}")
+        for detail in plan:
+            click.echo(f"    {detail}")
+    if problems:
+        raise SystemExit(1)
+    click.echo("✅ Усі гарячі запити використовують індекси")
+
+@app.cli.command('init-db')
+def init_db_command():
+    """Створити базу або застосувати нові міграції (ідемпотентно)"""
+    init_database()
+    click.echo("✅ Схема бази даних актуальна")
+
+@app.cli.command('seed-db')
+@click.option('--if-needed', is_flag=True, help='Лише якщо поточна версія тестових даних ще не застосована')
+@with_database
+def seed_db_command(if_needed):
+    """Додати тестові дані (ідемпотентно: існуючі записи не дублюються)"""
+    seeded = seed_database(get_db_connection(), force=not if_needed)
+    if seeded:
+        click.echo("✅ Тестові дані додано")
+    else:
+        click.echo("Тестові дані вже актуальні")
+
+@app.cli.command('rebuild-occupancy')
+@with_database
+def rebuild_occupancy_command():
+    """Перевірити й перерахувати лічильники вільних місць усіх сеансів"""
+    sessions, fixed = rebuild_session_occupancy()
+    if fixed:
+        click.echo(f"⚠️ Виправлено лічильники {fixed} з {sessions} сеансів")
+    else:
+        click.echo(f"✅ Лічильники {sessions} сеансів узгоджені")
+
+@app.cli.command('export-bookings')
+@click.option('--format', 'fmt', default='csv', type=click.Choice(list(exports.FORMATS)), show_default=True)
+@click.option('--date-from', type=click.DateTime(formats=['%Y-%m-%d']), help='Перша дата сеансу (включно)')
+@click.option('--date-to', type=click.DateTime(formats=['%Y-%m-%d']), help='Остання дата сеансу (включно)')
+@click.option('--film-id', type=int)
+@click.option('--hall-id', type=int)
+@click.option('--output', type=click.File('w', encoding='utf-8'), default='-', help='Файл (за замовчуванням stdout)')
+@with_database
+def export_bookings_command(fmt, date_from, date_to, film_id, hall_id, output):
+    """Вивантажити бронювання з місцями в CSV або NDJSON"""
+    for chunk in exports.export_bookings(
+        fmt,
+        date_from=date_from.date().isoformat() if date_from else None,
+        date_to=date_to.date().isoformat() if date_to else None,
+        film_id=film_id,
+        hall_id=hall_id,
+    ):
+        output.write(chunk)
+
+@app.cli.command('rollup-analytics')
+@click.option('--rebuild', is_flag=True, help='Очистити зведення і порахувати їх з усіх бронювань')
+@with_database
+def rollup_analytics_command(rebuild):
+    """Оновити зведення аналітики продажів"""
+    result = analytics.rebuild_rollups() if rebuild else analytics.run_rollup()
+    click.echo(f"✅ Враховано бронювань: {result['bookings']}, скасувань: {result['cancellations']}; "
+               f"межа - бронювання {result['high_water_mark']}")
+
+@app.cli.command('schedule-sessions')
+@click.option('--start-date', type=click.DateTime(formats=['%Y-%m-%d']), default=None,
+              help='Перший день розкладу (за замовчуванням - завтра)')
+@click.option('--days', type=click.IntRange(min=1), default=7, show_default=True)
+@click.option('--film-id', 'film_ids', type=int, multiple=True, help='Фільми розкладу (можна кілька); без нього - всі')
+@click.option('--hall-id', 'hall_ids', type=int, multiple=True, help='Зали розкладу (можна кілька); без нього - всі')
+@click.option('--opening', default=None, help='Відкриття, HH:MM (Config.SCHEDULE_OPENING)')
+@click.option('--closing', default=None, help='Закриття, HH:MM (Config.SCHEDULE_CLOSING)')
+@click.option('--cleaning-gap', type=click.IntRange(min=0), default=None, help='Хвилин прибирання між сеансами')
+@click.option('--step', type=click.IntRange(min=1), default=None, help='Крок часу початку сеансу, хвилин')
+@click.option('--dry-run', is_flag=True, help='Лише показати розклад, не створюючи сеансів')
+@with_database
+def schedule_sessions_command(start_date, days, film_ids, hall_ids, opening, closing, cleaning_gap, step, dry_run):
+    """Згенерувати розклад сеансів без накладок у залах"""
+    start_date = start_date.date() if start_date else datetime.now().date() + timedelta(days=1)
+    try:
+        result = scheduling.schedule_sessions(
+            start_date, days, film_ids=list(film_ids) or None, hall_ids=list(hall_ids) or None,
+            opening=opening, closing=closing, cleaning_gap=cleaning_gap, step=step, dry_run=dry_run,
+        )
+    except ValueError as e:
+        raise click.UsageError(str(e))
+    if dry_run:
+        for film_id, hall_id, session_date, session_time, price in result['rows']:
+            click.echo(f"{session_date} {session_time[:5]}  зал {hall_id}  фільм {film_id}  {price:.0f} грн")
+    verb = 'Заплановано' if dry_run else 'Створено'
+    click.echo(f"✅ {verb} сеансів: {result['sessions']} ({result['date_from']} - {result['date_to']})")
+
+@app.cli.command('notify')
+@click.option('--type', 'notification_type', default='promo',
+              type=click.Choice(['system', 'promo', 'booking']), show_default=True)
+@click.option('--title', required=True)
+@click.option('--message', required=True)
+@click.option('--user-id', 'user_ids', type=int, multiple=True, help='Кому надіслати (можна кілька); без нього - всім')
+@click.option('--broadcast', is_flag=True, help='Одна спільна розсилка замість рядка для кожного користувача')
+@with_database
+def notify_command(notification_type, title, message, user_ids, broadcast):
+    """Надіслати сповіщення користувачам"""
+    if broadcast:
+        if user_ids:
+            raise click.UsageError('--broadcast надсилається всім, --user-id з ним не поєднується')
+        broadcast_notification(notification_type, title, message)
+        click.echo("✅ Розсилку додано")
+        return
+    count = notify_users(notification_type, title, message, list(user_ids) or None)
+    click.echo(f"✅ Надіслано сповіщень: {count}")
+
+@app.cli.command('generate-data')
+@click.option('--films', default=300, show_default=True)
+@click.option('--halls', default=300, show_default=True)
+@click.option('--seats-per-hall', default=200, show_default=True)
+@click.option('--sessions', default=100000, show_default=True)
+@click.option('--days', default=365, show_default=True, help='На скільки днів розподілити сеанси')
+@click.option('--bookings', default=2000000, show_default=True)
+@click.option('--users', default=1000000, show_default=True)
+@click.option('--notifications', default=1000000, show_default=True)
+@click.option('--seed', default=42, show_default=True)
+@click.option('--start-date', type=click.DateTime(formats=['%Y-%m-%d']),
+              help='Дата першого сеансу (за замовчуванням - пів року тому)')
+@with_database
+def generate_data_command(films, halls, seats_per_hall, sessions, days, bookings, users, notifications, seed,
+                          start_date):
+    """Заповнити базу синтетичними даними для навантажувальних тестів
+
+    Однакові --seed і --start-date на однаковій базі дають однакові дані.
+    Синтетичні користувачі входять з паролем synthetic123.
+    """
+    start_date = start_date.date() if start_date else (datetime.now() - timedelta(days=days // 2)).date()
+    started = datetime.now()
+    counts = synthetic_data.generate(
+        get_db_connection(), films=films, halls=halls, seats_per_hall=seats_per_hall, sessions=sessions,
+        bookings=bookings, users=users, notifications=notifications, days=days, seed=seed,
+        start_date=start_date,
+    )
+    for name, count in counts.items():
+        click.echo(f"{name}: {count}")
+    click.echo(f"✅ Дані згенеровано з {start_date} за {(datetime.now() - started).total_seconds():.0f} с")
+
 @app.errorhandler(404)
 def not_found_error(error):
     return render_template('404.html'), 404
@@ -358,4 +1069,5 @@ def internal_error(error):
     return render_template('500.html'), 500
 
 if __name__ == '__main__':
+    start_app_services()
     app.run(debug=app.config['DEBUG'], port=5000)
\ No newline at end of file
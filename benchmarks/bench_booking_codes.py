@@ -0,0 +1,112 @@
+"""Вартість генерації коду бронювання залежно від кількості існуючих бронювань
+
+Для кожного розміру таблиці bookings вимірюється генерація коду разом із
+вставкою бронювання (транзакція відкочується, тож розмір не змінюється):
+- counter: номер з лічильника sequences + перестановка Фейстеля (поточний спосіб);
+- legacy: випадкові 6 цифр і SELECT по bookings до 10 спроб (попередній спосіб),
+  лише поки розмір менший за простір кодів 10^6.
+"""
+import argparse
+import random
+import time
+
+import database
+from booking_codes import format_booking_code
+from benchmarks.common import quiet_logging, use_temp_database, summarize, print_report
+
+LEGACY_SPACE = 10 ** 6
+
+def legacy_booking_code(cursor, max_attempts=10):
+    """Попередній генератор; повертає (код або None, кількість спроб)"""
+    for attempt in range(1, max_attempts + 1):
+        code = 'CINEMA' + f'{random.randrange(LEGACY_SPACE):06d}'
+        cursor.execute("SELECT id FROM bookings WHERE booking_code = ?", (code,))
+        if not cursor.fetchone():
+            return code, attempt
+    return None, max_attempts
+
+def fill_bookings(conn, codes):
+    """Додати бронювання з заданими кодами одним executemany"""
+    database.begin_immediate(conn)
+    conn.executemany(
+        "INSERT INTO bookings (session_id, customer_email, customer_name, booking_code, status) "
+        "VALUES (1, 'bench@example.com', 'Bench', ?, 'active')",
+        ((code,) for code in codes)
+    )
+    conn.commit()
+
+def measure(conn, generate, samples):
+    """Затримки генерації коду + INSERT; повертає (зведення, спроби, невдачі)"""
+    cursor = conn.cursor()
+    latencies = []
+    attempts = failures = 0
+    start = time.perf_counter()
+    for _ in range(samples):
+        began = time.perf_counter()
+        database.begin_immediate(conn)
+        code, tries = generate(cursor)
+        if code is None:
+            failures += 1
+        else:
+            cursor.execute(
+                "INSERT INTO bookings (session_id, customer_email, customer_name, booking_code) "
+                "VALUES (1, 'bench@example.com', 'Bench', ?)", (code,)
+            )
+        conn.rollback()
+        latencies.append(time.perf_counter() - began)
+        attempts += tries
+    report = summarize(latencies, time.perf_counter() - start)
+    report['avg_attempts'] = round(attempts / samples, 3)
+    report['failures'] = failures
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', default='0,100000,900000,3000000',
+                        help='кількості існуючих бронювань через кому')
+    parser.add_argument('--samples', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    sizes = sorted(int(size) for size in args.sizes.split(','))
+    
+    quiet_logging()
+    random.seed(args.seed)
+    report = {'samples': args.samples, 'counter': {}, 'legacy': {}}
+    
+    use_temp_database('bench-codes.db')
+    conn = database.get_db_connection()
+    try:
+        conn.execute("DELETE FROM bookings")
+        conn.commit()
+        filled = 0
+        for size in sizes:
+            fill_bookings(conn, (format_booking_code(number) for number in range(filled + 1, size + 1)))
+            conn.execute("INSERT OR REPLACE INTO sequences (name, value) VALUES ('booking_code', ?)", (size,))
+            conn.commit()
+            filled = size
+            report['counter'][size] = measure(
+                conn, lambda cursor: (database.generate_booking_code(cursor), 1), args.samples
+            )
+    finally:
+        conn.close()
+    
+    use_temp_database('bench-codes-legacy.db')
+    conn = database.get_db_connection()
+    try:
+        conn.execute("DELETE FROM bookings")
+        conn.commit()
+        legacy_sizes = [size for size in sizes if size < LEGACY_SPACE]
+        # Різні випадкові коди, як їх видав би старий генератор
+        numbers = random.sample(range(LEGACY_SPACE), legacy_sizes[-1]) if legacy_sizes else []
+        filled = 0
+        for size in legacy_sizes:
+            fill_bookings(conn, (f'CINEMA{number:06d}' for number in numbers[filled:size]))
+            filled = size
+            report['legacy'][size] = measure(conn, legacy_booking_code, args.samples)
+    finally:
+        conn.close()
+    
+    print_report(report)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""Стрес-тест паралельних бронювань одних і тих самих місць
+
+Багато потоків одночасно бронюють (і частково скасовують) місця з невеликої
+"гарячої" зони залу. Після прогону перевіряється, що жодне місце не
+зайняте двома активними бронюваннями. Код виходу 1 - знайдено подвійне
+бронювання.
+"""
+import argparse
+import random
+import sys
+import threading
+import time
+
+import database
+from benchmarks.common import quiet_logging, use_temp_database, summarize, print_report
+
+def find_double_bookings():
+    """Місця, зайняті більш ніж одним активним бронюванням"""
+    conn = database.get_db_connection()
+    try:
+        return conn.execute("""
+            SELECT b.session_id, bs.seat_id, COUNT(*) AS bookings
+            FROM booked_seats bs
+            JOIN bookings b ON b.id = bs.booking_id
+            WHERE b.status = 'active'
+            GROUP BY b.session_id, bs.seat_id
+            HAVING COUNT(*) > 1
+        """).fetchall()
+    finally:
+        conn.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--attempts', type=int, default=4000, help='загальна кількість спроб бронювання')
+    parser.add_argument('--hot-seats', type=int, default=20, help='розмір зони, за яку йде боротьба')
+    parser.add_argument('--cancel-ratio', type=float, default=0.9)
+    args = parser.parse_args()
+    
+    quiet_logging()
+    use_temp_database('bench-race.db')
+    
+    session_id = 1
+    hot_seats = [seat['id'] for seat in database.get_available_seats(session_id)][:args.hot_seats]
+    
+    per_thread = args.attempts // args.threads
+    latencies = []
+    counters = {'booked': 0, 'rejected': 0, 'cancelled': 0}
+    lock = threading.Lock()
+    start_barrier = threading.Barrier(args.threads)
+    
+    def worker(seed):
+        rnd = random.Random(seed)
+        local = []
+        booked = rejected = cancelled = 0
+        start_barrier.wait()
+        for _ in range(per_thread):
+            seats = rnd.sample(hot_seats, rnd.randint(1, 3))
+            start = time.perf_counter()
+            try:
+                code = database.create_booking(session_id, 'race@cinema.com', 'Стрес Тест', seats)
+                booked += 1
+                if rnd.random() < args.cancel_ratio and database.cancel_booking(code):
+                    cancelled += 1
+            except Exception:
+                rejected += 1
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+            counters['booked'] += booked
+            counters['rejected'] += rejected
+            counters['cancelled'] += cancelled
+    
+    threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(args.threads)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    
+    double_bookings = find_double_bookings()
+    print_report({
+        'threads': args.threads,
+        'attempts': summarize(latencies, elapsed),
+        **counters,
+        'double_bookings': [tuple(row) for row in double_bookings],
+    })
+    database.close_pool()
+    if double_bookings:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
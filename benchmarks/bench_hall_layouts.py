@@ -0,0 +1,77 @@
+"""Генерація схеми великого залу: старий спосіб проти декларативних схем
+
+- legacy: DELETE усіх місць залу і INSERT по одному місцю (як робив
+  create_proper_seats_schema);
+- sync_initial / sync_noop / sync_one_row: sync_hall_layout для нового залу,
+  для незмінної схеми і для схеми, де змінилась категорія одного ряду;
+- render_rows: побудова рядів сторінки бронювання з HallLayout у пам'яті.
+"""
+import argparse
+import time
+
+import database
+from hall_layouts import parse_grid
+from benchmarks.common import quiet_logging, use_temp_database, print_report
+
+HALL_ID = 100
+
+def make_definition(rows, seats_per_row, vip_rows=0):
+    """Зал з двома проходами, останні vip_rows рядів - VIP"""
+    block = seats_per_row // 3
+    def line(char):
+        return f"{char * block}.{char * (seats_per_row - 2 * block)}.{char * block}"
+    grid = [f"{rows - vip_rows}*{line('S')}"]
+    if vip_rows:
+        grid.append(f"{vip_rows}*{line('V')}")
+    return {'name': 'Великий зал', 'hall_type': 'IMAX', 'seats': parse_grid(grid)}
+
+def timed(conn, action):
+    """Виконати action(conn) в одній транзакції; повертає мілісекунди"""
+    start = time.perf_counter()
+    database.begin_immediate(conn)
+    action(conn)
+    conn.commit()
+    return round((time.perf_counter() - start) * 1000, 3)
+
+def legacy_generate(conn, definition):
+    conn.execute("DELETE FROM seats WHERE hall_id = ?", (HALL_ID,))
+    for row_number, seat_number, _column, _category in definition['seats']:
+        conn.execute(
+            "INSERT INTO seats (hall_id, row_number, seat_number) VALUES (?, ?, ?)",
+            (HALL_ID, row_number, seat_number)
+        )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=60)
+    parser.add_argument('--seats-per-row', type=int, default=80)
+    args = parser.parse_args()
+    
+    quiet_logging()
+    use_temp_database('bench-layouts.db')
+    definition = make_definition(args.rows, args.seats_per_row)
+    changed = make_definition(args.rows, args.seats_per_row, vip_rows=1)
+    report = {'seats': len(definition['seats'])}
+    
+    conn = database.get_db_connection()
+    try:
+        report['legacy_ms'] = timed(conn, lambda c: legacy_generate(c, definition))
+        conn.execute("DELETE FROM seats WHERE hall_id = ?", (HALL_ID,))
+        conn.commit()
+        report['sync_initial_ms'] = timed(conn, lambda c: database.sync_hall_layout(c, HALL_ID, definition))
+        report['sync_noop_ms'] = timed(conn, lambda c: database.sync_hall_layout(c, HALL_ID, definition))
+        report['sync_one_row_ms'] = timed(conn, lambda c: database.sync_hall_layout(c, HALL_ID, changed))
+    finally:
+        conn.close()
+    
+    layout = database.get_hall_layout.uncached(HALL_ID)
+    seats = [{'id': seat_id, 'is_available': True} for seat_id in layout.seat_ids]
+    start = time.perf_counter()
+    rows = layout.render_rows(seats)
+    report['render_rows_ms'] = round((time.perf_counter() - start) * 1000, 3)
+    report['rendered_rows'] = len(rows)
+    
+    print_report(report)
+
+if __name__ == '__main__':
+    main()
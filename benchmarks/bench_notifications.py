@@ -0,0 +1,79 @@
+"""Розсилка сповіщень усім користувачам
+
+Для --users користувачів вимірюється час розсилки одного промо-сповіщення:
+- per_user: add_notification для кожного (окреме з'єднання і commit, попередній спосіб,
+  лише на перших --per-user-limit користувачах, далі екстраполяція);
+- fan_out: notify_users - один INSERT ... SELECT в одній транзакції;
+- broadcast: broadcast_notification - один рядок для всіх.
+Також затримка лічильника непрочитаних і перевірка, що він збігається з COUNT(*).
+"""
+import argparse
+import time
+
+import database
+from benchmarks.common import quiet_logging, use_temp_database, summarize, print_report
+
+def fill_users(conn, count):
+    database.begin_immediate(conn)
+    conn.executemany(
+        "INSERT INTO users (email, username, password_hash) VALUES (?, ?, 'x')",
+        ((f'bench{n}@example.com', f'bench{n}') for n in range(count))
+    )
+    conn.commit()
+
+def timed(run):
+    began = time.perf_counter()
+    result = run()
+    return result, round((time.perf_counter() - began) * 1000, 1)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=100000)
+    parser.add_argument('--per-user-limit', type=int, default=2000)
+    parser.add_argument('--samples', type=int, default=2000)
+    args = parser.parse_args()
+
+    quiet_logging()
+    use_temp_database('bench-notifications.db')
+    conn = database.get_db_connection()
+    try:
+        fill_users(conn, args.users)
+        user_ids = [row[0] for row in conn.execute("SELECT id FROM users ORDER BY id")]
+    finally:
+        conn.close()
+
+    report = {'users': len(user_ids)}
+    sample = user_ids[:args.per_user_limit]
+    _, elapsed = timed(lambda: [database.add_notification(user_id, 'promo', 'Промо', 'Знижка') for user_id in sample])
+    report['per_user_ms'] = {'measured_users': len(sample), 'elapsed_ms': elapsed,
+                             'extrapolated_ms': round(elapsed * len(user_ids) / max(len(sample), 1), 1)}
+    count, elapsed = timed(lambda: database.notify_users('promo', 'Промо', 'Знижка'))
+    report['fan_out_ms'] = {'rows': count, 'elapsed_ms': elapsed}
+    _, elapsed = timed(lambda: database.broadcast_notification('promo', 'Промо', 'Знижка'))
+    report['broadcast_ms'] = {'rows': 1, 'elapsed_ms': elapsed}
+
+    user_id = user_ids[0]
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(args.samples):
+        began = time.perf_counter()
+        database.get_unread_count(user_id)
+        latencies.append(time.perf_counter() - began)
+    report['unread_count'] = summarize(latencies, time.perf_counter() - start)
+
+    conn = database.get_db_connection()
+    try:
+        counted = conn.execute(
+            "SELECT COUNT(*) FROM notifications WHERE user_id = ? AND NOT is_read", (user_id,)
+        ).fetchone()[0] + conn.execute("SELECT COUNT(*) FROM broadcasts").fetchone()[0]
+    finally:
+        conn.close()
+    report['unread_count']['matches_count'] = counted == database.get_unread_count(user_id)
+    _, elapsed = timed(lambda: database.mark_notifications_read(user_id))
+    report['mark_all_read_ms'] = elapsed
+    report['unread_after_mark_all'] = database.get_unread_count(user_id)
+
+    print_report(report)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""Курсорна пагінація проти OFFSET на довгій історії одного користувача
+
+Одному користувачу додається --rows бронювань і сповіщень (по два записи на
+кожну мітку часу, щоб перевірити порядок за id). Курсори збираються проходом
+по всіх сторінках, далі для сторінок 1, 10, 100, 1000 вимірюється:
+- keyset: get_user_bookings / get_user_notifications з курсором (поточний спосіб);
+- offset: той самий запит з LIMIT/OFFSET (затримка росте з номером сторінки).
+Проходом також перевіряється, що сторінки не гублять і не повторюють записи.
+"""
+import argparse
+import time
+
+import database
+from benchmarks.common import quiet_logging, use_temp_database, summarize, print_report
+
+USER_EMAIL = 'anna.petrova@gmail.com'
+
+_NOTIFICATIONS_OFFSET_SQL = """
+SELECT * FROM notifications
+WHERE user_id = ?
+ORDER BY created_at DESC, id DESC
+LIMIT ? OFFSET ?
+"""
+
+def fill_history(conn, user_id, rows):
+    """Бронювання та сповіщення користувача, по два на кожну секунду"""
+    database.begin_immediate(conn)
+    conn.executemany(
+        "INSERT INTO bookings (session_id, customer_email, customer_name, booking_code, status, created_at) "
+        "VALUES (1, ?, 'Bench', ?, 'active', datetime('2020-01-01', '+' || ? || ' seconds'))",
+        ((USER_EMAIL, f'BENCH{n:010d}', n // 2) for n in range(rows))
+    )
+    conn.executemany(
+        "INSERT INTO notifications (user_id, type, title, message, created_at) "
+        "VALUES (?, 'system', 'Bench', 'Bench', datetime('2020-01-01', '+' || ? || ' seconds'))",
+        ((user_id, n // 2) for n in range(rows))
+    )
+    conn.commit()
+
+def collect_cursors(fetch, pages):
+    """Курсори перед кожною сторінкою з pages (None - перша); перевіряє унікальність id"""
+    wanted = set(pages)
+    cursors = {}
+    seen = set()
+    after = None
+    page_number = 1
+    while True:
+        if page_number in wanted:
+            cursors[page_number] = after
+        page = fetch(after)
+        for item in page['items']:
+            if item['id'] in seen:
+                raise AssertionError(f"Запис {item['id']} повторився на сторінці {page_number}")
+            seen.add(item['id'])
+        after = page['next_cursor']
+        if not after:
+            return cursors, len(seen)
+        page_number += 1
+
+def measure(run, samples):
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(samples):
+        began = time.perf_counter()
+        run()
+        latencies.append(time.perf_counter() - began)
+    return summarize(latencies, time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=50000, help='бронювань і сповіщень користувача')
+    parser.add_argument('--page-size', type=int, default=20)
+    parser.add_argument('--pages', default='1,10,100,1000', help='номери сторінок через кому')
+    parser.add_argument('--samples', type=int, default=200)
+    args = parser.parse_args()
+    pages = sorted(int(page) for page in args.pages.split(','))
+    limit = args.page_size
+
+    quiet_logging()
+    use_temp_database('bench-pagination.db')
+    user_id = database.get_user_by_email(USER_EMAIL)['id']
+    conn = database.get_db_connection()
+    try:
+        fill_history(conn, user_id, args.rows)
+        bookings_offset_sql = database._BOOKING_LIST_SQL.format(keyset='').replace('LIMIT ?', 'LIMIT ? OFFSET ?')
+
+        def bookings_offset(page_number):
+            rows = conn.execute(bookings_offset_sql, (USER_EMAIL, limit, (page_number - 1) * limit)).fetchall()
+            return database._fetch_booking_seats(conn.cursor(), [dict(row) for row in rows])
+
+        def notifications_offset(page_number):
+            return conn.execute(_NOTIFICATIONS_OFFSET_SQL, (user_id, limit, (page_number - 1) * limit)).fetchall()
+
+        targets = {
+            'bookings': (lambda after: database.get_user_bookings(user_id, after=after, limit=limit),
+                         bookings_offset),
+            'notifications': (lambda after: database.get_user_notifications(user_id, after=after, limit=limit),
+                              notifications_offset),
+        }
+        report = {'rows': args.rows, 'page_size': limit}
+        for name, (keyset_fetch, offset_fetch) in targets.items():
+            cursors, total = collect_cursors(keyset_fetch, pages)
+            result = {'total': total, 'keyset': {}, 'offset': {}}
+            for page_number in pages:
+                if page_number not in cursors:
+                    continue
+                after = cursors[page_number]
+                result['keyset'][page_number] = measure(lambda: keyset_fetch(after), args.samples)
+                result['offset'][page_number] = measure(lambda: offset_fetch(page_number), args.samples)
+            report[name] = result
+    finally:
+        conn.close()
+
+    print_report(report)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""Бенчмарк генератора розкладу: рік сеансів для всіх залів
+
+На тимчасовій базі з синтетичними фільмами й залами (без сеансів):
+- plan: планування року з індексом інтервалів HallTimeline (бінарний пошук);
+- plan_pairwise: те саме планування, але кожен сеанс порівнюється з усіма
+  сеансами залу (базовий варіант без індексу);
+- schedule: scheduling.schedule_sessions - планування разом із вставкою
+  однією транзакцією (з тригерами лічильників заповненості);
+- overlaps: перевірка створеного розкладу на накладки в залах (має бути 0).
+"""
+import argparse
+import datetime
+import time
+
+import database
+import scheduling
+import synthetic_data
+from benchmarks.common import quiet_logging, use_temp_database, print_report
+
+class PairwiseTimeline:
+    """Зайнятість залу без індексу: перевірка - порівняння з кожним інтервалом"""
+
+    def __init__(self):
+        self.intervals = []
+
+    def conflict(self, start, end):
+        for busy_start, busy_end in self.intervals:
+            if busy_start < end and start < busy_end:
+                return busy_end
+        return None
+
+    def add(self, start, end):
+        self.intervals.append((start, end))
+
+def count_overlaps(conn, first_hall, cleaning_gap):
+    """Пари сусідніх сеансів залу (id від first_hall), між якими менше ніж фільм і прибирання"""
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    cursor.execute("""
+        SELECT s.hall_id, s.session_date, s.session_time, f.duration
+        FROM sessions s
+        JOIN films f ON f.id = s.film_id
+        WHERE s.hall_id >= ?
+        ORDER BY s.hall_id, s.session_date, s.session_time
+    """, (first_hall,))
+    overlaps = 0
+    previous_hall = previous_end = None
+    for hall_id, session_date, session_time, duration in cursor:
+        start = (datetime.date.fromisoformat(session_date).toordinal() * scheduling.MINUTES_PER_DAY
+                 + scheduling.parse_minutes(session_time))
+        if hall_id == previous_hall and start < previous_end:
+            overlaps += 1
+        previous_hall, previous_end = hall_id, start + duration + cleaning_gap
+    return overlaps
+
+def timed(func):
+    started = time.perf_counter()
+    result = func()
+    return result, round(time.perf_counter() - started, 3)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--films', type=int, default=40)
+    parser.add_argument('--halls', type=int, default=20)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--opening', default='10:00')
+    parser.add_argument('--closing', default='01:00')
+    parser.add_argument('--cleaning-gap', type=int, default=20)
+    parser.add_argument('--step', type=int, default=5)
+    parser.add_argument('--skip-pairwise', action='store_true')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    quiet_logging()
+    use_temp_database('bench-scheduling.db')
+    conn = database.get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        # Розклад - лише для синтетичних фільмів і залів, без тестових даних
+        last_film, last_hall = cursor.execute(
+            "SELECT (SELECT MAX(id) FROM films), (SELECT MAX(id) FROM halls)").fetchone()
+        synthetic_data.generate(conn, films=args.films, halls=args.halls, seats_per_hall=100,
+                                sessions=0, bookings=0, seed=args.seed)
+        films = cursor.execute("SELECT id, duration FROM films WHERE id > ? ORDER BY id", (last_film,)).fetchall()
+        halls = cursor.execute("SELECT id, hall_type FROM halls WHERE id > ? ORDER BY id", (last_hall,)).fetchall()
+    finally:
+        conn.close()
+
+    start_date = datetime.date.today() + datetime.timedelta(days=1)
+    options = dict(opening=args.opening, closing=args.closing, cleaning_gap=args.cleaning_gap, step=args.step)
+    rows, plan_sec = timed(lambda: scheduling.plan_sessions(films, halls, start_date, args.days, **options))
+    report = {
+        'films': len(films),
+        'halls': len(halls),
+        'days': args.days,
+        'sessions': len(rows),
+        'plan_sec': plan_sec,
+    }
+    if not args.skip_pairwise:
+        timelines = {hall_id: PairwiseTimeline() for hall_id, _ in halls}
+        pairwise_rows, report['plan_pairwise_sec'] = timed(
+            lambda: scheduling.plan_sessions(films, halls, start_date, args.days, timelines=timelines, **options))
+        report['pairwise_same_plan'] = pairwise_rows == rows
+
+    result, report['schedule_sec'] = timed(lambda: scheduling.schedule_sessions(
+        start_date, args.days, film_ids=[film_id for film_id, _ in films], hall_ids=[hall_id for hall_id, _ in halls],
+        **options))
+    report['sessions_per_sec'] = round(result['sessions'] / report['schedule_sec'], 1)
+    conn = database.get_db_connection()
+    try:
+        report['overlaps'] = count_overlaps(conn, halls[0][0], args.cleaning_gap)
+    finally:
+        conn.close()
+    print_report(report)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""Час старту: ініціалізація порожньої ("холодної") і готової ("теплої") бази даних
+
+- init_cold: init_database() на новій базі (таблиці, міграції, тестові дані);
+- init_warm: повторні init_database() на готовій базі, кожен раз з новим
+  з'єднанням (як у нового процесу-воркера);
+- process_cold / process_warm: повний старт процесу (python -c "import app").
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+import database
+from benchmarks.common import quiet_logging, use_temp_database, summarize, print_report
+
+def time_process_start(database_path):
+    env = dict(os.environ, DATABASE_PATH=database_path,
+               SEAT_HOLD_SWEEP_INTERVAL='0', SQLITE_CHECKPOINT_INTERVAL='0')
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-c', 'import app'], env=env, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--iterations', type=int, default=200, help='повторів теплої ініціалізації')
+    parser.add_argument('--processes', type=int, default=5, help='повторів старту процесу')
+    args = parser.parse_args()
+    
+    quiet_logging()
+    report = {}
+    
+    # use_temp_database вже виконує холодну ініціалізацію - вимірюємо саме її
+    start = time.perf_counter()
+    path = use_temp_database('bench-startup.db')
+    report['init_cold'] = summarize([time.perf_counter() - start], time.perf_counter() - start)
+    
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(args.iterations):
+        database.close_pool()
+        began = time.perf_counter()
+        database.init_database()
+        latencies.append(time.perf_counter() - began)
+    report['init_warm'] = summarize(latencies, time.perf_counter() - start)
+    database.close_pool()
+    
+    if args.processes:
+        cold, warm = [], []
+        for index in range(args.processes):
+            cold_path = os.path.join(os.path.dirname(path), f'cold-{index}.db')
+            cold.append(time_process_start(cold_path))
+            warm.append(time_process_start(path))
+        report['process_cold'] = summarize(cold, sum(cold))
+        report['process_warm'] = summarize(warm, sum(warm))
+    
+    print_report(report)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,224 @@
+"""Набір бенчмарків гарячих маршрутів і функцій бази даних
+
+Тимчасова база заповнюється синтетичними даними заданого розміру
+(synthetic_data.generate), після чого:
+- http: Flask test client по маршрутах index, film_details, booking_seats,
+  /api/films, /api/sessions/<id>/seats, /api/book і /profile на кожному
+  рівні паралельності з --concurrency (кожен потік - окремий клієнт);
+- db: мікробенчмарки get_available_seats, create_booking,
+  get_booking_by_code і get_user_bookings в одному потоці (бронювання -
+  лише на вільні місця; будь-яка відмова - помилка, код виходу 1).
+Звіт - JSON з p50/p95/p99 і пропускною здатністю (--output зберігає його у
+файл для порівняння прогонів). Сторінки афіші віддаються з кешу сторінок,
+як і в роботі; черга на сеанс вимкнена, щоб міряти самі маршрути.
+"""
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+
+import database
+import synthetic_data
+import waiting_room
+from benchmarks.common import quiet_logging, use_temp_database, summarize, print_report
+
+PROFILE_EMAIL = 'anna.petrova@gmail.com'
+PROFILE_PASSWORD = 'anna123'
+ENDPOINTS = ('index', 'film_details', 'booking_seats', 'api_films', 'api_session_seats', 'api_book', 'profile')
+
+def build_database(args):
+    """Тимчасова база з тестовими і синтетичними даними; повертає дані для запитів"""
+    use_temp_database('bench-suite.db')
+    conn = database.get_db_connection()
+    try:
+        report = synthetic_data.generate(
+            conn, films=args.films, halls=args.halls, seats_per_hall=args.seats_per_hall,
+            sessions=args.sessions, bookings=args.bookings, seed=args.seed,
+        )
+        # Частина історії - користувачу, під яким відкривається /profile
+        conn.execute("""
+            UPDATE bookings SET customer_email = ?
+            WHERE id IN (SELECT id FROM bookings ORDER BY id DESC LIMIT ?)
+        """, (PROFILE_EMAIL, args.profile_bookings))
+        conn.commit()
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        context = {
+            'film_ids': [row[0] for row in cursor.execute("SELECT id FROM films")],
+            'sessions': [(row[0], row[1]) for row in cursor.execute("SELECT id, hall_id FROM sessions")],
+            'booking_codes': [row[0] for row in cursor.execute(
+                "SELECT booking_code FROM bookings ORDER BY id DESC LIMIT 10000")],
+            'user_id': cursor.execute("SELECT id FROM users WHERE email = ?", (PROFILE_EMAIL,)).fetchone()[0],
+        }
+        context['seats'] = {}
+        for seat_id, hall_id in cursor.execute("SELECT id, hall_id FROM seats"):
+            context['seats'].setdefault(hall_id, []).append(seat_id)
+    finally:
+        conn.close()
+    return report, context
+
+def booking_payload(rnd, context):
+    session_id, hall_id = rnd.choice(context['sessions'])
+    return {
+        'session_id': session_id,
+        'customer_email': 'bench@example.com',
+        'customer_name': 'Бенчмарк',
+        'selected_seats': rnd.sample(context['seats'][hall_id], 2),
+    }
+
+def make_request(client, endpoint, rnd, context):
+    """Виконати один запит до маршруту endpoint; повертає статус відповіді"""
+    if endpoint == 'index':
+        return client.get('/').status_code
+    if endpoint == 'film_details':
+        return client.get(f"/film/{rnd.choice(context['film_ids'])}").status_code
+    if endpoint == 'booking_seats':
+        return client.get(f"/booking/{rnd.choice(context['sessions'])[0]}").status_code
+    if endpoint == 'api_films':
+        return client.get('/api/films').status_code
+    if endpoint == 'api_session_seats':
+        return client.get(f"/api/sessions/{rnd.choice(context['sessions'])[0]}/seats").status_code
+    if endpoint == 'api_book':
+        return client.post('/api/book', json=booking_payload(rnd, context)).status_code
+    if endpoint == 'profile':
+        return client.get('/profile').status_code
+    raise ValueError(f"Невідомий маршрут: {endpoint}")
+
+def run_http(app, endpoint, concurrency, requests, context, seed):
+    """requests запитів до endpoint, розподілених між concurrency потоками"""
+    per_thread = max(1, requests // concurrency)
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    start_barrier = threading.Barrier(concurrency + 1)
+
+    def worker(index):
+        rnd = random.Random(seed * 1000 + index)
+        client = app.test_client()
+        if endpoint == 'profile':
+            client.post('/login', data={'email': PROFILE_EMAIL, 'password': PROFILE_PASSWORD})
+        local = []
+        failed = 0
+        start_barrier.wait()
+        for _ in range(per_thread):
+            began = time.perf_counter()
+            status = make_request(client, endpoint, rnd, context)
+            local.append(time.perf_counter() - began)
+            # Зайняте місце при бронюванні - очікувана відмова (400), а не помилка
+            if status >= 500:
+                failed += 1
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    start_barrier.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    report = summarize(latencies, time.perf_counter() - started)
+    report['errors'] = errors[0]
+    return report
+
+def measure(func, samples):
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(samples):
+        began = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - began)
+    return summarize(latencies, time.perf_counter() - started)
+
+def measure_bookings(rnd, context, samples):
+    """create_booking на вільні місця: затримки лише успішних бронювань, відмови окремо
+
+    Вільні місця вибираються до початку вимірювання (get_available_seats),
+    тож відмова - справжня помилка, а не швидке "місце зайняте", яке
+    занижувало б середню затримку.
+    """
+    latencies = []
+    failures = {}
+    started = time.perf_counter()
+    for _ in range(samples):
+        session_id, _ = rnd.choice(context['sessions'])
+        free = [seat['id'] for seat in database.get_available_seats(session_id) if seat['is_available']]
+        if len(free) < 2:
+            continue
+        seats = rnd.sample(free, 2)
+        began = time.perf_counter()
+        try:
+            database.create_booking(session_id, 'bench@example.com', 'Бенчмарк', seats)
+        except Exception as e:
+            failures[str(e)] = failures.get(str(e), 0) + 1
+            continue
+        latencies.append(time.perf_counter() - began)
+    report = summarize(latencies, sum(latencies) or time.perf_counter() - started)
+    report['errors'] = sum(failures.values())
+    if failures:
+        report['error_messages'] = failures
+    return report
+
+def run_db(context, samples, seed):
+    rnd = random.Random(seed)
+    return {
+        'get_available_seats': measure(lambda: database.get_available_seats(rnd.choice(context['sessions'])[0]),
+                                       samples),
+        'create_booking': measure_bookings(rnd, context, samples),
+        'get_booking_by_code': measure(lambda: database.get_booking_by_code(rnd.choice(context['booking_codes'])),
+                                       samples),
+        'get_user_bookings': measure(lambda: database.get_user_bookings(context['user_id']), samples),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--films', type=int, default=50)
+    parser.add_argument('--halls', type=int, default=20)
+    parser.add_argument('--seats-per-hall', type=int, default=150)
+    parser.add_argument('--sessions', type=int, default=2000)
+    parser.add_argument('--bookings', type=int, default=100000, help='історичних бронювань')
+    parser.add_argument('--profile-bookings', type=int, default=200, help='з них - у користувача /profile')
+    parser.add_argument('--concurrency', default='1,8', help='рівні паралельності через кому')
+    parser.add_argument('--requests', type=int, default=400, help='запитів на маршрут і рівень')
+    parser.add_argument('--samples', type=int, default=1000, help='викликів кожної функції БД')
+    parser.add_argument('--endpoints', default=','.join(ENDPOINTS))
+    parser.add_argument('--skip-http', action='store_true')
+    parser.add_argument('--skip-db', action='store_true')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='зберегти звіт JSON у файл')
+    args = parser.parse_args()
+
+    quiet_logging()
+    started = time.perf_counter()
+    dataset, context = build_database(args)
+    report = {
+        'dataset': dataset,
+        'generate_sec': round(time.perf_counter() - started, 2),
+        'http': {},
+    }
+
+    if not args.skip_http:
+        from app import app  # після підміни DATABASE_PATH
+        waiting_room.set_backend(waiting_room.OpenWaitingRoom())
+        for endpoint in args.endpoints.split(','):
+            report['http'][endpoint] = {
+                concurrency: run_http(app, endpoint, concurrency, args.requests, context, args.seed)
+                for concurrency in (int(value) for value in args.concurrency.split(','))
+            }
+    if not args.skip_db:
+        report['db'] = run_db(context, args.samples, args.seed)
+
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    errors = report.get('db', {}).get('create_booking', {}).get('errors', 0)
+    if errors:
+        print(f"Помилки create_booking: {errors} - результати бронювання недійсні", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
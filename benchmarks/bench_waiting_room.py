@@ -0,0 +1,118 @@
+"""Навантажувальний тест віртуальної черги на сеанс з великим попитом
+
+--threads потоків безперервно імітують нових покупців одного сеансу: кожен
+відкриває сторінку вибору місць, за 429 чекає Retry-After (помножений на
+--retry-scale) і опитує позицію в черзі, а пропущений - бронює випадкове
+місце (за невдачі - інше, до 5 спроб) і одразу скасовує бронювання, щоб
+місця не закінчувались.
+
+Прогін виконується двічі: без черги (off) і з чергою на --concurrency
+покупців. Для обох режимів звітуються затримки сторінки й бронювання
+(p50/p95/p99), опитування черги, відповідей 429, кількість успішних
+бронювань за секунду і невдалих спроб.
+"""
+import argparse
+import random
+import threading
+import time
+
+import database
+import waiting_room
+from benchmarks.common import quiet_logging, use_temp_database, summarize, print_report
+
+def run(client_factory, session_id, seat_ids, threads, duration, retry_scale):
+    latencies = {'page': [], 'book': [], 'queue': [], 'rejected': []}
+    counters = {'booked': 0, 'failed': 0}
+    lock = threading.Lock()
+    start_barrier = threading.Barrier(threads)
+    deadline = [0.0]
+
+    def timed(kind, call):
+        began = time.perf_counter()
+        response = call()
+        elapsed = time.perf_counter() - began
+        with lock:
+            latencies['rejected' if response.status_code == 429 and kind != 'queue' else kind].append(elapsed)
+        return response
+
+    def worker(seed):
+        rnd = random.Random(seed)
+        start_barrier.wait()
+        while time.perf_counter() < deadline[0]:
+            client = client_factory()  # новий покупець - нова cookie
+            response = timed('page', lambda: client.get(f'/booking/{session_id}'))
+            queued = False
+            while response.status_code == 429 and time.perf_counter() < deadline[0]:
+                queued = True
+                time.sleep(int(response.headers.get('Retry-After', 1)) * retry_scale)
+                response = timed('queue', lambda: client.get(f'/api/sessions/{session_id}/queue'))
+                if response.get_json()['status'] != 'admitted':
+                    response.status_code = 429
+            if response.status_code != 200:
+                continue
+            if queued:
+                # Сторінка з черги перезавантажується, коли покупця пропустили
+                timed('page', lambda: client.get(f'/booking/{session_id}'))
+            # Якщо місце вже зайняли, покупець обирає інше
+            for _ in range(5):
+                payload = {'session_id': session_id, 'customer_email': f'load{seed}@example.com',
+                           'customer_name': 'Load Test', 'selected_seats': [rnd.choice(seat_ids)]}
+                response = timed('book', lambda: client.post('/api/book', json=payload))
+                data = response.get_json() or {}
+                if response.status_code == 200 and data.get('success'):
+                    client.post(f"/api/cancel-booking/{data['booking_code']}")
+                    with lock:
+                        counters['booked'] += 1
+                    break
+                with lock:
+                    counters['failed'] += 1
+
+    workers = [threading.Thread(target=worker, args=(seed,)) for seed in range(threads)]
+    start = time.perf_counter()
+    deadline[0] = start + duration
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return {
+        'page': summarize(latencies['page'], elapsed),
+        'book': summarize(latencies['book'], elapsed),
+        'queue_poll': summarize(latencies['queue'], elapsed),
+        'rejected_429': summarize(latencies['rejected'], elapsed),
+        'bookings_per_sec': round(counters['booked'] / elapsed, 1),
+        'failed_attempts': counters['failed'],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--threads', type=int, default=64, help='одночасних покупців')
+    parser.add_argument('--concurrency', type=int, default=8, help='покупців усередині сеансу з чергою')
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--retry-scale', type=float, default=0.1,
+                        help='множник Retry-After (секунди -> менше, щоб прогін був коротким)')
+    args = parser.parse_args()
+
+    quiet_logging()
+    use_temp_database('bench-waiting-room.db')
+    from app import app  # після підміни DATABASE_PATH
+
+    session_id = 1
+    seat_ids = [seat['id'] for seat in database.get_available_seats(session_id)]
+    report = {'threads': args.threads, 'duration_sec': args.duration}
+
+    waiting_room.set_backend(waiting_room.OpenWaitingRoom())
+    report['off'] = run(app.test_client, session_id, seat_ids, args.threads, args.duration, args.retry_scale)
+
+    waiting_room.set_backend(waiting_room.MemoryWaitingRoom(
+        concurrency=args.concurrency, queue_size=args.threads * 2, pass_ttl=60, queue_ttl=30, retry_after=1,
+    ))
+    report['waiting_room'] = run(app.test_client, session_id, seat_ids, args.threads, args.duration,
+                                 args.retry_scale)
+    report['waiting_room']['concurrency'] = args.concurrency
+    report['waiting_room']['stats'] = waiting_room.get_backend().stats()
+
+    print_report(report)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""Пропускна здатність читання місць під час паралельних бронювань
+
+Порівнює журнал DELETE (старий режим) з WAL: читачі безперервно викликають
+get_available_seats, а записувачі створюють та скасовують бронювання.
+"""
+import argparse
+import random
+import threading
+import time
+
+from config import Config
+import database
+from benchmarks.common import quiet_logging, use_temp_database, summarize, print_report
+
+def run(journal_mode, duration, readers, writers):
+    Config.SQLITE_JOURNAL_MODE = journal_mode
+    use_temp_database(f'bench-{journal_mode.lower()}.db')
+    
+    conn = database.get_db_connection()
+    try:
+        session_ids = [row['id'] for row in conn.execute("SELECT id FROM sessions")]
+    finally:
+        conn.close()
+    
+    stop = threading.Event()
+    read_latencies = []
+    write_latencies = []
+    counters = {'read_errors': 0, 'write_errors': 0}
+    lock = threading.Lock()
+    
+    def reader():
+        rnd = random.Random()
+        local = []
+        errors = 0
+        while not stop.is_set():
+            start = time.perf_counter()
+            seats = database.get_available_seats(rnd.choice(session_ids))
+            local.append(time.perf_counter() - start)
+            if not seats:
+                errors += 1  # get_available_seats повертає [] при "database is locked"
+        with lock:
+            read_latencies.extend(local)
+            counters['read_errors'] += errors
+    
+    def writer():
+        rnd = random.Random()
+        local = []
+        errors = 0
+        while not stop.is_set():
+            session_id = rnd.choice(session_ids)
+            free = [s['id'] for s in database.get_available_seats(session_id) if s['is_available']]
+            if not free:
+                continue
+            start = time.perf_counter()
+            try:
+                code = database.create_booking(session_id, 'bench@cinema.com', 'Бенчмарк',
+                                               rnd.sample(free, min(2, len(free))))
+                database.cancel_booking(code)
+            except Exception:
+                errors += 1
+            local.append(time.perf_counter() - start)
+        with lock:
+            write_latencies.extend(local)
+            counters['write_errors'] += errors
+    
+    threads = [threading.Thread(target=reader) for _ in range(readers)]
+    threads += [threading.Thread(target=writer) for _ in range(writers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    database.close_pool()
+    
+    return {
+        'journal_mode': journal_mode,
+        'reads': summarize(read_latencies, elapsed),
+        'writes': summarize(write_latencies, elapsed),
+        **counters,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--duration', type=float, default=5.0)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--modes', default='DELETE,WAL')
+    args = parser.parse_args()
+    
+    quiet_logging()
+    report = [run(mode.strip().upper(), args.duration, args.readers, args.writers)
+              for mode in args.modes.split(',')]
+    print_report(report)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+"""Спільні утиліти для бенчмарків
+
+Запуск з кореня проєкту, наприклад: python -m benchmarks.bench_wal
+"""
+import json
+import logging
+import os
+import tempfile
+
+from config import Config
+import database
+
+def quiet_logging():
+    """Прибрати INFO/ERROR логи бази даних, щоб не спотворювати вимірювання"""
+    logging.getLogger('database').setLevel(logging.CRITICAL)
+
+def use_temp_database(name='bench.db'):
+    """Перемкнути Config.DATABASE_PATH на нову тимчасову БД і ініціалізувати її"""
+    directory = tempfile.mkdtemp(prefix='cinema-bench-')
+    path = os.path.join(directory, name)
+    Config.DATABASE_PATH = path
+    database.init_database()
+    return path
+
+def percentile(sorted_values, p):
+    """Перцентиль (0-100) з відсортованого списку"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(p / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def summarize(latencies, elapsed):
+    """Зведення затримок (в секундах) у мілісекунди та пропускну здатність"""
+    values = sorted(latencies)
+    count = len(values)
+    return {
+        'count': count,
+        'throughput_per_sec': round(count / elapsed, 1) if elapsed > 0 else 0.0,
+        'mean_ms': round(sum(values) / count * 1000, 3) if count else 0.0,
+        'p50_ms': round(percentile(values, 50) * 1000, 3),
+        'p95_ms': round(percentile(values, 95) * 1000, 3),
+        'p99_ms': round(percentile(values, 99) * 1000, 3),
+    }
+
+def print_report(report):
+    print(json.dumps(report, ensure_ascii=False, indent=2))
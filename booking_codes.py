@@ -0,0 +1,68 @@
+"""Коди бронювання без пошуку в базі даних
+
+Код - Config.BOOKING_CODE_PREFIX і Config.BOOKING_CODE_DIGITS цифр, отриманих
+з порядкового номера бронювання (лічильник у таблиці sequences) ключовою
+десятковою перестановкою Фейстеля. Перестановка бієктивна, тому різні номери
+завжди дають різні коди і перевіряти код на унікальність не потрібно. Без
+ключа за одним кодом не вгадати сусідні.
+
+Ключ не можна змінювати після видачі кодів: інша перестановка може повторити
+вже виданий код (останнім захистом лишається UNIQUE на bookings.booking_code).
+"""
+import functools
+import hashlib
+import hmac
+
+from config import Config
+
+class FeistelCodec:
+    """Ключова перестановка чисел [0, 10^digits) для парної кількості цифр
+
+    Число ділиться на дві десяткові половини, кожен раунд додає до однієї з них
+    (за модулем 10^(digits/2)) HMAC-SHA256 від іншої.
+    """
+
+    def __init__(self, key, digits=10, rounds=4):
+        if digits <= 0 or digits % 2:
+            raise ValueError("Кількість цифр коду має бути додатною і парною")
+        self.digits = digits
+        self.half = 10 ** (digits // 2)
+        self.size = self.half * self.half
+        self.rounds = rounds
+        self.key = key.encode('utf-8') if isinstance(key, str) else key
+        # HMAC з уже обробленим ключем: раунд лише копіює його стан
+        self._mac = hmac.new(self.key, digestmod=hashlib.sha256)
+
+    def _round(self, index, value):
+        mac = self._mac.copy()
+        mac.update(f'{index}:{value}'.encode('ascii'))
+        digest = mac.digest()
+        return int.from_bytes(digest[:8], 'big') % self.half
+
+    def encode(self, number):
+        """Номер -> число коду"""
+        if not 0 <= number < self.size:
+            raise ValueError(f"Номер {number} поза межами простору кодів ({self.size})")
+        left, right = divmod(number, self.half)
+        for index in range(self.rounds):
+            left, right = right, (left + self._round(index, right)) % self.half
+        return left * self.half + right
+
+    def decode(self, value):
+        """Число коду -> номер (обернена перестановка)"""
+        if not 0 <= value < self.size:
+            raise ValueError(f"Код {value} поза межами простору кодів ({self.size})")
+        left, right = divmod(value, self.half)
+        for index in reversed(range(self.rounds)):
+            left, right = (right - self._round(index, left)) % self.half, left
+        return left * self.half + right
+
+@functools.lru_cache(maxsize=4)
+def _get_codec(key, digits):
+    return FeistelCodec(key, digits)
+
+def format_booking_code(number):
+    """Код бронювання для порядкового номера"""
+    digits = Config.BOOKING_CODE_DIGITS
+    value = _get_codec(Config.BOOKING_CODE_KEY, digits).encode(number)
+    return f'{Config.BOOKING_CODE_PREFIX}{value:0{digits}d}'
@@ -0,0 +1,321 @@
+"""Read-through кеш для даних каталогу (фільми, сеанси)
+
+Функції database.py, результат яких змінюється лише при оновленні афіші,
+обгортаються декоратором @cached(namespace). Після зміни даних викликається
+invalidate(namespace): номер версії простору імен збільшується, і всі старі
+записи стають недосяжними (їх з часом витіснить LRU або TTL).
+
+Версії зберігає VersionStore. database.py підключає DatabaseVersions -
+таблицю cache_versions у спільній базі, тож зміна з CLI-команди чи іншого
+воркера одразу робить недійсними записи (і ETag сторінок) усіх процесів, а
+FileCache на спільному диску справді спільний. Без бази (за замовчуванням)
+версії живуть у пам'яті процесу (LocalVersions) і годяться лише для одного
+процесу.
+
+Значення з кешу спільні для всіх запитів - їх не можна змінювати.
+"""
+import functools
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from config import Config
+
+# Маркер відсутнього значення (None теж може бути значенням)
+MISSING = object()
+
+class CacheBackend:
+    """Інтерфейс сховища кешу"""
+
+    def get(self, key):
+        """Повернути значення або MISSING"""
+        raise NotImplementedError
+
+    def set(self, key, value, ttl):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def stats(self):
+        return {}
+
+class MemoryCache(CacheBackend):
+    """Кеш у пам'яті процесу з TTL та витісненням LRU"""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return MISSING
+            expires_at, value = item
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                return MISSING
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'backend': 'memory',
+                'entries': len(self._data),
+                'max_entries': self.max_entries,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
+
+class DictCache(CacheBackend):
+    """Найпростіший кеш на словнику без TTL і обмежень (для тестів)"""
+
+    def __init__(self):
+        self._data = {}
+
+    def get(self, key):
+        return self._data.get(key, MISSING)
+
+    def set(self, key, value, ttl):
+        self._data[key] = value
+
+    def delete(self, key):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+    def stats(self):
+        return {'backend': 'dict', 'entries': len(self._data)}
+
+class FileCache(CacheBackend):
+    """Кеш у файлах (pickle) - переживає перезапуск процесу"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.expirations = 0
+
+    def _path(self, key):
+        digest = hashlib.sha256(repr(key).encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, digest + '.pickle')
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                expires_at, value = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return MISSING
+        if expires_at <= time.time():
+            self.expirations += 1
+            self.delete(key)
+            return MISSING
+        return value
+
+    def set(self, key, value, ttl):
+        # Запис у тимчасовий файл і атомарна заміна, щоб читач не побачив половину
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump((time.time() + ttl, value), f)
+        os.replace(tmp_path, self._path(key))
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            if name.endswith('.pickle'):
+                os.remove(os.path.join(self.directory, name))
+
+    def stats(self):
+        entries = sum(1 for name in os.listdir(self.directory) if name.endswith('.pickle'))
+        return {
+            'backend': 'file',
+            'directory': self.directory,
+            'entries': entries,
+            'expirations': self.expirations,
+        }
+
+def create_backend(name=None):
+    """Створити сховище за назвою з Config.CACHE_BACKEND"""
+    name = (name or Config.CACHE_BACKEND).lower()
+    if name == 'memory':
+        return MemoryCache(Config.CACHE_MAX_ENTRIES)
+    if name == 'dict':
+        return DictCache()
+    if name == 'file':
+        return FileCache(Config.CACHE_DIR)
+    raise ValueError(f"Невідомий тип кешу: {name}")
+
+class VersionStore:
+    """Сховище версій просторів імен кешу"""
+
+    def get(self, namespace):
+        """(версія, час останньої зміни в unix time)"""
+        raise NotImplementedError
+
+    def bump(self, namespace, conn=None):
+        """Збільшити версію; conn - з'єднання БД, у транзакції якого змінено дані"""
+        raise NotImplementedError
+
+    def stats(self):
+        return {}
+
+class LocalVersions(VersionStore):
+    """Версії в пам'яті процесу для не більше ніж max_namespaces просторів імен
+
+    Найдавніше використаний простір витісняється; повернувшись, він
+    отримує версію, більшу за всі витіснені раніше, тож його старі записи
+    й ETag не оживають.
+    """
+
+    def __init__(self, max_namespaces=None):
+        self.max_namespaces = max_namespaces or Config.CACHE_MAX_NAMESPACES
+        self._versions = OrderedDict()  # namespace -> (версія, час зміни), LRU
+        self._floor = 0                 # версія нового простору: більша за всі витіснені
+        self._lock = threading.Lock()
+
+    def _touch(self, namespace):
+        item = self._versions.get(namespace)
+        if item is not None:
+            self._versions.move_to_end(namespace)
+            return item
+        self._versions[namespace] = item = (self._floor, time.time())
+        while len(self._versions) > self.max_namespaces:
+            _, (evicted_version, _) = self._versions.popitem(last=False)
+            self._floor = max(self._floor, evicted_version + 1)
+        return item
+
+    def get(self, namespace):
+        with self._lock:
+            return self._touch(namespace)
+
+    def bump(self, namespace, conn=None):
+        with self._lock:
+            version, _ = self._touch(namespace)
+            self._versions[namespace] = (version + 1, time.time())
+
+    def stats(self):
+        with self._lock:
+            return {'store': 'local', 'namespaces': len(self._versions), 'max_namespaces': self.max_namespaces}
+
+_backend = None
+_lock = threading.Lock()
+_version_store = LocalVersions()
+_counters = {}  # namespace -> {'hits': ..., 'misses': ...} (статистика процесу)
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        with _lock:
+            if _backend is None:
+                _backend = create_backend()
+    return _backend
+
+def set_backend(backend):
+    """Підмінити сховище (наприклад, DictCache у тестах)"""
+    global _backend
+    with _lock:
+        _backend = backend
+
+def set_version_store(store):
+    """Підмінити сховище версій (database.py підключає DatabaseVersions)"""
+    global _version_store
+    _version_store = store
+
+def get_version_info(namespace):
+    """(версія, час останньої зміни) простору імен"""
+    return _version_store.get(namespace)
+
+def get_version(namespace):
+    """Поточна версія даних простору імен"""
+    return _version_store.get(namespace)[0]
+
+def get_version_time(namespace):
+    """Час (unix) останньої інвалідації простору імен"""
+    return _version_store.get(namespace)[1]
+
+def invalidate(namespace, conn=None):
+    """Зробити недійсними всі записи простору імен
+
+    Якщо conn передано в незавершеній транзакції, нова версія фіксується
+    разом з нею.
+    """
+    _version_store.bump(namespace, conn)
+
+def count_access(namespace, counter):
+    """Збільшити лічильник статистики (hits, misses, ...) простору імен"""
+    with _lock:
+        counters = _counters.setdefault(namespace, {'hits': 0, 'misses': 0})
+        counters[counter] = counters.get(counter, 0) + 1
+
+def utc_today():
+    # SQLite date('now') рахує дату в UTC, тому ключ теж
+    return time.strftime('%Y-%m-%d', time.gmtime())
+
+def cached(namespace, ttl=None):
+    """Декоратор read-through кешу для функцій читання
+
+    Ключ включає версію простору імен і поточну дату (запити каталогу
+    фільтрують сеанси за date('now')). Порожні результати (None, []) не
+    кешуються, щоб тимчасова помилка БД не віддавалась увесь TTL.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = (namespace, get_version(namespace), utc_today(), func.__name__,
+                   args, tuple(sorted(kwargs.items())))
+            backend = get_backend()
+            value = backend.get(key)
+            if value is not MISSING:
+                count_access(namespace, 'hits')
+                return value
+            count_access(namespace, 'misses')
+            value = func(*args, **kwargs)
+            if value:
+                backend.set(key, value, ttl or Config.CACHE_TTL)
+            return value
+        wrapper.uncached = func
+        return wrapper
+    return decorator
+
+def get_stats():
+    """Статистика попадань/промахів по просторах імен і стан сховища"""
+    with _lock:
+        namespaces = {namespace: dict(counters) for namespace, counters in _counters.items()}
+    for namespace, counters in namespaces.items():
+        counters['version'] = get_version(namespace)
+    return {'namespaces': namespaces, 'versions': _version_store.stats(), 'backend': get_backend().stats()}
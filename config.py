@@ -3,15 +3,128 @@ import os
 class Config:
     # SQLite налаштування
     DATABASE_PATH = os.environ.get('DATABASE_PATH', 'cinema.db')
+    # Додавати тестові дані при старті (один раз для кожної версії); інакше - flask seed-db
+    AUTO_SEED_DATABASE = os.environ.get('AUTO_SEED_DATABASE', 'true').lower() in ('1', 'true', 'yes')
+    # Фонові потоки процесу (checkpoint WAL, прибирання утримань, зведення аналітики);
+    # стартують перед першим запитом, а не при імпорті застосунку
+    START_BACKGROUND_WORKERS = os.environ.get('START_BACKGROUND_WORKERS', 'true').lower() in ('1', 'true', 'yes')
+    
+    # Пул з'єднань: скільки простоюючих з'єднань тримати відкритими
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 8))
+    # Через скільки секунд простою з'єднання перевіряється перед видачею
+    DB_POOL_HEALTH_CHECK_INTERVAL = float(os.environ.get('DB_POOL_HEALTH_CHECK_INTERVAL', 30))
+    
+    # PRAGMA, які застосовуються до кожного нового з'єднання
+    # WAL дозволяє читачам працювати паралельно з записом бронювань
+    SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+    # Скільки мілісекунд чекати на блокування замість "database is locked"
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+    # Від'ємне значення - розмір кешу в КБ
+    SQLITE_CACHE_SIZE = int(os.environ.get('SQLITE_CACHE_SIZE', -20000))
+    SQLITE_TEMP_STORE = os.environ.get('SQLITE_TEMP_STORE', 'MEMORY')
+    
+    # Політика контрольних точок WAL
+    SQLITE_WAL_AUTOCHECKPOINT = int(os.environ.get('SQLITE_WAL_AUTOCHECKPOINT', 1000))
+    # Інтервал фонового checkpoint у секундах (0 - вимкнено)
+    SQLITE_CHECKPOINT_INTERVAL = float(os.environ.get('SQLITE_CHECKPOINT_INTERVAL', 60))
+    # Розмір WAL-файлу, після якого виконується TRUNCATE checkpoint
+    SQLITE_CHECKPOINT_TRUNCATE_BYTES = int(os.environ.get('SQLITE_CHECKPOINT_TRUNCATE_BYTES', 64 * 1024 * 1024))
     
     # Секретний ключ для Flask
     SECRET_KEY = os.environ.get('SECRET_KEY', 'cinema-secret-key-2024')
     
+    # Коди бронювання: префікс + цифри (парна кількість), отримані з лічильника
+    # ключовою перестановкою. Ключ не можна змінювати після видачі перших кодів.
+    BOOKING_CODE_PREFIX = 'CINEMA'
+    BOOKING_CODE_DIGITS = int(os.environ.get('BOOKING_CODE_DIGITS', 10))
+    BOOKING_CODE_KEY = os.environ.get('BOOKING_CODE_KEY', SECRET_KEY)
+    # Скільки секунд зберігається результат запиту з заголовком Idempotency-Key
+    IDEMPOTENCY_KEY_TTL = int(os.environ.get('IDEMPOTENCY_KEY_TTL', 24 * 60 * 60))
+    
     # Налаштування безпеки
     DEBUG = os.environ.get('DEBUG', False)
     
+    # Декларативні схеми залів (ряди, проходи, категорії місць)
+    HALL_LAYOUTS_PATH = os.environ.get(
+        'HALL_LAYOUTS_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'hall_layouts.json')
+    )
+    
+    # Розміри сторінок профілю: бронювання і непрочитані сповіщення
+    PROFILE_BOOKINGS_PAGE_SIZE = int(os.environ.get('PROFILE_BOOKINGS_PAGE_SIZE', 20))
+    NOTIFICATIONS_PAGE_SIZE = int(os.environ.get('NOTIFICATIONS_PAGE_SIZE', 20))
+    # Розмір сторінки результатів пошуку фільмів
+    FILM_SEARCH_PAGE_SIZE = int(os.environ.get('FILM_SEARCH_PAGE_SIZE', 20))
+    # Найбільший розмір сторінки, який можна запросити через ?limit=
+    MAX_PAGE_SIZE = int(os.environ.get('MAX_PAGE_SIZE', 100))
+    
     # Максимальна кількість місць за бронювання
-    MAX_SEATS_PER_BOOKING = 10
+    MAX_SEATS_PER_BOOKING = int(os.environ.get('MAX_SEATS_PER_BOOKING', 10))
+    
+    # Скільки секунд місце утримується за покупцем, поки він заповнює форму
+    SEAT_HOLD_TTL = int(os.environ.get('SEAT_HOLD_TTL', 600))
+    # Як часто (сек) фоновий потік прибирає прострочені утримання (0 - вимкнено)
+    SEAT_HOLD_SWEEP_INTERVAL = float(os.environ.get('SEAT_HOLD_SWEEP_INTERVAL', 30))
+    SEAT_HOLD_SWEEP_BATCH = int(os.environ.get('SEAT_HOLD_SWEEP_BATCH', 500))
+    
+    # Жива схема місць (Server-Sent Events)
+    SEAT_EVENTS_QUEUE_SIZE = int(os.environ.get('SEAT_EVENTS_QUEUE_SIZE', 100))
+    # Інтервал keepalive-коментаря, щоб проксі не закривали тихе з'єднання
+    SSE_KEEPALIVE_INTERVAL = float(os.environ.get('SSE_KEEPALIVE_INTERVAL', 15))
+    # Скільки останніх версій схеми місць зберігається для запитів ?since=
+    SEAT_MAP_CHANGE_LOG_SIZE = int(os.environ.get('SEAT_MAP_CHANGE_LOG_SIZE', 1000))
+    
+    # Віртуальна черга на сторінку вибору місць і бронювання: memory або off
+    WAITING_ROOM_BACKEND = os.environ.get('WAITING_ROOM_BACKEND', 'memory')
+    # Скільки покупців одночасно обслуговує один сеанс (0 - без черги)
+    WAITING_ROOM_CONCURRENCY = int(os.environ.get('WAITING_ROOM_CONCURRENCY', 100))
+    # Найбільша довжина черги сеансу; далі - одразу 429
+    WAITING_ROOM_QUEUE_SIZE = int(os.environ.get('WAITING_ROOM_QUEUE_SIZE', 5000))
+    # Перепустка покупця спливає після стількох секунд без запитів
+    WAITING_ROOM_PASS_TTL = float(os.environ.get('WAITING_ROOM_PASS_TTL', SEAT_HOLD_TTL))
+    # Хто не опитує позицію довше за стільки секунд, випадає з черги
+    WAITING_ROOM_QUEUE_TTL = float(os.environ.get('WAITING_ROOM_QUEUE_TTL', 30))
+    # Retry-After (сек) для тих, хто в черзі
+    WAITING_ROOM_RETRY_AFTER = int(os.environ.get('WAITING_ROOM_RETRY_AFTER', 3))
+    
+    # Кеш каталогу (фільми, сеанси): memory, dict або file
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'memory')
+    CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', 1024))
+    # Скільки просторів імен тримає версії в пам'яті процесу (cache.LocalVersions, без бази)
+    CACHE_MAX_NAMESPACES = int(os.environ.get('CACHE_MAX_NAMESPACES', 10000))
+    # Час життя запису в секундах
+    CACHE_TTL = int(os.environ.get('CACHE_TTL', 60))
+    CACHE_DIR = os.environ.get('CACHE_DIR', os.path.join('instance', 'cache'))
+    
+    # Кеш відрендерених сторінок афіші та фільмів (секунди)
+    PAGE_CACHE_TTL = int(os.environ.get('PAGE_CACHE_TTL', 300))
+    # Скільки секунд афіша може показувати застарілу кількість вільних місць
+    # (дані каталогу і сторінки кешуються цими інтервалами, тож найбільше -
+    # удвічі довше). Розпродаж і скасування в розпроданому сеансі оновлюють
+    # афішу одразу.
+    OCCUPANCY_CACHE_TTL = int(os.environ.get('OCCUPANCY_CACHE_TTL', 30))
+    # Сторінка вибору місць живе коротше: її ключ - версія схеми місць сеансу
+    BOOKING_PAGE_CACHE_TTL = int(os.environ.get('BOOKING_PAGE_CACHE_TTL', 30))
+    
+    # Вивантаження бронювань: рядків на один fetchmany і на одну частину відповіді
+    EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', 1000))
+    
+    # Зведення аналітики продажів: інтервал фонового оновлення (0 - вимкнено,
+    # лише flask rollup-analytics) і бронювань на одну транзакцію оновлення
+    ANALYTICS_ROLLUP_INTERVAL = float(os.environ.get('ANALYTICS_ROLLUP_INTERVAL', 60))
+    ANALYTICS_ROLLUP_BATCH = int(os.environ.get('ANALYTICS_ROLLUP_BATCH', 10000))
+    # Рахувати теплову карту через NumPy, якщо його встановлено
+    ANALYTICS_USE_NUMPY = os.environ.get('ANALYTICS_USE_NUMPY', 'true').lower() in ('1', 'true', 'yes')
+    
+    # Генератор розкладу: години роботи (закриття раніше за відкриття - після
+    # півночі), прибирання між сеансами і крок часу початку (хвилини)
+    SCHEDULE_OPENING = os.environ.get('SCHEDULE_OPENING', '10:00')
+    SCHEDULE_CLOSING = os.environ.get('SCHEDULE_CLOSING', '23:30')
+    SCHEDULE_CLEANING_GAP = int(os.environ.get('SCHEDULE_CLEANING_GAP', 20))
+    SCHEDULE_STEP = int(os.environ.get('SCHEDULE_STEP', 5))
+    # Ціна квитка за типом залу (невідомий тип - як 2D)
+    SCHEDULE_PRICES = {'2D': 120.0, '3D': 150.0, 'IMAX': 180.0, 'VIP': 200.0}
     
     # Папка для статичних файлів
     STATIC_FOLDER = 'static'
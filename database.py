@@ -1,119 +1,973 @@
 import sqlite3
 import os
-import random
-import string
+import re
+import secrets
+import threading
+import time
 from config import Config
+import cache
+from booking_codes import format_booking_code
+from hall_layouts import HallLayout, load_definitions
+from pagination import decode_cursor, encode_cursor, make_page
+from events import seat_events
 import logging
+from flask import g, has_app_context
 from werkzeug.security import generate_password_hash
 
 logger = logging.getLogger(__name__)
 
+_JOURNAL_MODES = {'DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF'}
+_SYNCHRONOUS_MODES = {'OFF', 'NORMAL', 'FULL', 'EXTRA'}
+_TEMP_STORE_MODES = {'DEFAULT', 'FILE', 'MEMORY'}
+
+def _choice(value, allowed, name):
+    value = str(value).upper()
+    if value not in allowed:
+        raise ValueError(f"Некоректне значення {name}: {value}")
+    return value
+
+def apply_connection_pragmas(conn):
+    """Налаштувати з'єднання згідно з Config (WAL, кеш, mmap, таймаути)"""
+    journal_mode = _choice(Config.SQLITE_JOURNAL_MODE, _JOURNAL_MODES, 'SQLITE_JOURNAL_MODE')
+    synchronous = _choice(Config.SQLITE_SYNCHRONOUS, _SYNCHRONOUS_MODES, 'SQLITE_SYNCHRONOUS')
+    temp_store = _choice(Config.SQLITE_TEMP_STORE, _TEMP_STORE_MODES, 'SQLITE_TEMP_STORE')
+    
+    # busy_timeout першим, щоб зміна journal_mode теж чекала на блокування
+    conn.execute(f"PRAGMA busy_timeout = {int(Config.SQLITE_BUSY_TIMEOUT_MS)}")
+    conn.execute(f"PRAGMA journal_mode = {journal_mode}")
+    conn.execute(f"PRAGMA synchronous = {synchronous}")
+    conn.execute(f"PRAGMA mmap_size = {int(Config.SQLITE_MMAP_SIZE)}")
+    conn.execute(f"PRAGMA cache_size = {int(Config.SQLITE_CACHE_SIZE)}")
+    conn.execute(f"PRAGMA temp_store = {temp_store}")
+    if journal_mode == 'WAL':
+        conn.execute(f"PRAGMA wal_autocheckpoint = {int(Config.SQLITE_WAL_AUTOCHECKPOINT)}")
+
+class PooledConnection(sqlite3.Connection):
+    """SQLite з'єднання, яке при close() повертається в пул замість закриття"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pool = None
+        self.request_bound = False  # З'єднання закріплене за контекстом Flask
+        self.last_used = time.monotonic()
+
+    def close(self):
+        # В межах запиту з'єднання повертається в пул лише в teardown
+        if self.request_bound:
+            return
+        if self.pool is not None:
+            self.pool.release(self)
+        else:
+            self.close_physical()
+
+    def close_physical(self):
+        """Справжнє закриття з'єднання"""
+        super().close()
+
+class ConnectionPool:
+    """Пул теплих SQLite з'єднань для повторного використання"""
+
+    def __init__(self, database_path, size, health_check_interval):
+        self.database_path = database_path
+        self.size = size
+        self.health_check_interval = health_check_interval
+        self._idle = []
+        self._lock = threading.Lock()
+        self._closed = False
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'discarded': 0,
+            'health_checks': 0,
+            'failed_health_checks': 0,
+        }
+
+    def _connect(self):
+        conn = sqlite3.connect(self.database_path, factory=PooledConnection,
+                               check_same_thread=False,
+                               timeout=Config.SQLITE_BUSY_TIMEOUT_MS / 1000)
+        conn.row_factory = sqlite3.Row  # Щоб результати були як словники
+        conn.pool = self
+        apply_connection_pragmas(conn)
+        return conn
+
+    def _is_healthy(self, conn):
+        """Перевірити з'єднання, яке довго простоювало в пулі"""
+        if time.monotonic() - conn.last_used < self.health_check_interval:
+            return True
+        self.stats['health_checks'] += 1
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error as e:
+            self.stats['failed_health_checks'] += 1
+            logger.warning(f"З'єднання з пулу не пройшло перевірку: {str(e)}")
+            return False
+
+    def acquire(self):
+        """Взяти з'єднання з пулу або відкрити нове"""
+        while True:
+            with self._lock:
+                conn = self._idle.pop() if self._idle else None
+                if conn is None:
+                    self.stats['misses'] += 1
+                else:
+                    self.stats['hits'] += 1
+            if conn is None:
+                return self._connect()
+            if self._is_healthy(conn):
+                return conn
+            self._discard(conn)
+
+    def release(self, conn):
+        """Повернути з'єднання в пул"""
+        conn.request_bound = False
+        try:
+            # Незавершена транзакція не повинна потрапити до наступного власника
+            if conn.in_transaction:
+                conn.rollback()
+            conn.row_factory = sqlite3.Row
+        except sqlite3.Error:
+            self._discard(conn)
+            return
+        conn.last_used = time.monotonic()
+        with self._lock:
+            if not self._closed and len(self._idle) < self.size:
+                self._idle.append(conn)
+                return
+        self._discard(conn)
+
+    def _discard(self, conn):
+        with self._lock:
+            self.stats['discarded'] += 1
+        try:
+            conn.close_physical()
+        except sqlite3.Error:
+            pass
+
+    def close_all(self):
+        """Закрити всі простоюючі з'єднання (напр. перед видаленням файлу БД)"""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close_physical()
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats['idle'] = len(self._idle)
+        stats['size'] = self.size
+        stats['database_path'] = self.database_path
+        return stats
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    """Отримати пул для поточного Config.DATABASE_PATH"""
+    global _pool
+    pool = _pool
+    if pool is not None and pool.database_path == Config.DATABASE_PATH:
+        return pool
+    with _pool_lock:
+        if _pool is None or _pool.database_path != Config.DATABASE_PATH:
+            if _pool is not None:
+                _pool.close_all()
+            _pool = ConnectionPool(Config.DATABASE_PATH, Config.DB_POOL_SIZE,
+                                   Config.DB_POOL_HEALTH_CHECK_INTERVAL)
+        return _pool
+
+def close_pool():
+    """Закрити пул з'єднань"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close_all()
+            _pool = None
+
+def get_pool_stats():
+    """Лічильники попадань/промахів пулу з'єднань"""
+    return get_pool().get_stats()
+
+class PeriodicWorker(threading.Thread):
+    """Фоновий daemon-потік, що викликає run_once() кожні interval секунд"""
+
+    def __init__(self, name, interval):
+        super().__init__(name=name, daemon=True)
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.warning(f"Помилка фонового завдання {self.name}: {str(e)}")
+
+    def run_once(self):
+        raise NotImplementedError
+
+    def stop(self):
+        self._stop_event.set()
+
+class WalCheckpointer(PeriodicWorker):
+    """Фоновий потік, що періодично переносить WAL у файл бази даних
+
+    PASSIVE checkpoint не блокує ні читачів, ні записи бронювань. Якщо WAL
+    все ж розрісся (довгі читання не дали checkpoint завершитись), виконується
+    TRUNCATE, щоб файл не ріс безмежно.
+    """
+
+    def __init__(self, database_path, interval, truncate_bytes):
+        super().__init__('wal-checkpointer', interval)
+        self.database_path = database_path
+        self.truncate_bytes = truncate_bytes
+
+    def run_once(self):
+        return self.checkpoint()
+
+    def checkpoint(self):
+        conn = sqlite3.connect(self.database_path, timeout=Config.SQLITE_BUSY_TIMEOUT_MS / 1000)
+        try:
+            busy, wal_pages, moved_pages = conn.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchone()
+            wal_path = self.database_path + '-wal'
+            if os.path.exists(wal_path) and os.path.getsize(wal_path) > self.truncate_bytes:
+                busy, wal_pages, moved_pages = conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+            return busy, wal_pages, moved_pages
+        finally:
+            conn.close()
+
+_checkpointer = None
+
+def start_wal_checkpointer():
+    """Запустити фоновий checkpoint, якщо увімкнено WAL та інтервал > 0"""
+    global _checkpointer
+    if Config.SQLITE_JOURNAL_MODE.upper() != 'WAL' or Config.SQLITE_CHECKPOINT_INTERVAL <= 0:
+        return None
+    if _checkpointer is not None and _checkpointer.is_alive():
+        return _checkpointer
+    _checkpointer = WalCheckpointer(Config.DATABASE_PATH,
+                                    Config.SQLITE_CHECKPOINT_INTERVAL,
+                                    Config.SQLITE_CHECKPOINT_TRUNCATE_BYTES)
+    _checkpointer.start()
+    return _checkpointer
+
+def stop_wal_checkpointer():
+    """Зупинити фоновий checkpoint"""
+    global _checkpointer
+    if _checkpointer is not None:
+        _checkpointer.stop()
+        _checkpointer = None
+
 def get_db_connection():
-    """Підключення до SQLite бази даних"""
-    conn = sqlite3.connect(Config.DATABASE_PATH)
-    conn.row_factory = sqlite3.Row  # Щоб результати були як словники
-    return conn
+    """Підключення до SQLite бази даних (з пулу)
+
+    В контексті Flask одне з'єднання використовується всіма функціями
+    протягом запиту і повертається в пул у close_db_connection().
+    """
+    if has_app_context():
+        conn = g.get('_db_conn')
+        if conn is None:
+            conn = get_pool().acquire()
+            conn.request_bound = True
+            g._db_conn = conn
+        return conn
+    return get_pool().acquire()
+
+def close_db_connection(exception=None):
+    """Повернути з'єднання запиту в пул (teardown_appcontext)"""
+    conn = g.pop('_db_conn', None)
+    if conn is not None:
+        conn.pool.release(conn)
+
+def _migration_hot_path_indexes(conn):
+    """Індекси для найчастіших запитів (місця, бронювання, сповіщення, афіша)"""
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_seats_hall_position ON seats (hall_id, row_number, seat_number)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_bookings_session_status ON bookings (session_id, status)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_bookings_email_created ON bookings (customer_email, created_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_booked_seats_seat_booking ON booked_seats (seat_id, booking_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_notifications_user_read_created ON notifications (user_id, is_read, created_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_date_film ON sessions (session_date, film_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_film_date ON sessions (film_id, session_date)")
+
+def _migration_booked_seats_session(conn):
+    """Унікальність місця в межах сеансу для booked_seats"""
+    conn.execute("ALTER TABLE booked_seats ADD COLUMN session_id INTEGER REFERENCES sessions (id)")
+    # 1 - місце зайняте активним бронюванням, 0 - бронювання скасоване/завершене
+    conn.execute("ALTER TABLE booked_seats ADD COLUMN is_active INTEGER NOT NULL DEFAULT 1")
+    conn.execute("""
+        UPDATE booked_seats
+        SET session_id = (SELECT b.session_id FROM bookings b WHERE b.id = booked_seats.booking_id),
+            is_active = COALESCE((SELECT b.status = 'active' FROM bookings b
+                                  WHERE b.id = booked_seats.booking_id), 0)
+    """)
+    # Якщо місце вже було продане двічі, активним лишається найперше бронювання
+    duplicates = conn.execute("""
+        UPDATE booked_seats SET is_active = 0
+        WHERE is_active = 1 AND id NOT IN (
+            SELECT MIN(id) FROM booked_seats WHERE is_active = 1 GROUP BY session_id, seat_id
+        )
+    """).rowcount
+    if duplicates:
+        logger.warning(f"Знайдено {duplicates} подвійно заброньованих місць, вони деактивовані")
+    # Частковий індекс: скасовані бронювання не блокують місце для нових
+    conn.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_booked_seats_session_seat
+        ON booked_seats (session_id, seat_id) WHERE is_active = 1
+    """)
+
+def _migration_seat_holds(conn):
+    """Тимчасове утримання місць (кошик) з TTL"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS seat_holds (
+            session_id INTEGER NOT NULL,
+            seat_id INTEGER NOT NULL,
+            hold_token TEXT NOT NULL,
+            expires_at REAL NOT NULL,  -- unix time
+            PRIMARY KEY (session_id, seat_id),
+            FOREIGN KEY (session_id) REFERENCES sessions (id),
+            FOREIGN KEY (seat_id) REFERENCES seats (id)
+        )
+    """)
+    # Прибирання прострочених утримань читає лише початок цього індексу
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_seat_holds_expires ON seat_holds (expires_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_seat_holds_token ON seat_holds (hold_token)")
+
+def _migration_seat_map_versions(conn):
+    """Версія схеми місць сеансу та журнал змінених місць для запитів ?since="""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS seat_map_versions (
+            session_id INTEGER PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0,
+            FOREIGN KEY (session_id) REFERENCES sessions (id)
+        )
+    """)
+    # Ключ (session_id, version) - зміни після версії читаються діапазоном індексу
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS seat_map_changes (
+            session_id INTEGER NOT NULL,
+            version INTEGER NOT NULL,
+            seat_id INTEGER NOT NULL,
+            PRIMARY KEY (session_id, version, seat_id)
+        ) WITHOUT ROWID
+    """)
+
+def _migration_sequences(conn):
+    """Лічильники (номери бронювань для кодів)"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS sequences (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        )
+    """)
+
+def _migration_app_meta(conn):
+    """Службові позначки бази даних (версія тестових даних)"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS app_meta (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        )
+    """)
+
+def _migration_seat_categories(conn):
+    """Категорія місця (звичайне, VIP, диван, для людей з інвалідністю)"""
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(seats)")]
+    if 'category' not in columns:
+        conn.execute("ALTER TABLE seats ADD COLUMN category TEXT NOT NULL DEFAULT 'standard'")
+
+def _migration_keyset_indexes(conn):
+    """Індекси для курсорної пагінації сповіщень за (created_at, id)"""
+    # (user_id, is_read, created_at) уже є з міграції 1; для стрічки без
+    # фільтра за is_read потрібен окремий індекс
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_notifications_user_created
+        ON notifications (user_id, created_at)
+    """)
+
+def _migration_notification_engine(conn):
+    """Розсилки всім користувачам і лічильник непрочитаних сповіщень"""
+    # Одна спільна розсилка замість рядка для кожного користувача; прочитання -
+    # позначка (user_id, broadcast_id)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS broadcasts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            type TEXT NOT NULL,
+            title TEXT NOT NULL,
+            message TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    # Спадний індекс: прямий прохід дає (created_at DESC, id ASC) - порядок сторінки
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_broadcasts_created ON broadcasts (created_at DESC)")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS broadcast_reads (
+            user_id INTEGER NOT NULL,
+            broadcast_id INTEGER NOT NULL,
+            PRIMARY KEY (user_id, broadcast_id)
+        ) WITHOUT ROWID
+    """)
+    
+    # Лічильники: непрочитані особисті сповіщення і прочитані розсилки користувача,
+    # загальна кількість розсилок - у sequences. Підтримуються тригерами.
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(users)")]
+    if 'unread_notifications' not in columns:
+        conn.execute("ALTER TABLE users ADD COLUMN unread_notifications INTEGER NOT NULL DEFAULT 0")
+    if 'broadcasts_read' not in columns:
+        conn.execute("ALTER TABLE users ADD COLUMN broadcasts_read INTEGER NOT NULL DEFAULT 0")
+    conn.execute("""
+        UPDATE users SET unread_notifications = (
+            SELECT COUNT(*) FROM notifications n WHERE n.user_id = users.id AND NOT n.is_read
+        )
+    """)
+    conn.execute("INSERT OR IGNORE INTO sequences (name, value) VALUES ('broadcasts', 0)")
+    
+    triggers = [
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_notifications_insert_unread
+        AFTER INSERT ON notifications WHEN NOT NEW.is_read
+        BEGIN
+            UPDATE users SET unread_notifications = unread_notifications + 1 WHERE id = NEW.user_id;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_notifications_update_unread
+        AFTER UPDATE OF is_read ON notifications WHEN (OLD.is_read != 0) != (NEW.is_read != 0)
+        BEGIN
+            UPDATE users SET unread_notifications = unread_notifications
+                + CASE WHEN NEW.is_read THEN -1 ELSE 1 END
+            WHERE id = NEW.user_id;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_notifications_delete_unread
+        AFTER DELETE ON notifications WHEN NOT OLD.is_read
+        BEGIN
+            UPDATE users SET unread_notifications = unread_notifications - 1 WHERE id = OLD.user_id;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_broadcasts_insert
+        AFTER INSERT ON broadcasts
+        BEGIN
+            UPDATE sequences SET value = value + 1 WHERE name = 'broadcasts';
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_broadcasts_delete
+        AFTER DELETE ON broadcasts
+        BEGIN
+            UPDATE sequences SET value = value - 1 WHERE name = 'broadcasts';
+            DELETE FROM broadcast_reads WHERE broadcast_id = OLD.id;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_broadcast_reads_insert
+        AFTER INSERT ON broadcast_reads
+        BEGIN
+            UPDATE users SET broadcasts_read = broadcasts_read + 1 WHERE id = NEW.user_id;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_broadcast_reads_delete
+        AFTER DELETE ON broadcast_reads
+        BEGIN
+            UPDATE users SET broadcasts_read = broadcasts_read - 1 WHERE id = OLD.user_id;
+        END
+        """,
+    ]
+    # executescript завершив би транзакцію міграції, тому по одному
+    for trigger in triggers:
+        conn.execute(trigger)
+
+def _migration_idempotency_keys(conn):
+    """Ключі ідемпотентності для повторних запитів бронювання і скасування"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS idempotency_keys (
+            scope TEXT NOT NULL,
+            key TEXT NOT NULL,
+            fingerprint TEXT NOT NULL,
+            result TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (scope, key)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_idempotency_keys_created ON idempotency_keys (created_at)")
+
+def _migration_session_occupancy(conn):
+    """Лічильники заповненості сеансів (місткість, продано, утримується) для афіші"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS session_occupancy (
+            session_id INTEGER PRIMARY KEY,
+            capacity INTEGER NOT NULL DEFAULT 0,
+            sold INTEGER NOT NULL DEFAULT 0,
+            held INTEGER NOT NULL DEFAULT 0,
+            FOREIGN KEY (session_id) REFERENCES sessions (id)
+        )
+    """)
+    # Сеанси залу - для зміни місткості, коли змінюється схема залу
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_hall_date ON sessions (hall_id, session_date)")
+    
+    # Лічильники ведуть тригери, тож їх оновлюють усі шляхи запису (бронювання,
+    # скасування, утримання, прибирання утримань, синхронізація залів) у тій
+    # самій транзакції, що й зміну. Прострочене утримання рахується, доки його
+    # не прибере SeatHoldSweeper.
+    triggers = [
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_sessions_insert_occupancy
+        AFTER INSERT ON sessions
+        BEGIN
+            INSERT OR REPLACE INTO session_occupancy (session_id, capacity, sold, held)
+            VALUES (NEW.id, (SELECT COUNT(*) FROM seats WHERE hall_id = NEW.hall_id), 0, 0);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_sessions_hall_occupancy
+        AFTER UPDATE OF hall_id ON sessions WHEN OLD.hall_id IS NOT NEW.hall_id
+        BEGIN
+            UPDATE session_occupancy SET capacity = (SELECT COUNT(*) FROM seats WHERE hall_id = NEW.hall_id)
+            WHERE session_id = NEW.id;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_sessions_delete_occupancy
+        AFTER DELETE ON sessions
+        BEGIN
+            DELETE FROM session_occupancy WHERE session_id = OLD.id;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_seats_insert_occupancy
+        AFTER INSERT ON seats
+        BEGIN
+            UPDATE session_occupancy SET capacity = capacity + 1
+            WHERE session_id IN (SELECT id FROM sessions WHERE hall_id = NEW.hall_id);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_seats_delete_occupancy
+        AFTER DELETE ON seats
+        BEGIN
+            UPDATE session_occupancy SET capacity = capacity - 1
+            WHERE session_id IN (SELECT id FROM sessions WHERE hall_id = OLD.hall_id);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_booked_seats_insert_occupancy
+        AFTER INSERT ON booked_seats WHEN NEW.is_active = 1
+        BEGIN
+            UPDATE session_occupancy SET sold = sold + 1 WHERE session_id = NEW.session_id;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_booked_seats_update_occupancy
+        AFTER UPDATE OF is_active, session_id ON booked_seats
+        WHEN OLD.is_active IS NOT NEW.is_active OR OLD.session_id IS NOT NEW.session_id
+        BEGIN
+            UPDATE session_occupancy SET sold = sold - 1 WHERE session_id = OLD.session_id AND OLD.is_active = 1;
+            UPDATE session_occupancy SET sold = sold + 1 WHERE session_id = NEW.session_id AND NEW.is_active = 1;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_booked_seats_delete_occupancy
+        AFTER DELETE ON booked_seats WHEN OLD.is_active = 1
+        BEGIN
+            UPDATE session_occupancy SET sold = sold - 1 WHERE session_id = OLD.session_id;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_seat_holds_insert_occupancy
+        AFTER INSERT ON seat_holds
+        BEGIN
+            UPDATE session_occupancy SET held = held + 1 WHERE session_id = NEW.session_id;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_seat_holds_delete_occupancy
+        AFTER DELETE ON seat_holds
+        BEGIN
+            UPDATE session_occupancy SET held = held - 1 WHERE session_id = OLD.session_id;
+        END
+        """,
+    ]
+    for trigger in triggers:
+        conn.execute(trigger)
+    _rebuild_session_occupancy(conn.cursor())
+
+# Продані квитки - бронювання в статусах 'active' і 'completed' (сеанс уже
+# відбувся); зі зведень віднімається лише перехід у 'cancelled'
+def _migration_sales_rollups(conn):
+    """Денні зведення продажів для аналітики (див. analytics.py)"""
+    # Квитки й виручка за днем сеансу, фільмом і залом
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS sales_daily (
+            day TEXT NOT NULL,
+            film_id INTEGER NOT NULL,
+            hall_id INTEGER NOT NULL,
+            bookings INTEGER NOT NULL DEFAULT 0,
+            tickets INTEGER NOT NULL DEFAULT 0,
+            revenue REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, film_id, hall_id)
+        ) WITHOUT ROWID
+    """)
+    # Продажі за днем і годиною оформлення бронювання (криві пікових годин)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS sales_hourly (
+            day TEXT NOT NULL,
+            hour INTEGER NOT NULL,
+            bookings INTEGER NOT NULL DEFAULT 0,
+            tickets INTEGER NOT NULL DEFAULT 0,
+            revenue REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, hour)
+        ) WITHOUT ROWID
+    """)
+    # Скільки разів продавалось кожне місце залу (теплова карта)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS seat_sales (
+            hall_id INTEGER NOT NULL,
+            row_number INTEGER NOT NULL,
+            seat_number INTEGER NOT NULL,
+            tickets INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (hall_id, row_number, seat_number)
+        ) WITHOUT ROWID
+    """)
+    # Бронювання, скасовані вже після того, як потрапили в зведення: наступне
+    # оновлення віднімає їх. Межа врахованих бронювань - app_meta.analytics_booking_id.
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS rollup_cancellations (
+            booking_id INTEGER PRIMARY KEY
+        )
+    """)
+    # Лише перехід у 'cancelled': завершене ('completed') бронювання лишається проданим
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_bookings_cancel_rollup
+        AFTER UPDATE OF status ON bookings
+        WHEN NEW.status = 'cancelled' AND OLD.status != 'cancelled'
+         AND NEW.id <= (SELECT CAST(value AS INTEGER) FROM app_meta WHERE key = 'analytics_booking_id')
+        BEGIN
+            INSERT OR IGNORE INTO rollup_cancellations (booking_id) VALUES (NEW.id);
+        END
+    """)
+
+def _migration_film_search(conn):
+    """Повнотекстовий індекс FTS5 фільмів (назва, опис, жанр) для пошуку"""
+    # Індекс без власної копії тексту (content='films'). unicode61 приводить
+    # кирилицю до нижнього регістру і знімає діакритику (й -> и, ї -> і), тож
+    # пошук не залежить від регістру і розкладки; префіксні індекси 2 і 3
+    # символів прискорюють підказки під час набору ("дю*").
+    conn.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS films_fts USING fts5(
+            title, description, genre,
+            content='films', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='2 3'
+        )
+    """)
+    # Ранг за замовчуванням: збіг у назві важить більше, ніж у жанрі чи описі
+    conn.execute("INSERT INTO films_fts (films_fts, rank) VALUES ('rank', 'bm25(10.0, 1.0, 4.0)')")
+    
+    triggers = [
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_films_insert_fts
+        AFTER INSERT ON films
+        BEGIN
+            INSERT INTO films_fts (rowid, title, description, genre)
+            VALUES (NEW.id, NEW.title, NEW.description, NEW.genre);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_films_delete_fts
+        AFTER DELETE ON films
+        BEGIN
+            INSERT INTO films_fts (films_fts, rowid, title, description, genre)
+            VALUES ('delete', OLD.id, OLD.title, OLD.description, OLD.genre);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_films_update_fts
+        AFTER UPDATE OF title, description, genre ON films
+        BEGIN
+            INSERT INTO films_fts (films_fts, rowid, title, description, genre)
+            VALUES ('delete', OLD.id, OLD.title, OLD.description, OLD.genre);
+            INSERT INTO films_fts (rowid, title, description, genre)
+            VALUES (NEW.id, NEW.title, NEW.description, NEW.genre);
+        END
+        """,
+    ]
+    for trigger in triggers:
+        conn.execute(trigger)
+    conn.execute("INSERT INTO films_fts (films_fts) VALUES ('rebuild')")
+
+def _migration_broadcast_reads_index(conn):
+    """Індекс прочитань за розсилкою: видалення розсилки без сканування всіх прочитань"""
+    # Первинний ключ (user_id, broadcast_id) не допомагає trg_broadcasts_delete,
+    # який видаляє прочитання за broadcast_id
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_broadcast_reads_broadcast ON broadcast_reads (broadcast_id)")
+
+def _migration_cache_versions(conn):
+    """Версії просторів імен кешу, спільні для всіх процесів (див. DatabaseVersions)"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS cache_versions (
+            namespace TEXT PRIMARY KEY,
+            version INTEGER NOT NULL,
+            changed_at REAL NOT NULL  -- unix time
+        ) WITHOUT ROWID
+    """)
+
+# Міграції схеми: (версія, функція). Застосована версія зберігається в PRAGMA user_version.
+# Нові міграції лише додаються в кінець списку, існуючі не змінюються.
+MIGRATIONS = [
+    (1, _migration_hot_path_indexes),
+    (2, _migration_booked_seats_session),
+    (3, _migration_seat_holds),
+    (4, _migration_seat_map_versions),
+    (5, _migration_sequences),
+    (6, _migration_app_meta),
+    (7, _migration_seat_categories),
+    (8, _migration_keyset_indexes),
+    (9, _migration_notification_engine),
+    (10, _migration_idempotency_keys),
+    (11, _migration_session_occupancy),
+    (12, _migration_sales_rollups),
+    (13, _migration_film_search),
+    (14, _migration_broadcast_reads_index),
+    (15, _migration_cache_versions),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+# Версія тестових даних: збільшується при кожній зміні seed_database()
+SEED_VERSION = 2
+
+def get_schema_version(conn):
+    """Поточна версія схеми бази даних"""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def begin_immediate(conn):
+    """Почати транзакцію запису, одразу взявши блокування на запис
+
+    Так перевірка і зміна даних відбуваються під одним блокуванням, і
+    паралельний записувач чекає (busy_timeout), а не бачить застарілий стан.
+    Незавершена транзакція на з'єднанні - помилка виклику (RuntimeError):
+    її не можна ні мовчки зафіксувати, ні відкотити за викликача.
+    """
+    if conn.in_transaction:
+        raise RuntimeError("begin_immediate: на з'єднанні вже відкрита транзакція")
+    conn.execute("BEGIN IMMEDIATE")
+
+def apply_migrations(conn):
+    """Застосувати міграції, новіші за PRAGMA user_version
+
+    Кожна міграція виконується в окремій транзакції BEGIN IMMEDIATE, тому
+    кілька процесів, що стартують одночасно, не застосують її двічі.
+    """
+    for version, migration in MIGRATIONS:
+        begin_immediate(conn)
+        try:
+            if get_schema_version(conn) >= version:
+                conn.rollback()
+                continue
+            logger.info(f"Міграція схеми до версії {version}: {migration.__doc__}")
+            migration(conn)
+            conn.execute(f"PRAGMA user_version = {int(version)}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    return get_schema_version(conn)
+
+def create_schema(conn):
+    """Створити таблиці, яких ще немає, і застосувати міграції"""
+    conn.executescript('''
+        CREATE TABLE IF NOT EXISTS films (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            description TEXT,
+            duration INTEGER NOT NULL,
+            genre TEXT,
+            poster_url TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+
+        CREATE TABLE IF NOT EXISTS halls (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            seats_count INTEGER NOT NULL,
+            hall_type TEXT DEFAULT '2D'
+        );
+
+        CREATE TABLE IF NOT EXISTS seats (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            hall_id INTEGER NOT NULL,
+            row_number INTEGER NOT NULL,
+            seat_number INTEGER NOT NULL,
+            FOREIGN KEY (hall_id) REFERENCES halls (id)
+        );
+
+        CREATE TABLE IF NOT EXISTS sessions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            film_id INTEGER NOT NULL,
+            hall_id INTEGER NOT NULL,
+            session_date TEXT NOT NULL,
+            session_time TEXT NOT NULL,
+            price REAL NOT NULL,
+            FOREIGN KEY (film_id) REFERENCES films (id),
+            FOREIGN KEY (hall_id) REFERENCES halls (id)
+        );
+
+        CREATE TABLE IF NOT EXISTS bookings (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id INTEGER NOT NULL,
+            customer_email TEXT NOT NULL,
+            customer_name TEXT NOT NULL,
+            booking_code TEXT UNIQUE NOT NULL,
+            status TEXT DEFAULT 'active',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (session_id) REFERENCES sessions (id)
+        );
+
+        CREATE TABLE IF NOT EXISTS booked_seats (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            booking_id INTEGER NOT NULL,
+            seat_id INTEGER NOT NULL,
+            FOREIGN KEY (booking_id) REFERENCES bookings (id),
+            FOREIGN KEY (seat_id) REFERENCES seats (id),
+            UNIQUE(booking_id, seat_id)
+        );
+       
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            email TEXT UNIQUE NOT NULL,
+            username TEXT UNIQUE NOT NULL,
+            password_hash TEXT NOT NULL,
+            full_name TEXT,
+            phone TEXT,
+            avatar_url TEXT DEFAULT '/static/img/default-avatar.png',
+            email_verified BOOLEAN DEFAULT FALSE,
+            is_admin BOOLEAN DEFAULT FALSE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+
+        CREATE TABLE IF NOT EXISTS user_payment_methods (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            card_last_four TEXT,
+            card_brand TEXT,
+            is_default BOOLEAN DEFAULT FALSE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        );
+
+        CREATE TABLE IF NOT EXISTS notifications (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            type TEXT NOT NULL, -- 'booking', 'system', 'promo'
+            title TEXT NOT NULL,
+            message TEXT NOT NULL,
+            is_read BOOLEAN DEFAULT FALSE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        );
+    ''')
+    
+    apply_migrations(conn)
+
+def get_meta(conn, key, default=None):
+    """Значення службової позначки з app_meta"""
+    row = conn.execute("SELECT value FROM app_meta WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else default
+
+def set_meta(conn, key, value):
+    conn.execute("""
+        INSERT INTO app_meta (key, value) VALUES (?, ?)
+        ON CONFLICT (key) DO UPDATE SET value = excluded.value
+    """, (key, str(value)))
+
+class DatabaseVersions(cache.VersionStore):
+    """Версії кешу в таблиці cache_versions - спільні для воркерів і CLI-команд
+
+    Читання - пошук за первинним ключем. Нова версія записується в
+    транзакції переданого з'єднання, якщо вона відкрита (атомарно зі зміною
+    даних), інакше - окремою короткою транзакцією.
+    """
+
+    def __init__(self):
+        # Час зміни простору імен, який ще жодного разу не інвалідувався
+        self.started_at = time.time()
+
+    def get(self, namespace):
+        conn = get_db_connection()
+        try:
+            row = conn.execute("SELECT version, changed_at FROM cache_versions WHERE namespace = ?",
+                               (namespace,)).fetchone()
+        finally:
+            conn.close()
+        return (row[0], row[1]) if row else (0, self.started_at)
+
+    def bump(self, namespace, conn=None):
+        own = conn is None
+        if own:
+            conn = get_db_connection()
+        joined = conn.in_transaction
+        try:
+            if not joined:
+                begin_immediate(conn)
+            conn.execute("""
+                INSERT INTO cache_versions (namespace, version, changed_at) VALUES (?, 1, ?)
+                ON CONFLICT (namespace) DO UPDATE SET version = version + 1, changed_at = excluded.changed_at
+            """, (namespace, time.time()))
+            if not joined:
+                conn.commit()
+        except Exception:
+            if not joined:
+                conn.rollback()
+            raise
+        finally:
+            if own:
+                conn.close()
+
+    def stats(self):
+        return {'store': 'database'}
+
+cache.set_version_store(DatabaseVersions())
 
 def init_database():
-    """Ініціалізація бази даних з усіма таблицями"""
+    """Підготувати базу даних при старті застосунку
+
+    На готовій базі це два читання (PRAGMA user_version і позначка
+    seed_version) без жодного запису. Таблиці й міграції застосовуються, лише
+    якщо схема відстає, а тестові дані додаються один раз для кожної
+    SEED_VERSION (якщо Config.AUTO_SEED_DATABASE); повторно - командою
+    flask seed-db.
+    """
     conn = get_db_connection()
-    
     try:
-        # Створюємо таблиці
-        conn.executescript('''
-            CREATE TABLE IF NOT EXISTS films (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                title TEXT NOT NULL,
-                description TEXT,
-                duration INTEGER NOT NULL,
-                genre TEXT,
-                poster_url TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            );
-
-            CREATE TABLE IF NOT EXISTS halls (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                seats_count INTEGER NOT NULL,
-                hall_type TEXT DEFAULT '2D'
-            );
-
-            CREATE TABLE IF NOT EXISTS seats (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                hall_id INTEGER NOT NULL,
-                row_number INTEGER NOT NULL,
-                seat_number INTEGER NOT NULL,
-                FOREIGN KEY (hall_id) REFERENCES halls (id)
-            );
-
-            CREATE TABLE IF NOT EXISTS sessions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                film_id INTEGER NOT NULL,
-                hall_id INTEGER NOT NULL,
-                session_date TEXT NOT NULL,
-                session_time TEXT NOT NULL,
-                price REAL NOT NULL,
-                FOREIGN KEY (film_id) REFERENCES films (id),
-                FOREIGN KEY (hall_id) REFERENCES halls (id)
-            );
-
-            CREATE TABLE IF NOT EXISTS bookings (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                session_id INTEGER NOT NULL,
-                customer_email TEXT NOT NULL,
-                customer_name TEXT NOT NULL,
-                booking_code TEXT UNIQUE NOT NULL,
-                status TEXT DEFAULT 'active',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (session_id) REFERENCES sessions (id)
-            );
-
-            CREATE TABLE IF NOT EXISTS booked_seats (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                booking_id INTEGER NOT NULL,
-                seat_id INTEGER NOT NULL,
-                FOREIGN KEY (booking_id) REFERENCES bookings (id),
-                FOREIGN KEY (seat_id) REFERENCES seats (id),
-                UNIQUE(booking_id, seat_id)
-            );
-           
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                email TEXT UNIQUE NOT NULL,
-                username TEXT UNIQUE NOT NULL,
-                password_hash TEXT NOT NULL,
-                full_name TEXT,
-                phone TEXT,
-                avatar_url TEXT DEFAULT '/static/img/default-avatar.png',
-                email_verified BOOLEAN DEFAULT FALSE,
-                is_admin BOOLEAN DEFAULT FALSE,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            );
-
-            CREATE TABLE IF NOT EXISTS user_payment_methods (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                card_last_four TEXT,
-                card_brand TEXT,
-                is_default BOOLEAN DEFAULT FALSE,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users (id)
-            );
-
-            CREATE TABLE IF NOT EXISTS notifications (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                type TEXT NOT NULL, -- 'booking', 'system', 'promo'
-                title TEXT NOT NULL,
-                message TEXT NOT NULL,
-                is_read BOOLEAN DEFAULT FALSE,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users (id)
-            );
-        ''')
+        if get_schema_version(conn) < SCHEMA_VERSION:
+            create_schema(conn)
+        if Config.AUTO_SEED_DATABASE and get_meta(conn, 'seed_version') != str(SEED_VERSION):
+            seed_database(conn)
+    except Exception as e:
+        logger.error(f"Помилка ініціалізації бази даних: {str(e)}")
+        raise e
+    finally:
+        conn.close()
+
+def seed_database(conn, force=False):
+    """Додати тестові дані (фільми, зали, місця, сеанси, бронювання, користувачі)
+
+    Усі вставки ідемпотентні, тому повторний запуск лише додає відсутнє
+    (наприклад, сеанси на нові дати). Виконується в одній транзакції
+    BEGIN IMMEDIATE: з кількох процесів, що стартують одночасно, дані додасть
+    лише перший. Без force нічого не робить, якщо SEED_VERSION вже застосована.
+    """
+    begin_immediate(conn)
+    try:
+        if not force and get_meta(conn, 'seed_version') == str(SEED_VERSION):
+            conn.rollback()
+            return False
         
-        # Додаємо тестові дані
-        conn.executescript('''
+        conn.execute('''
             INSERT OR IGNORE INTO films (id, title, description, duration, genre, poster_url) VALUES
             (1, 'Дюна: Частина друга', 'Пол Атрідіс об''єднується з Чані та фременами на шляху помсти тим, хто знищив його родину. Зіткнувшись з вибором між коханням та долею всесвіту, він намагається запобігти страшному майбутньому.', 166, 'Фантастика', '/static/img/dune2.jpg'),
             (2, 'Оппенгеймер', 'Історія фізика-теоретика Джуліуса Роберта Оппенгеймера, творця атомної бомби, та його моральних страждань після створення зброї масового ураження.', 180, 'Драма', '/static/img/oppenheimer.jpg'),
@@ -124,49 +978,61 @@ def init_database():
             (7, 'Годзіла та Конг: Нова імперія', 'Годзіла та Конг об''єднують сили проти спільного ворога, який загрожує їхньому існуванню та існуванню людства.', 115, 'Фантастика', '/static/img/godzilla_kong.jpg'),
             (8, 'Форсаж 10', 'Доміник Торетто та його родина зіткнуться з найнебезпечнішим ворогом, який використовує минуле Дома проти нього.', 141, 'Екшн', '/static/img/fast10.jpg'),
             (9, 'Вартові галактики 3', 'Команда Пітера Квілла рятує Всесвіт та розкриває таємниці Рокета у останній частині епічної космічної саги.', 150, 'Фантастика', '/static/img/gotg3.jpg'),
-            (10, 'Індиана Джонс і Реліквія долі', 'Індиана Джонс вирушає у чергову пригоду за артефактом, що змінює долю у заключній частині легендарної серії.', 154, 'Пригоди', '/static/img/indiana_jones.jpg');
-            -- Зали
-            INSERT OR IGNORE INTO halls (id, name, seats_count, hall_type) VALUES
-            (1, 'Зал 1 (2D)', 100, '2D'),
-            (2, 'Зал 2 (3D)', 80, '3D'),
-            (3, 'Зал 3 (IMAX)', 120, 'IMAX'),
-            (4, 'Зал 4 (VIP)', 50, 'VIP');
+            (10, 'Індиана Джонс і Реліквія долі', 'Індиана Джонс вирушає у чергову пригоду за артефактом, що змінює долю у заключній частині легендарної серії.', 154, 'Пригоди', '/static/img/indiana_jones.jpg')
         ''')
+        # Зали та місця - зі схем hall_layouts.json (записується лише різниця)
+        sync_hall_layouts(conn)
         
-        # Створюємо правильну схему місць
-        create_proper_seats_schema(conn)
+        # Сеанси (тільки унікальні комбінації дата-час-зал)
+        conn.execute('''
+            WITH seed (film_id, hall_id, session_date, session_time, price) AS (VALUES
+                (1, 1, date('now'), '10:00:00', 120.00),
+                (1, 2, date('now'), '13:30:00', 150.00),
+                (2, 3, date('now'), '11:00:00', 180.00),
+                (3, 1, date('now'), '14:00:00', 130.00),
+                (4, 2, date('now'), '16:30:00', 140.00),
+                (5, 4, date('now'), '19:00:00', 200.00),
+                (6, 1, date('now'), '21:00:00', 160.00),
+                (1, 3, date('now', '+1 day'), '12:00:00', 190.00),
+                (2, 1, date('now', '+1 day'), '15:00:00', 120.00),
+                (3, 2, date('now', '+1 day'), '17:30:00', 150.00),
+                (7, 3, date('now', '+1 day'), '20:00:00', 180.00),
+                (8, 4, date('now', '+1 day'), '22:00:00', 170.00),
+                (4, 1, date('now', '+2 day'), '11:30:00', 120.00),
+                (5, 2, date('now', '+2 day'), '14:00:00', 140.00),
+                (9, 3, date('now', '+2 day'), '16:30:00', 180.00),
+                (10, 1, date('now', '+2 day'), '19:00:00', 130.00),
+                (1, 4, date('now', '+2 day'), '21:30:00', 220.00)
+            )
+            INSERT INTO sessions (film_id, hall_id, session_date, session_time, price)
+            SELECT film_id, hall_id, session_date, session_time, price FROM seed
+            WHERE NOT EXISTS (
+                SELECT 1 FROM sessions s
+                WHERE s.session_date = seed.session_date AND s.film_id = seed.film_id
+                  AND s.hall_id = seed.hall_id AND s.session_time = seed.session_time
+            )
+        ''')
         
-        # Додаємо унікальні сеанси (без дублікатів)
-        conn.executescript('''
-            -- Сеанси (тільки унікальні комбінації дата-час-зал)
-            INSERT OR IGNORE INTO sessions (film_id, hall_id, session_date, session_time, price) VALUES
-            (1, 1, date('now'), '10:00:00', 120.00),
-            (1, 2, date('now'), '13:30:00', 150.00),
-            (2, 3, date('now'), '11:00:00', 180.00),
-            (3, 1, date('now'), '14:00:00', 130.00),
-            (4, 2, date('now'), '16:30:00', 140.00),
-            (5, 4, date('now'), '19:00:00', 200.00),
-            (6, 1, date('now'), '21:00:00', 160.00),
-            (1, 3, date('now', '+1 day'), '12:00:00', 190.00),
-            (2, 1, date('now', '+1 day'), '15:00:00', 120.00),
-            (3, 2, date('now', '+1 day'), '17:30:00', 150.00),
-            (7, 3, date('now', '+1 day'), '20:00:00', 180.00),
-            (8, 4, date('now', '+1 day'), '22:00:00', 170.00),
-            (4, 1, date('now', '+2 day'), '11:30:00', 120.00),
-            (5, 2, date('now', '+2 day'), '14:00:00', 140.00),
-            (9, 3, date('now', '+2 day'), '16:30:00', 180.00),
-            (10, 1, date('now', '+2 day'), '19:00:00', 130.00),
-            (1, 4, date('now', '+2 day'), '21:30:00', 220.00);
-
-            -- Тестові бронювання
+        # Тестові бронювання
+        conn.execute('''
             INSERT OR IGNORE INTO bookings (session_id, customer_email, customer_name, booking_code, status) VALUES
             (1, 'anna.petrova@gmail.com', 'Анна Петрова', 'CINEMA001', 'active'),
             (3, 'oleg.shevchenko@ukr.net', 'Олег Шевченко', 'CINEMA002', 'active'),
-            (5, 'maria.ivanova@gmail.com', 'Марія Іванова', 'CINEMA003', 'completed');
-
-            -- Заброньовані місця
-            INSERT OR IGNORE INTO booked_seats (booking_id, seat_id) VALUES
-            (1, 5), (1, 6), (2, 25), (3, 45);
+            (5, 'maria.ivanova@gmail.com', 'Марія Іванова', 'CINEMA003', 'completed')
+        ''')
+        
+        # Заброньовані місця задаються позицією (ряд, місце) в залі сеансу, а не id
+        conn.execute('''
+            WITH seed (booking_code, row_number, seat_number) AS (VALUES
+                ('CINEMA001', 1, 5), ('CINEMA001', 1, 6), ('CINEMA002', 3, 1), ('CINEMA003', 5, 5)
+            )
+            INSERT OR IGNORE INTO booked_seats (booking_id, seat_id, session_id, is_active)
+            SELECT b.id, st.id, b.session_id, b.status = 'active'
+            FROM seed
+            JOIN bookings b ON b.booking_code = seed.booking_code
+            JOIN sessions s ON s.id = b.session_id
+            JOIN seats st ON st.hall_id = s.hall_id
+                         AND st.row_number = seed.row_number AND st.seat_number = seed.seat_number
         ''')
         
         # Перевіряємо, чи є вже користувачі
@@ -223,85 +1089,216 @@ def init_database():
             
             print("Тестові користувачі додані!")
         
+        set_meta(conn, 'seed_version', SEED_VERSION)
         conn.commit()
-        logger.info("SQLite база даних створена та заповнена!")
-        
     except Exception as e:
-        logger.error(f"Помилка ініціалізації бази даних: {str(e)}")
+        conn.rollback()
+        logger.error(f"Помилка заповнення бази даних: {str(e)}")
         raise e
-    finally:
-        conn.close()
+    
+    cache.invalidate('catalog')
+    logger.info(f"SQLite база даних заповнена тестовими даними (версія {SEED_VERSION})")
+    return True
+
+def sync_hall_layout(conn, hall_id, definition):
+    """Привести зал і його місця у відповідність до схеми (в поточній транзакції)
+
+    Місця зіставляються за позицією (ряд, місце): нові вставляються, у
+    змінених оновлюється категорія, зайві видаляються - все через executemany.
+    Id існуючих місць не змінюються. Місце, на яке вже є бронювання, видалити
+    не можна - тоді кидається Exception. Повертає кількість змінених місць.
+    """
+    conn.execute("""
+        INSERT INTO halls (id, name, seats_count, hall_type) VALUES (?, ?, ?, ?)
+        ON CONFLICT (id) DO UPDATE
+        SET name = excluded.name, seats_count = excluded.seats_count, hall_type = excluded.hall_type
+    """, (hall_id, definition['name'], len(definition['seats']), definition['hall_type']))
+    
+    cursor = conn.cursor()
+    cursor.row_factory = None  # Прості кортежі замість sqlite3.Row
+    cursor.execute("SELECT row_number, seat_number, id, category FROM seats WHERE hall_id = ?", (hall_id,))
+    existing = {(row[0], row[1]): (row[2], row[3]) for row in cursor.fetchall()}
+    to_insert, to_update = [], []
+    for row_number, seat_number, _column, category in definition['seats']:
+        current = existing.pop((row_number, seat_number), None)
+        if current is None:
+            to_insert.append((hall_id, row_number, seat_number, category))
+        elif current[1] != category:
+            to_update.append((category, current[0]))
+    to_delete = [seat_id for seat_id, _category in existing.values()]
+    
+    if to_delete:
+        placeholders = ', '.join('?' * len(to_delete))
+        cursor.execute(
+            f"SELECT COUNT(DISTINCT seat_id) FROM booked_seats WHERE seat_id IN ({placeholders})",
+            to_delete
+        )
+        booked = cursor.fetchone()[0]
+        if booked:
+            raise Exception(f"Зал {hall_id}: {booked} місць, яких немає в новій схемі, вже мають бронювання")
+        cursor.executemany("DELETE FROM seats WHERE id = ?", [(seat_id,) for seat_id in to_delete])
+    cursor.executemany(
+        "INSERT INTO seats (hall_id, row_number, seat_number, category) VALUES (?, ?, ?, ?)",
+        to_insert
+    )
+    cursor.executemany("UPDATE seats SET category = ? WHERE id = ?", to_update)
+    
+    changed = len(to_insert) + len(to_update) + len(to_delete)
+    if changed:
+        logger.info(f"Зал {hall_id}: додано {len(to_insert)}, змінено {len(to_update)}, "
+                    f"видалено {len(to_delete)} місць")
+    return changed
+
+def sync_hall_layouts(conn, definitions=None):
+    """Застосувати схеми всіх залів (за замовчуванням з Config.HALL_LAYOUTS_PATH)
+
+    Викликається всередині транзакції на запис; коміт робить викликач.
+    """
+    definitions = definitions if definitions is not None else load_definitions()
+    changed = sum(sync_hall_layout(conn, hall_id, definition)
+                  for hall_id, definition in definitions.items())
+    if changed:
+        cache.invalidate('hall_layout', conn)
+        cache.invalidate('catalog', conn)
+    return changed
+
+@cache.cached('hall_layout')
+def get_hall_layout(hall_id):
+    """Схема залу для відображення: HallLayout з id місць, позиціями і категоріями
 
-def create_proper_seats_schema(conn):
-    """Створити правильну схему місць з нумерацією 1,2,3,4..."""
+    Колонки (з проходами) беруться з декларативної схеми залу; для залу без
+    схеми колонка дорівнює номеру місця.
+    """
+    ensure_database()
+    definition = load_definitions().get(hall_id)
+    columns = {}
+    if definition:
+        columns = {(row, seat): column for row, seat, column, _category in definition['seats']}
+    
+    conn = get_db_connection()
     try:
-        # Видалити старі місця
-        conn.execute("DELETE FROM seats")
-        
-        # Конфігурація залів: (id залу, кількість місць, місць у ряду)
-        halls_config = [
-            (1, 100, 10),   # Зал 1: 100 місць, 10 у ряду
-            (2, 80, 8),     # Зал 2: 80 місць, 8 у ряду
-            (3, 120, 12),   # Зал 3: 120 місць, 12 у ряду
-            (4, 50, 5)      # Зал 4: 50 місць, 5 у ряду
-        ]
-        
-        for hall_id, total_seats, seats_per_row in halls_config:
-            rows = (total_seats + seats_per_row - 1) // seats_per_row  # Округлення вгору
-            
-            for row in range(1, rows + 1):
-                seats_in_this_row = min(seats_per_row, total_seats - (row - 1) * seats_per_row)
-                
-                for seat_num in range(1, seats_in_this_row + 1):
-                    conn.execute(
-                        "INSERT INTO seats (hall_id, row_number, seat_number) VALUES (?, ?, ?)",
-                        (hall_id, row, seat_num)
-                    )
-        
-        logger.info("✅ Правильна схема місць створена!")
-        
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        cursor.execute("""
+            SELECT id, row_number, seat_number, category FROM seats
+            WHERE hall_id = ?
+            ORDER BY row_number, seat_number
+        """, (hall_id,))
+        layout = HallLayout(hall_id)
+        for seat_id, row_number, seat_number, category in cursor.fetchall():
+            column = columns.get((row_number, seat_number), seat_number)
+            layout.append(seat_id, row_number, seat_number, column, category)
+        return layout if len(layout) else None
     except Exception as e:
-        logger.error(f"Помилка створення схеми місць: {str(e)}")
-        raise e
+        logger.error(f"Помилка отримання схеми залу {hall_id}: {str(e)}")
+        return None
+    finally:
+        conn.close()
 
 def ensure_database():
     """Перевіряє чи база даних існує, якщо ні - створює"""
     if not os.path.exists(Config.DATABASE_PATH):
         init_database()
 
-def generate_unique_booking_code(conn, max_attempts=10):
-    """Генерує унікальний код бронювання"""
-    for _ in range(max_attempts):
-        code = 'CINEMA' + ''.join(random.choices(string.digits, k=6))
-        cursor = conn.cursor()
-        cursor.execute("SELECT id FROM bookings WHERE booking_code = ?", (code,))
-        if not cursor.fetchone():
-            return code
-    raise Exception("Не вдалося згенерувати унікальний код бронювання")
+def next_sequence_value(cursor, name):
+    """Наступне значення лічильника name (викликати всередині транзакції на запис)"""
+    cursor.execute("""
+        INSERT INTO sequences (name, value) VALUES (?, 1)
+        ON CONFLICT (name) DO UPDATE SET value = value + 1
+    """, (name,))
+    cursor.execute("SELECT value FROM sequences WHERE name = ?", (name,))
+    return cursor.fetchone()[0]
+
+def generate_booking_code(cursor):
+    """Новий код бронювання: перестановка наступного номера, без пошуку в bookings"""
+    return format_booking_code(next_sequence_value(cursor, 'booking_code'))
 
 # Функції для роботи з даними
+@cache.cached('catalog', ttl=Config.OCCUPANCY_CACHE_TTL)
 def get_films_with_sessions():
-    """Отримати фільми з найближчими сеансами"""
+    """Отримати фільми з найближчими сеансами
+
+    Кожен фільм - з найближчим сеансом (next_session_id, next_session_date,
+    next_session_time) і кількістю вільних місць на ньому (seats_left) з
+    session_occupancy. Сеанси читаються по індексу в порядку часу, доки не
+    набереться 8 різних фільмів.
+    """
     ensure_database()
     conn = get_db_connection()
     try:
         cursor = conn.cursor()
         sql = """
-        SELECT DISTINCT f.* 
-        FROM films f 
-        JOIN sessions s ON f.id = s.film_id 
-        WHERE s.session_date >= date('now') 
-        ORDER BY s.session_date 
-        LIMIT 8
+        SELECT f.*, s.id AS next_session_id, s.session_date AS next_session_date,
+               s.session_time AS next_session_time,
+               MAX(o.capacity - o.sold - o.held, 0) AS seats_left
+        FROM sessions s
+        JOIN films f ON f.id = s.film_id
+        LEFT JOIN session_occupancy o ON o.session_id = s.id
+        WHERE s.session_date >= date('now')
+        ORDER BY s.session_date, s.session_time
         """
-        cursor.execute(sql)
-        return [dict(row) for row in cursor.fetchall()]
+        films = {}
+        for row in cursor.execute(sql):
+            if row['id'] not in films:
+                films[row['id']] = dict(row)
+                if len(films) == 8:
+                    break
+        return list(films.values())
     except Exception as e:
         logger.error(f"Помилка отримання фільмів: {str(e)}")
         return []
     finally:
         conn.close()
 
+# Слово запиту для FTS5: літери й цифри; решта символів (лапки, апостроф,
+# оператори FTS5) - роздільники, як і в токенізаторі unicode61
+_SEARCH_TOKEN = re.compile(r'[^\W_]+')
+
+def _fts_query(text, max_terms=8):
+    """Запит MATCH з тексту користувача: кожне слово - префікс ("дюн"*), усі обов'язкові"""
+    terms = _SEARCH_TOKEN.findall(text or '')[:max_terms]
+    if not terms:
+        raise ValueError("Порожній пошуковий запит")
+    return ' '.join(f'"{term}"*' for term in terms)
+
+def search_films(text, upcoming_only=False, after=None, limit=None):
+    """Повнотекстовий пошук фільмів: {'items', 'next_cursor'}
+
+    Результати впорядковані за релевантністю (bm25, назва важить найбільше)
+    і гортаються курсором за (rank, id). upcoming_only - лише фільми з
+    сеансами від сьогодні; next_session_date - дата найближчого сеансу.
+    """
+    query = _fts_query(text)
+    limit = limit or Config.FILM_SEARCH_PAGE_SIZE
+    conditions = []
+    params = [query]
+    if upcoming_only:
+        conditions.append("""
+            AND EXISTS (SELECT 1 FROM sessions s WHERE s.film_id = f.id AND s.session_date >= date('now'))
+        """)
+    if after is not None:
+        conditions.append("AND (m.rank, m.id) > (?, ?)")
+        params.extend(decode_cursor(after, key_type=float))
+    ensure_database()
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        sql = f"""
+        SELECT f.id, f.title, f.description, f.duration, f.genre, f.poster_url, m.rank,
+               (SELECT MIN(s.session_date) FROM sessions s
+                WHERE s.film_id = f.id AND s.session_date >= date('now')) AS next_session_date
+        FROM (SELECT rowid AS id, rank FROM films_fts WHERE films_fts MATCH ?) m
+        JOIN films f ON f.id = m.id
+        WHERE 1 {' '.join(conditions)}
+        ORDER BY m.rank, m.id
+        LIMIT ?
+        """
+        cursor.execute(sql, [*params, limit + 1])
+        return make_page([dict(row) for row in cursor.fetchall()], limit, key='rank')
+    finally:
+        conn.close()
+
+@cache.cached('catalog', ttl=Config.OCCUPANCY_CACHE_TTL)
 def get_film_by_id(film_id):
     """Отримати деталі фільму по ID"""
     ensure_database()
@@ -349,62 +1346,401 @@ def get_session_by_id(session_id):
     finally:
         conn.close()
 
-def get_available_seats(session_id):
-    """Отримати вільні місця для сеансу"""
+def _fetch_seat_states(cursor, session_id, hold_token=None, seat_ids=None):
+    """Стан місць сеансу (усіх або лише seat_ids) в порядку (ряд, місце)
+
+    Один прохід SQL: множина зайнятих місць сеансу матеріалізується один раз
+    (з автоматичним індексом по seat_id), а місця залу йдуть по індексу
+    idx_seats_hall_position вже в порядку (ряд, місце). Місця, які тимчасово
+    утримує інший покупець, позначаються is_held і недоступні; власні
+    утримання (hold_token) лишаються доступними.
+    """
+    seat_filter = ''
+    params = [hold_token, session_id, time.time(), session_id]
+    if seat_ids is not None:
+        seat_filter = f"AND st.id IN ({', '.join('?' * len(seat_ids))})"
+        params.extend(seat_ids)
+    
+    sql = f"""
+    SELECT st.id, st.hall_id, st.row_number, st.seat_number,
+           booked.seat_id IS NULL AS is_free,
+           held.seat_id IS NOT NULL AND held.hold_token IS NOT ? AS is_held
+    FROM sessions s
+    JOIN seats st ON st.hall_id = s.hall_id
+    LEFT JOIN (
+        SELECT seat_id FROM booked_seats
+        WHERE session_id = ? AND is_active = 1
+    ) booked ON booked.seat_id = st.id
+    LEFT JOIN seat_holds held
+           ON held.session_id = s.id AND held.seat_id = st.id AND held.expires_at > ?
+    WHERE s.id = ? {seat_filter}
+    ORDER BY st.row_number, st.seat_number
+    """
+    cursor.execute(sql, params)
+    return [
+        {
+            'id': seat_id,
+            'hall_id': hall_id,
+            'row_number': row_number,
+            'seat_number': seat_number,
+            'is_available': bool(is_free and not is_held),
+            'is_held': bool(is_free and is_held),
+        }
+        for seat_id, hall_id, row_number, seat_number, is_free, is_held in cursor.fetchall()
+    ]
+
+def get_seat_map(session_id, hold_token=None, since=None):
+    """Схема місць сеансу з її версією: повна або лише зміни після версії since
+
+    Повертає {'version', 'full', 'seats'}. Якщо since задано і журнал
+    seat_map_changes ще містить усі версії після нього, seats - лише місця,
+    стан яких змінився (full=False); інакше - усі місця залу (full=True).
+    Версія і стан місць читаються з одного знімка БД.
+    """
     ensure_database()
     conn = get_db_connection()
     try:
         cursor = conn.cursor()
-        
-        # Отримуємо всі місця залу для цього сеансу
-        sql_seats = """
-        SELECT st.* 
-        FROM seats st
-        JOIN sessions s ON st.hall_id = s.hall_id
-        WHERE s.id = ?
-        ORDER BY st.row_number, st.seat_number
-        """
-        cursor.execute(sql_seats, (session_id,))
-        all_seats = [dict(row) for row in cursor.fetchall()]
-        
-        # Отримуємо заброньовані місця для цього сеансу
-        sql_booked = """
-        SELECT bs.seat_id 
-        FROM booked_seats bs
-        JOIN bookings b ON bs.booking_id = b.id
-        WHERE b.session_id = ? AND b.status = 'active'
-        """
-        cursor.execute(sql_booked, (session_id,))
-        booked_seats = [row['seat_id'] for row in cursor.fetchall()]
-        
-        # Позначаємо місця як вільні/зайняті
-        for seat in all_seats:
-            seat['is_available'] = seat['id'] not in booked_seats
-        
-        return all_seats
+        cursor.row_factory = None  # Прості кортежі замість sqlite3.Row
+        # Точка збереження, а не BEGIN/ROLLBACK: поза транзакцією вона відкриває
+        # транзакцію читання (один знімок), а всередині транзакції викликача
+        # (з'єднання запиту спільне) лише вкладається в неї і нічого не відкочує
+        cursor.execute("SAVEPOINT seat_map_snapshot")
+        try:
+            return _read_seat_map(cursor, session_id, hold_token, since)
+        finally:
+            cursor.execute("RELEASE seat_map_snapshot")
     except Exception as e:
         logger.error(f"Помилка отримання місць для сеансу {session_id}: {str(e)}")
-        return []
+        return {'version': 0, 'full': True, 'seats': []}
+    finally:
+        conn.close()
+
+def _read_seat_map(cursor, session_id, hold_token, since):
+    cursor.execute("SELECT version FROM seat_map_versions WHERE session_id = ?", (session_id,))
+    row = cursor.fetchone()
+    version = row[0] if row else 0
+    
+    oldest_known = version - Config.SEAT_MAP_CHANGE_LOG_SIZE
+    if since is None or since < oldest_known or since > version:
+        seats = _fetch_seat_states(cursor, session_id, hold_token)
+        return {'version': version, 'full': True, 'seats': seats}
+    
+    cursor.execute("""
+        SELECT DISTINCT seat_id FROM seat_map_changes
+        WHERE session_id = ? AND version > ?
+    """, (session_id, since))
+    changed = [seat_id for (seat_id,) in cursor.fetchall()]
+    seats = _fetch_seat_states(cursor, session_id, hold_token, changed) if changed else []
+    return {'version': version, 'full': False, 'seats': seats}
+
+def get_available_seats(session_id, hold_token=None):
+    """Отримати місця сеансу з їхньою доступністю"""
+    return get_seat_map(session_id, hold_token)['seats']
+
+def seat_map_namespace(session_id):
+    """Простір імен кешу, версія якого - версія схеми місць сеансу"""
+    return f'seat_map:{session_id}'
+
+def _record_seat_changes(cursor, session_id, seat_ids):
+    """Збільшити версію схеми місць сеансу і записати змінені місця в журнал
+
+    Викликається всередині транзакції, що змінює місця, тож версія фіксується
+    атомарно разом зі зміною. Журнал зберігає останні
+    Config.SEAT_MAP_CHANGE_LOG_SIZE версій. Повертає нову версію.
+    """
+    cursor.execute("""
+        INSERT INTO seat_map_versions (session_id, version) VALUES (?, 1)
+        ON CONFLICT (session_id) DO UPDATE SET version = version + 1
+    """, (session_id,))
+    cursor.execute("SELECT version FROM seat_map_versions WHERE session_id = ?", (session_id,))
+    version = cursor.fetchone()[0]
+    cursor.executemany(
+        "INSERT OR IGNORE INTO seat_map_changes (session_id, version, seat_id) VALUES (?, ?, ?)",
+        [(session_id, version, seat_id) for seat_id in seat_ids]
+    )
+    cursor.execute("DELETE FROM seat_map_changes WHERE session_id = ? AND version <= ?",
+                   (session_id, version - Config.SEAT_MAP_CHANGE_LOG_SIZE))
+    # Версія кешу сторінки бронювання - разом зі зміною
+    cache.invalidate(seat_map_namespace(session_id), cursor.connection)
+    return version
+
+def _seat_map_changed(session_id, seat_ids, state, version):
+    """Викликається після коміту будь-якої зміни стану місць сеансу
+
+    Публікує різницю (seat_id, новий стан) з новою версією схеми
+    підписникам живої схеми залу (версію кешу сторінки бронювання вже
+    змінив _record_seat_changes). state: 'booked', 'held' або 'free'.
+    """
+    seat_events.publish(session_id, {
+        'type': 'seats',
+        'session_id': session_id,
+        'version': version,
+        'changes': [{'seat_id': seat_id, 'state': state} for seat_id in seat_ids],
+    })
+
+def _check_seats_bookable(cursor, session_id, seat_ids, hold_token=None):
+    """Перевірити в поточній транзакції, що місця можна забронювати/утримати
+
+    Кидає Exception, якщо місце не належить залу сеансу, вже продане або
+    утримується іншим покупцем.
+    """
+    placeholders = ', '.join('?' * len(seat_ids))
+    sql_check = f"""
+    SELECT st.id,
+           bs.id IS NOT NULL AS is_booked,
+           h.seat_id IS NOT NULL AS is_held
+    FROM sessions s
+    JOIN seats st ON st.hall_id = s.hall_id
+    LEFT JOIN booked_seats bs
+           ON bs.session_id = s.id AND bs.seat_id = st.id AND bs.is_active = 1
+    LEFT JOIN seat_holds h
+           ON h.session_id = s.id AND h.seat_id = st.id
+          AND h.expires_at > ? AND h.hold_token IS NOT ?
+    WHERE s.id = ? AND st.id IN ({placeholders})
+    """
+    cursor.execute(sql_check, (time.time(), hold_token, session_id, *seat_ids))
+    seat_states = {row['id']: row for row in cursor.fetchall()}
+    
+    for seat_id in seat_ids:
+        if seat_id not in seat_states:
+            raise Exception(f"Місце {seat_id} не належить до залу цього сеансу")
+        if seat_states[seat_id]['is_booked']:
+            raise Exception(f"Місце {seat_id} вже зайняте")
+        if seat_states[seat_id]['is_held']:
+            raise Exception(f"Місце {seat_id} тимчасово утримується іншим покупцем")
+
+def hold_seats(session_id, seat_ids, hold_token=None):
+    """Тимчасово утримати місця за покупцем на Config.SEAT_HOLD_TTL секунд
+
+    Кожне місце - один upsert по первинному ключу (session_id, seat_id).
+    Повторний виклик з тим самим hold_token продовжує утримання.
+    """
+    ensure_database()
+    seat_ids = list(dict.fromkeys(seat_ids))
+    if not seat_ids:
+        raise Exception("Оберіть хоча б одне місце")
+    hold_token = hold_token or secrets.token_urlsafe(16)
+    expires_at = time.time() + Config.SEAT_HOLD_TTL
+    
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        begin_immediate(conn)
+        _check_seats_bookable(cursor, session_id, seat_ids, hold_token)
+        cursor.executemany("""
+            INSERT INTO seat_holds (session_id, seat_id, hold_token, expires_at)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT (session_id, seat_id) DO UPDATE
+            SET hold_token = excluded.hold_token, expires_at = excluded.expires_at
+        """, [(session_id, seat_id, hold_token, expires_at) for seat_id in seat_ids])
+        version = _record_seat_changes(cursor, session_id, seat_ids)
+        conn.commit()
+        _seat_map_changed(session_id, seat_ids, 'held', version)
+        return {'hold_token': hold_token, 'expires_at': expires_at, 'seat_ids': seat_ids}
+    except Exception as e:
+        conn.rollback()
+        logger.info(f"Не вдалося утримати місця для сеансу {session_id}: {str(e)}")
+        raise e
+    finally:
+        conn.close()
+
+def release_seats(session_id, hold_token, seat_ids=None):
+    """Зняти утримання з місць (усіх місць цього hold_token, якщо seat_ids не задано)"""
+    ensure_database()
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        begin_immediate(conn)
+        if seat_ids is None:
+            cursor.execute(
+                "SELECT seat_id FROM seat_holds WHERE session_id = ? AND hold_token = ?",
+                (session_id, hold_token)
+            )
+            seat_ids = [row['seat_id'] for row in cursor.fetchall()]
+        released = []
+        for seat_id in seat_ids:
+            cursor.execute(
+                "DELETE FROM seat_holds WHERE session_id = ? AND seat_id = ? AND hold_token = ?",
+                (session_id, seat_id, hold_token)
+            )
+            if cursor.rowcount:
+                released.append(seat_id)
+        if released:
+            version = _record_seat_changes(cursor, session_id, released)
+        conn.commit()
+        if released:
+            _seat_map_changed(session_id, released, 'free', version)
+        return len(released)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+def expire_seat_holds(batch_size=None):
+    """Видалити прострочені утримання пакетами
+
+    Читає лише прострочений початок індексу idx_seat_holds_expires, кожен
+    пакет - окрема коротка транзакція, щоб не тримати блокування на запис.
+    Повертає список (session_id, seat_id) звільнених місць.
+    """
+    batch_size = batch_size or Config.SEAT_HOLD_SWEEP_BATCH
+    expired = []
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        while True:
+            begin_immediate(conn)
+            cursor.execute("""
+                SELECT rowid, session_id, seat_id FROM seat_holds
+                WHERE expires_at <= ?
+                ORDER BY expires_at
+                LIMIT ?
+            """, (time.time(), batch_size))
+            rows = cursor.fetchall()
+            by_session = {}
+            for row in rows:
+                by_session.setdefault(row['session_id'], []).append(row['seat_id'])
+            if rows:
+                cursor.executemany("DELETE FROM seat_holds WHERE rowid = ?",
+                                   [(row['rowid'],) for row in rows])
+            versions = {
+                session_id: _record_seat_changes(cursor, session_id, seat_ids)
+                for session_id, seat_ids in by_session.items()
+            }
+            conn.commit()
+            for session_id, seat_ids in by_session.items():
+                _seat_map_changed(session_id, seat_ids, 'free', versions[session_id])
+            expired.extend((row['session_id'], row['seat_id']) for row in rows)
+            if len(rows) < batch_size:
+                return expired
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+class SeatHoldSweeper(PeriodicWorker):
+    """Фоновий потік, що прибирає прострочені утримання місць і ключі ідемпотентності"""
+
+    def __init__(self, interval):
+        super().__init__('seat-hold-sweeper', interval)
+
+    def run_once(self):
+        expired = expire_seat_holds()
+        if expired:
+            logger.info(f"Звільнено {len(expired)} прострочених утримань місць")
+        expire_idempotency_keys()
+        return expired
+
+_hold_sweeper = None
+
+def start_seat_hold_sweeper():
+    """Запустити фонове прибирання утримань, якщо інтервал > 0"""
+    global _hold_sweeper
+    if Config.SEAT_HOLD_SWEEP_INTERVAL <= 0:
+        return None
+    if _hold_sweeper is not None and _hold_sweeper.is_alive():
+        return _hold_sweeper
+    _hold_sweeper = SeatHoldSweeper(Config.SEAT_HOLD_SWEEP_INTERVAL)
+    _hold_sweeper.start()
+    return _hold_sweeper
+
+class IdempotencyKeyReused(Exception):
+    """Ключ ідемпотентності вже використано для запиту з іншими даними"""
+
+def _idempotency_ttl_modifier():
+    return f"-{int(Config.IDEMPOTENCY_KEY_TTL)} seconds"
+
+def _idempotent_result(cursor, scope, key, fingerprint):
+    """Збережений результат запиту з ключем key або None (прострочені не враховуються)"""
+    cursor.execute("""
+        SELECT fingerprint, result FROM idempotency_keys
+        WHERE scope = ? AND key = ? AND created_at > datetime('now', ?)
+    """, (scope, key, _idempotency_ttl_modifier()))
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    if row[0] != fingerprint:
+        raise IdempotencyKeyReused("Ключ ідемпотентності вже використано для іншого запиту")
+    return row[1]
+
+def _save_idempotent_result(cursor, scope, key, fingerprint, result):
+    # REPLACE перезаписує прострочений рядок, який ще не прибрав фоновий потік
+    cursor.execute("""
+        INSERT OR REPLACE INTO idempotency_keys (scope, key, fingerprint, result)
+        VALUES (?, ?, ?, ?)
+    """, (scope, key, fingerprint, result))
+
+def get_idempotent_result(scope, key, fingerprint):
+    """Результат уже виконаного запиту з цим ключем (без блокування на запис) або None"""
+    ensure_database()
+    conn = get_db_connection()
+    try:
+        return _idempotent_result(conn.cursor(), scope, key, fingerprint)
+    finally:
+        conn.close()
+
+def expire_idempotency_keys(batch_size=None):
+    """Видалити прострочені ключі ідемпотентності пакетами; повертає кількість"""
+    batch_size = batch_size or Config.SEAT_HOLD_SWEEP_BATCH
+    removed = 0
+    conn = get_db_connection()
+    try:
+        while True:
+            begin_immediate(conn)
+            cursor = conn.execute("""
+                DELETE FROM idempotency_keys WHERE (scope, key) IN (
+                    SELECT scope, key FROM idempotency_keys WHERE created_at <= datetime('now', ?) LIMIT ?
+                )
+            """, (_idempotency_ttl_modifier(), batch_size))
+            conn.commit()
+            removed += cursor.rowcount
+            if cursor.rowcount < batch_size:
+                return removed
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Помилка прибирання ключів ідемпотентності: {str(e)}")
+        return removed
     finally:
         conn.close()
 
-def create_booking(session_id, customer_email, customer_name, selected_seats):
-    """Створити бронювання"""
+def create_booking(session_id, customer_email, customer_name, selected_seats, hold_token=None,
+                   idempotency_key=None, fingerprint=None):
+    """Створити бронювання
+
+    Перевірка місць і вставка виконуються в одній транзакції BEGIN IMMEDIATE,
+    а частковий унікальний індекс (session_id, seat_id) гарантує, що місце
+    не буде продане двічі навіть при гонці між процесами. Місця, утримані
+    іншим покупцем, забронювати не можна; власні утримання (hold_token)
+    знімаються разом з бронюванням.
+    
+    З idempotency_key код бронювання зберігається в тій самій транзакції, і
+    повтор запиту з тим самим ключем і fingerprint повертає вже створений код.
+    """
     ensure_database()
+    seat_ids = list(dict.fromkeys(selected_seats))
+    if not seat_ids:
+        raise Exception("Оберіть хоча б одне місце")
+    
     conn = get_db_connection()
     try:
         cursor = conn.cursor()
+        begin_immediate(conn)
         
-        # Перевірити чи місця все ще вільні
-        available_seats = get_available_seats(session_id)
-        available_seat_ids = {seat['id'] for seat in available_seats if seat['is_available']}
+        if idempotency_key:
+            # Повтор, що розминувся з першим запитом, бачить його результат тут
+            booking_code = _idempotent_result(cursor, 'book', idempotency_key, fingerprint)
+            if booking_code:
+                conn.rollback()
+                return booking_code
         
-        for seat_id in selected_seats:
-            if seat_id not in available_seat_ids:
-                raise Exception(f"Місце {seat_id} вже зайняте")
+        # Перевірити, що місця належать залу сеансу і ще вільні
+        _check_seats_bookable(cursor, session_id, seat_ids, hold_token)
         
-        # Генеруємо унікальний код бронювання
-        booking_code = generate_unique_booking_code(conn)
+        # Код унікальний за побудовою: номер з лічильника в цій же транзакції
+        booking_code = generate_booking_code(cursor)
         
         # Створюємо бронювання
         sql_booking = """
@@ -414,17 +1750,32 @@ def create_booking(session_id, customer_email, customer_name, selected_seats):
         cursor.execute(sql_booking, (session_id, customer_email, customer_name, booking_code))
         booking_id = cursor.lastrowid
         
-        # Додаємо заброньовані місця
-        for seat_id in selected_seats:
-            sql_seat = "INSERT INTO booked_seats (booking_id, seat_id) VALUES (?, ?)"
-            cursor.execute(sql_seat, (booking_id, seat_id))
+        # Додаємо заброньовані місця одним executemany
+        cursor.executemany(
+            "INSERT INTO booked_seats (booking_id, seat_id, session_id) VALUES (?, ?, ?)",
+            [(booking_id, seat_id, session_id) for seat_id in seat_ids]
+        )
+        
+        if hold_token:
+            cursor.execute("DELETE FROM seat_holds WHERE session_id = ? AND hold_token = ?",
+                           (session_id, hold_token))
         
+        version = _record_seat_changes(cursor, session_id, seat_ids)
+        sold_out = _sold_out(cursor, session_id)
+        if idempotency_key:
+            _save_idempotent_result(cursor, 'book', idempotency_key, fingerprint, booking_code)
         conn.commit()
+        _seat_map_changed(session_id, seat_ids, 'booked', version)
+        if sold_out:
+            # Позначка "Розпродано" в афіші - одразу, а не після OCCUPANCY_CACHE_TTL
+            cache.invalidate('catalog')
         return booking_code
         
     except sqlite3.IntegrityError as e:
         conn.rollback()
         logger.error(f"Помилка цілісності бази даних: {str(e)}")
+        if 'booked_seats.session_id' in str(e):
+            raise Exception("Одне з обраних місць вже зайняте")
         raise Exception("Помилка бази даних при бронюванні")
     except Exception as e:
         conn.rollback()
@@ -460,15 +1811,45 @@ def get_booking_by_code(booking_code):
     finally:
         conn.close()
 
-def cancel_booking(booking_code):
-    """Скасувати бронювання"""
+def cancel_booking(booking_code, idempotency_key=None):
+    """Скасувати бронювання
+
+    Повтор з тим самим idempotency_key знову повертає True, а не "вже скасовано".
+    """
     ensure_database()
     conn = get_db_connection()
     try:
         cursor = conn.cursor()
-        cursor.execute("UPDATE bookings SET status = 'cancelled' WHERE booking_code = ?", (booking_code,))
+        begin_immediate(conn)
+        if idempotency_key and _idempotent_result(cursor, 'cancel', idempotency_key, booking_code):
+            conn.rollback()
+            return True
+        cursor.execute(
+            "SELECT id, session_id FROM bookings WHERE booking_code = ? AND status = 'active'",
+            (booking_code,)
+        )
+        booking = cursor.fetchone()
+        if not booking:
+            conn.rollback()
+            return False
+        cursor.execute("UPDATE bookings SET status = 'cancelled' WHERE id = ?", (booking['id'],))
+        cursor.execute("SELECT seat_id FROM booked_seats WHERE booking_id = ? AND is_active = 1",
+                       (booking['id'],))
+        seat_ids = [row['seat_id'] for row in cursor.fetchall()]
+        was_sold_out = _sold_out(cursor, booking['session_id'])
+        # Звільняємо місця для нових бронювань
+        cursor.execute("UPDATE booked_seats SET is_active = 0 WHERE booking_id = ?", (booking['id'],))
+        version = _record_seat_changes(cursor, booking['session_id'], seat_ids)
+        if idempotency_key:
+            _save_idempotent_result(cursor, 'cancel', idempotency_key, booking_code, '1')
         conn.commit()
-        return cursor.rowcount > 0
+        _seat_map_changed(booking['session_id'], seat_ids, 'free', version)
+        if was_sold_out:
+            cache.invalidate('catalog')
+        return True
+    except IdempotencyKeyReused:
+        conn.rollback()
+        raise
     except Exception as e:
         conn.rollback()
         logger.error(f"Помилка скасування бронювання {booking_code}: {str(e)}")
@@ -476,35 +1857,9 @@ def cancel_booking(booking_code):
     finally:
         conn.close()
 
-def get_bookings_by_email(email):
-    """Отримати всі бронювання за email"""
-    ensure_database()
-    conn = get_db_connection()
-    try:
-        cursor = conn.cursor()
-        sql = """
-        SELECT b.*, f.title as film_title, s.session_date, s.session_time,
-               h.name as hall_name, GROUP_CONCAT(st.row_number || '-' || st.seat_number) as seats
-        FROM bookings b
-        JOIN sessions s ON b.session_id = s.id
-        JOIN films f ON s.film_id = f.id
-        JOIN halls h ON s.hall_id = h.id
-        JOIN booked_seats bs ON b.id = bs.booking_id
-        JOIN seats st ON bs.seat_id = st.id
-        WHERE b.customer_email = ?
-        GROUP BY b.id
-        ORDER BY b.created_at DESC
-        """
-        cursor.execute(sql, (email,))
-        return [dict(row) for row in cursor.fetchall()]
-    except Exception as e:
-        logger.error(f"Помилка отримання бронювань для {email}: {str(e)}")
-        return []
-    finally:
-        conn.close()
-
+@cache.cached('catalog', ttl=Config.OCCUPANCY_CACHE_TTL)
 def get_unique_sessions_for_film(film_id):
-    """Отримати унікальні сеанси для фільму (без дублікатів)"""
+    """Отримати унікальні сеанси для фільму (без дублікатів) з кількістю вільних місць"""
     ensure_database()
     conn = get_db_connection()
     try:
@@ -516,9 +1871,12 @@ def get_unique_sessions_for_film(film_id):
             s.session_time,
             s.price,
             h.name as hall_name,
-            h.hall_type
+            h.hall_type,
+            o.capacity,
+            MAX(o.capacity - o.sold - o.held, 0) AS seats_left
         FROM sessions s
         JOIN halls h ON s.hall_id = h.id
+        LEFT JOIN session_occupancy o ON o.session_id = s.id
         WHERE s.film_id = ? AND s.session_date >= date('now')
         ORDER BY s.session_date, s.session_time
         """
@@ -530,20 +1888,95 @@ def get_unique_sessions_for_film(film_id):
     finally:
         conn.close()
 
+def _rebuild_session_occupancy(cursor):
+    """Перерахувати session_occupancy з місць, бронювань і утримань (в поточній транзакції)
+
+    Очікувані лічильники рахуються трьома агрегатами по індексах у тимчасову
+    таблицю; переписуються лише рядки, що розходяться. Повертає
+    (кількість сеансів, кількість виправлених рядків).
+    """
+    cursor.execute("""
+        CREATE TEMP TABLE IF NOT EXISTS expected_occupancy (
+            session_id INTEGER PRIMARY KEY, capacity INTEGER, sold INTEGER, held INTEGER
+        )
+    """)
+    cursor.execute("DELETE FROM temp.expected_occupancy")
+    cursor.execute("""
+        INSERT INTO temp.expected_occupancy (session_id, capacity, sold, held)
+        SELECT s.id, COALESCE(c.n, 0), COALESCE(b.n, 0), COALESCE(h.n, 0)
+        FROM sessions s
+        LEFT JOIN (SELECT hall_id, COUNT(*) AS n FROM seats GROUP BY hall_id) c ON c.hall_id = s.hall_id
+        LEFT JOIN (SELECT session_id, COUNT(*) AS n FROM booked_seats
+                   WHERE is_active = 1 GROUP BY session_id) b ON b.session_id = s.id
+        LEFT JOIN (SELECT session_id, COUNT(*) AS n FROM seat_holds GROUP BY session_id) h ON h.session_id = s.id
+    """)
+    sessions = cursor.execute("SELECT COUNT(*) FROM temp.expected_occupancy").fetchone()[0]
+    fixed = cursor.execute("""
+        INSERT OR REPLACE INTO session_occupancy (session_id, capacity, sold, held)
+        SELECT e.session_id, e.capacity, e.sold, e.held
+        FROM temp.expected_occupancy e
+        LEFT JOIN session_occupancy o ON o.session_id = e.session_id
+        WHERE o.session_id IS NULL OR o.capacity != e.capacity OR o.sold != e.sold OR o.held != e.held
+    """).rowcount
+    fixed += cursor.execute("""
+        DELETE FROM session_occupancy
+        WHERE session_id NOT IN (SELECT session_id FROM temp.expected_occupancy)
+    """).rowcount
+    cursor.execute("DROP TABLE temp.expected_occupancy")
+    return sessions, fixed
+
+def rebuild_session_occupancy():
+    """Перевірити і виправити лічильники заповненості всіх сеансів
+
+    Повертає (кількість сеансів, кількість виправлених рядків); якщо щось
+    виправлено, кеш афіші інвалідується.
+    """
+    ensure_database()
+    conn = get_db_connection()
+    try:
+        begin_immediate(conn)
+        sessions, fixed = _rebuild_session_occupancy(conn.cursor())
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    if fixed:
+        logger.warning(f"Лічильники заповненості розходились для {fixed} сеансів, перераховано")
+        cache.invalidate('catalog')
+    return sessions, fixed
+
+def _sold_out(cursor, session_id):
+    """Чи продані всі місця сеансу (за лічильниками session_occupancy)"""
+    cursor.execute("SELECT sold >= capacity FROM session_occupancy WHERE session_id = ?", (session_id,))
+    row = cursor.fetchone()
+    return bool(row and row[0])
+
+# Зведення продажів analytics.py (міграція 12)
+_ROLLUP_TABLES = ('sales_daily', 'sales_hourly', 'seat_sales', 'rollup_cancellations')
+
+# Дані афіші в порядку видалення: залежні таблиці перед sessions і films
+_FILM_DATA_TABLES = ('seat_holds', 'seat_map_changes', 'seat_map_versions', 'booked_seats', 'bookings',
+                     'idempotency_keys', 'session_occupancy', 'sessions', 'films')
+
 def update_films_data():
-    """Функція для оновлення фільмів (можна викликати окремо)"""
+    """Функція для оновлення фільмів (можна викликати окремо)
+
+    Старі фільми, сеанси й усе, що від них залежить (бронювання, утримання,
+    журнал змін схем місць, лічильники заповненості, зведення продажів,
+    ключі ідемпотентності), видаляються в одній транзакції з вставкою нових.
+    """
     conn = get_db_connection()
     try:
-        # Очистити старі дані
-        conn.executescript('''
-            DELETE FROM booked_seats;
-            DELETE FROM bookings;
-            DELETE FROM sessions;
-            DELETE FROM films;
-        ''')
+        begin_immediate(conn)
+        # Очистити старі дані (executescript комітив би після кожного скрипту)
+        for table in _FILM_DATA_TABLES + _ROLLUP_TABLES:
+            conn.execute(f"DELETE FROM {table}")
+        conn.execute("DELETE FROM app_meta WHERE key = 'analytics_booking_id'")
         
         # Додати нові фільми
-        conn.executescript('''
+        conn.execute('''
             INSERT INTO films (id, title, description, duration, genre, poster_url) VALUES
             (1, 'Дюна: Частина друга', 'Пол Атрідіс об''єднується з Чані та фременами на шляху помсти тим, хто знищив його родину. Зіткнувшись з вибором між коханням та долею всесвіту, він намагається запобігти страшному майбутньому.', 166, 'Фантастика', '/static/images/posters/dune2.jpg'),
             (2, 'Оппенгеймер', 'Історія фізика-теоретика Джуліуса Роберта Оппенгеймера, творця атомної бомби, та його моральних страждань після створення зброї масового ураження.', 180, 'Драма', '/static/images/posters/oppenheimer.jpg'),
@@ -554,11 +1987,11 @@ def update_films_data():
             (7, 'Годзіла та Конг: Нова імперія', 'Годзіла та Конг об''єднують сили проти спільного ворога, який загрожує їхньому існуванню та існуванню людства.', 115, 'Фантастика', '/static/images/posters/godzilla_kong.jpg'),
             (8, 'Форсаж 10', 'Доміник Торетто та його родина зіткнуться з найнебезпечнішим ворогом, який використовує минуле Дома проти нього.', 141, 'Екшн', '/static/images/posters/fast10.jpg'),
             (9, 'Вартові галактики 3', 'Команда Пітера Квілла рятує Всесвіт та розкриває таємниці Рокета у останній частині епічної космічної саги.', 150, 'Фантастика', '/static/images/posters/gotg3.jpg'),
-            (10, 'Індиана Джонс і Реліквія долі', 'Індиана Джонс вирушає у чергову пригоду за артефактом, що змінює долю у заключній частині легендарної серії.', 154, 'Пригоди', '/static/images/posters/indiana_jones.jpg');
+            (10, 'Індиана Джонс і Реліквія долі', 'Індиана Джонс вирушає у чергову пригоду за артефактом, що змінює долю у заключній частині легендарної серії.', 154, 'Пригоди', '/static/images/posters/indiana_jones.jpg')
         ''')
         
         # Додати унікальні сеанси
-        conn.executescript('''
+        conn.execute('''
             INSERT INTO sessions (film_id, hall_id, session_date, session_time, price) VALUES
             (1, 1, date('now'), '10:00:00', 120.00),
             (1, 2, date('now'), '13:30:00', 150.00),
@@ -576,15 +2009,17 @@ def update_films_data():
             (5, 2, date('now', '+2 day'), '14:00:00', 140.00),
             (9, 3, date('now', '+2 day'), '16:30:00', 180.00),
             (10, 1, date('now', '+2 day'), '19:00:00', 130.00),
-            (1, 4, date('now', '+2 day'), '21:30:00', 220.00);
+            (1, 4, date('now', '+2 day'), '21:30:00', 220.00)
         ''')
         
         # Оновити схему місць
-        create_proper_seats_schema(conn)
+        sync_hall_layouts(conn)
         
         conn.commit()
+        cache.invalidate('catalog')
         logger.info("✅ Фільми оновлені!")
     except Exception as e:
+        conn.rollback()
         logger.error(f"Помилка оновлення фільмів: {str(e)}")
         raise e
     finally:
@@ -592,9 +2027,16 @@ def update_films_data():
 
 def recreate_database():
     """Перестворити базу даних з оновленими шляхами"""
+    close_pool()
     if os.path.exists(Config.DATABASE_PATH):
         os.remove(Config.DATABASE_PATH)
     init_database()
+    conn = get_db_connection()
+    try:
+        seed_database(conn)
+    finally:
+        conn.close()
+    cache.invalidate('catalog')
     print("✅ База даних перестворена з оновленими шляхами до афіш!")
 
 
@@ -614,11 +2056,15 @@ def create_user(email, username, password_hash, full_name=None, phone=None):
         conn.commit()
         return cursor.lastrowid
     except sqlite3.IntegrityError as e:
+        conn.rollback()
         if "UNIQUE constraint failed: users.email" in str(e):
             raise Exception("Користувач з таким email вже існує")
         elif "UNIQUE constraint failed: users.username" in str(e):
             raise Exception("Користувач з таким іменем вже існує")
         raise e
+    except Exception:
+        conn.rollback()
+        raise
     finally:
         conn.close()
 
@@ -672,6 +2118,9 @@ def update_user_profile(user_id, full_name=None, phone=None):
         cursor.execute(sql, params)
         conn.commit()
         return cursor.rowcount > 0
+    except Exception:
+        conn.rollback()
+        raise
     finally:
         conn.close()
 
@@ -693,6 +2142,9 @@ def add_user_payment_method(user_id, card_last_four, card_brand, is_default=Fals
         cursor.execute(sql, (user_id, card_last_four, card_brand, is_default))
         conn.commit()
         return cursor.lastrowid
+    except Exception:
+        conn.rollback()
+        raise
     finally:
         conn.close()
 
@@ -708,29 +2160,169 @@ def get_user_payment_methods(user_id):
     finally:
         conn.close()
 
-def get_user_bookings(user_id):
-    """Отримати всі бронювання користувача"""
+_BOOKING_LIST_SQL = """
+SELECT b.id, b.session_id, b.booking_code, b.status, b.created_at,
+       f.title AS film_title, s.session_date, s.session_time, s.price,
+       h.name AS hall_name
+FROM bookings b
+JOIN sessions s ON s.id = b.session_id
+JOIN films f ON f.id = s.film_id
+JOIN halls h ON h.id = s.hall_id
+WHERE b.customer_email = ? {keyset}
+ORDER BY b.created_at DESC, b.id DESC
+LIMIT ?
+"""
+
+def _fetch_booking_seats(cursor, bookings):
+    """Додати до кожного бронювання список місць [{'row_number', 'seat_number', 'category'}]
+
+    Один запит по booking_id (індекс UNIQUE(booking_id, seat_id)) замість
+    GROUP_CONCAT у запиті бронювань.
+    """
+    by_id = {}
+    for booking in bookings:
+        booking['seats'] = []
+        by_id[booking['id']] = booking
+    if not by_id:
+        return bookings
+    placeholders = ', '.join('?' * len(by_id))
+    cursor.execute(f"""
+        SELECT bs.booking_id, st.row_number, st.seat_number, st.category
+        FROM booked_seats bs
+        JOIN seats st ON st.id = bs.seat_id
+        WHERE bs.booking_id IN ({placeholders})
+        ORDER BY bs.booking_id, st.row_number, st.seat_number
+    """, list(by_id))
+    for row in cursor.fetchall():
+        by_id[row['booking_id']]['seats'].append({
+            'row_number': row['row_number'],
+            'seat_number': row['seat_number'],
+            'category': row['category'],
+        })
+    return bookings
+
+def _keyset(alias, cursor):
+    """Умова "після курсора" для сторінки, відсортованої за (created_at, id) DESC"""
+    if cursor is None:
+        return '', []
+    return f"AND ({alias}created_at, {alias}id) < (?, ?)", list(decode_cursor(cursor))
+
+def _fetch_bookings_page(cursor, email, after=None, limit=None):
+    """Сторінка бронювань за email (новіші першими) з місцями"""
+    limit = limit or Config.PROFILE_BOOKINGS_PAGE_SIZE
+    keyset, params = _keyset('b.', after)
+    cursor.execute(_BOOKING_LIST_SQL.format(keyset=keyset), [email, *params, limit + 1])
+    page = make_page([dict(row) for row in cursor.fetchall()], limit)
+    _fetch_booking_seats(cursor, page['items'])
+    return page
+
+def get_bookings_by_email(email, after=None, limit=None):
+    """Сторінка бронювань за email: {'items', 'next_cursor'}
+
+    after - курсор з next_cursor попередньої сторінки.
+    """
+    ensure_database()
+    conn = get_db_connection()
+    try:
+        return _fetch_bookings_page(conn.cursor(), email, after, limit)
+    finally:
+        conn.close()
+
+def get_user_bookings(user_id, after=None, limit=None):
+    """Сторінка бронювань користувача (новіші першими): {'items', 'next_cursor'}"""
     ensure_database()
     conn = get_db_connection()
     try:
         cursor = conn.cursor()
-        sql = """
-        SELECT b.*, f.title as film_title, s.session_date, s.session_time,
-               h.name as hall_name, GROUP_CONCAT(st.row_number || '-' || st.seat_number) as seats
-        FROM bookings b
-        JOIN sessions s ON b.session_id = s.id
-        JOIN films f ON s.film_id = f.id
-        JOIN halls h ON s.hall_id = h.id
-        JOIN booked_seats bs ON b.id = bs.booking_id
-        JOIN seats st ON bs.seat_id = st.id
-        WHERE b.customer_email = (
-            SELECT email FROM users WHERE id = ?
-        )
-        GROUP BY b.id
-        ORDER BY b.created_at DESC
-        """
-        cursor.execute(sql, (user_id,))
-        return [dict(row) for row in cursor.fetchall()]
+        cursor.execute("SELECT email FROM users WHERE id = ?", (user_id,))
+        user = cursor.fetchone()
+        if not user:
+            return {'items': [], 'next_cursor': None}
+        return _fetch_bookings_page(cursor, user['email'], after, limit)
+    finally:
+        conn.close()
+
+def _fetch_notifications_page(cursor, user_id, unread_only=False, after=None, limit=None):
+    """Сторінка особистих сповіщень разом із розсилками
+
+    Розсилки віддаються з від'ємним id (-broadcasts.id), тож (created_at, id)
+    лишається єдиним порядком і для курсора, і для позначки "прочитано".
+    Кожне джерело читає не більше limit + 1 рядків по індексу, далі злиття.
+    """
+    limit = limit or Config.NOTIFICATIONS_PAGE_SIZE
+    keyset, params = _keyset('', after)
+    unread = "AND is_read = FALSE" if unread_only else ""
+    cursor.execute(f"""
+        SELECT id, user_id, type, title, message, is_read, created_at FROM notifications
+        WHERE user_id = ? {unread} {keyset}
+        ORDER BY created_at DESC, id DESC
+        LIMIT ?
+    """, [user_id, *params, limit + 1])
+    rows = [dict(row) for row in cursor.fetchall()]
+    
+    keyset = "AND (b.created_at, -b.id) < (?, ?)" if after is not None else ""
+    unread = "AND r.broadcast_id IS NULL" if unread_only else ""
+    cursor.execute(f"""
+        SELECT -b.id AS id, r.user_id IS NOT NULL AS is_read, b.type, b.title, b.message, b.created_at
+        FROM broadcasts b
+        LEFT JOIN broadcast_reads r ON r.user_id = ? AND r.broadcast_id = b.id
+        WHERE 1 = 1 {unread} {keyset}
+        ORDER BY b.created_at DESC, b.id ASC
+        LIMIT ?
+    """, [user_id, *params, limit + 1])
+    rows.extend({**dict(row), 'user_id': user_id} for row in cursor.fetchall())
+    
+    rows.sort(key=lambda row: (row['created_at'], row['id']), reverse=True)
+    return make_page(rows[:limit + 1], limit)
+
+def _unread_count(cursor, user_id):
+    """Кількість непрочитаних сповіщень і розсилок з лічильників, без підрахунку рядків"""
+    cursor.execute("""
+        SELECT u.unread_notifications + COALESCE(q.value, 0) - u.broadcasts_read
+        FROM users u
+        LEFT JOIN sequences q ON q.name = 'broadcasts'
+        WHERE u.id = ?
+    """, (user_id,))
+    row = cursor.fetchone()
+    return max(row[0], 0) if row else 0
+
+def get_profile_dashboard(user_id, bookings_limit=None, notifications_limit=None):
+    """Усі дані сторінки профілю через одне з'єднання
+
+    Користувач, перша сторінка бронювань (з місцями списками), їх загальна
+    кількість, перша сторінка непрочитаних сповіщень і їх кількість - кожне
+    окремим індексованим запитом. Наступні сторінки - за курсорами
+    *_next_cursor. Повертає None, якщо користувача немає.
+    """
+    bookings_limit = bookings_limit or Config.PROFILE_BOOKINGS_PAGE_SIZE
+    notifications_limit = notifications_limit or Config.NOTIFICATIONS_PAGE_SIZE
+    ensure_database()
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM users WHERE id = ?", (user_id,))
+        user = cursor.fetchone()
+        if not user:
+            return None
+        user = dict(user)
+        
+        bookings = _fetch_bookings_page(cursor, user['email'], limit=bookings_limit)
+        cursor.execute("SELECT COUNT(*) FROM bookings WHERE customer_email = ?", (user['email'],))
+        bookings_total = cursor.fetchone()[0]
+        
+        notifications = _fetch_notifications_page(cursor, user_id, unread_only=True,
+                                                  limit=notifications_limit)
+        unread_count = _unread_count(cursor, user_id)
+        
+        return {
+            'user': user,
+            'bookings': bookings['items'],
+            'bookings_next_cursor': bookings['next_cursor'],
+            'bookings_total': bookings_total,
+            'notifications': notifications['items'],
+            'notifications_next_cursor': notifications['next_cursor'],
+            'unread_count': unread_count,
+        }
     finally:
         conn.close()
 
@@ -747,37 +2339,227 @@ def add_notification(user_id, type, title, message):
         cursor.execute(sql, (user_id, type, title, message))
         conn.commit()
         return cursor.lastrowid
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+def get_user_notifications(user_id, unread_only=False, after=None, limit=None):
+    """Сторінка сповіщень користувача (новіші першими): {'items', 'next_cursor'}"""
+    ensure_database()
+    conn = get_db_connection()
+    try:
+        return _fetch_notifications_page(conn.cursor(), user_id, unread_only, after, limit)
+    finally:
+        conn.close()
+
+def get_unread_count(user_id):
+    """Кількість непрочитаних сповіщень користувача (включно з розсилками)"""
+    ensure_database()
+    conn = get_db_connection()
+    try:
+        return _unread_count(conn.cursor(), user_id)
     finally:
         conn.close()
 
-def get_user_notifications(user_id, unread_only=False):
-    """Отримати сповіщення користувача"""
+def notify_users(type, title, message, user_ids=None):
+    """Однакове сповіщення багатьом користувачам однією транзакцією
+
+    Без user_ids - усім користувачам одним INSERT ... SELECT, інакше -
+    executemany по списку. Повертає кількість доданих сповіщень.
+    """
     ensure_database()
     conn = get_db_connection()
     try:
+        begin_immediate(conn)
         cursor = conn.cursor()
-        if unread_only:
-            sql = "SELECT * FROM notifications WHERE user_id = ? AND is_read = FALSE ORDER BY created_at DESC"
-            cursor.execute(sql, (user_id,))
+        if user_ids is None:
+            cursor.execute("""
+                INSERT INTO notifications (user_id, type, title, message)
+                SELECT id, ?, ?, ? FROM users
+            """, (type, title, message))
         else:
-            sql = "SELECT * FROM notifications WHERE user_id = ? ORDER BY is_read ASC, created_at DESC LIMIT 50"
-            cursor.execute(sql, (user_id,))
-        return [dict(row) for row in cursor.fetchall()]
+            cursor.executemany("""
+                INSERT INTO notifications (user_id, type, title, message)
+                SELECT id, ?, ?, ? FROM users WHERE id = ?
+            """, ((type, title, message, user_id) for user_id in user_ids))
+        count = cursor.rowcount
+        conn.commit()
+        return count
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Помилка розсилки сповіщень: {str(e)}")
+        raise
     finally:
         conn.close()
 
-def mark_notification_read(notification_id):
-    """Позначити сповіщення як прочитане"""
+def broadcast_notification(type, title, message):
+    """Розсилка всім користувачам одним рядком; повертає її id у сповіщеннях (від'ємний)"""
     ensure_database()
     conn = get_db_connection()
     try:
         cursor = conn.cursor()
-        sql = "UPDATE notifications SET is_read = TRUE WHERE id = ?"
-        cursor.execute(sql, (notification_id,))
+        cursor.execute("INSERT INTO broadcasts (type, title, message) VALUES (?, ?, ?)",
+                       (type, title, message))
         conn.commit()
-        return cursor.rowcount > 0
+        return -cursor.lastrowid
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+def _mark_read(cursor, user_id, notification_ids=None):
+    """Позначити прочитаними сповіщення користувача (усі або за id); повертає кількість"""
+    marked = 0
+    if notification_ids is None:
+        cursor.execute("UPDATE notifications SET is_read = TRUE WHERE user_id = ? AND is_read = FALSE",
+                       (user_id,))
+        marked += cursor.rowcount
+        cursor.execute("""
+            INSERT OR IGNORE INTO broadcast_reads (user_id, broadcast_id)
+            SELECT ?, id FROM broadcasts
+        """, (user_id,))
+        marked += cursor.rowcount
+        return marked
+    
+    personal = [notification_id for notification_id in notification_ids if notification_id > 0]
+    broadcasts = [-notification_id for notification_id in notification_ids if notification_id < 0]
+    # Чужі id просто не збігаються з умовою user_id = ?
+    for start in range(0, len(personal), 500):
+        chunk = personal[start:start + 500]
+        cursor.execute(f"""
+            UPDATE notifications SET is_read = TRUE
+            WHERE user_id = ? AND is_read = FALSE AND id IN ({', '.join('?' * len(chunk))})
+        """, [user_id, *chunk])
+        marked += cursor.rowcount
+    for start in range(0, len(broadcasts), 500):
+        chunk = broadcasts[start:start + 500]
+        cursor.execute(f"""
+            INSERT OR IGNORE INTO broadcast_reads (user_id, broadcast_id)
+            SELECT ?, id FROM broadcasts WHERE id IN ({', '.join('?' * len(chunk))})
+        """, [user_id, *chunk])
+        marked += cursor.rowcount
+    return marked
+
+def mark_notifications_read(user_id, notification_ids=None):
+    """Позначити прочитаними всі або вибрані сповіщення користувача однією транзакцією
+
+    Повертає (кількість позначених, нова кількість непрочитаних).
+    """
+    ensure_database()
+    conn = get_db_connection()
+    try:
+        begin_immediate(conn)
+        cursor = conn.cursor()
+        marked = _mark_read(cursor, user_id, notification_ids)
+        unread = _unread_count(cursor, user_id)
+        conn.commit()
+        return marked, unread
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Помилка позначення сповіщень: {str(e)}")
+        raise
     finally:
         conn.close()
 
+def mark_notification_read(notification_id, user_id):
+    """Позначити сповіщення користувача як прочитане
+
+    Повертає False, якщо такого сповіщення в користувача немає.
+    """
+    ensure_database()
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        if notification_id < 0:
+            cursor.execute("SELECT 1 FROM broadcasts WHERE id = ?", (-notification_id,))
+        else:
+            cursor.execute("SELECT 1 FROM notifications WHERE id = ? AND user_id = ?",
+                           (notification_id, user_id))
+        if not cursor.fetchone():
+            return False
+        _mark_read(cursor, user_id, [notification_id])
+        conn.commit()
+        return True
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+def _is_full_scan(detail):
+    """Рядок EXPLAIN QUERY PLAN, що означає повне сканування таблиці"""
+    if not detail.startswith('SCAN '):
+        return False
+    # Сканування підзапитів/CTE та константних рядків не читають таблиці, а
+    # віртуальна таблиця FTS5 з обмеженням MATCH (":M") читає свій індекс
+    return not (detail.startswith('SCAN CONSTANT ROW') or '(subquery' in detail
+                or 'USING INDEX' in detail or 'USING COVERING INDEX' in detail
+                or ('VIRTUAL TABLE INDEX' in detail and ':M' in detail))
+
+def check_query_plans():
+    """Перевірити EXPLAIN QUERY PLAN гарячих запитів на повні сканування таблиць
+
+    Виконує гарячі функції читання на одному з'єднанні, записує фактичні SQL
+    (з підставленими параметрами) і повертає список
+    (sql, [рядки плану]) для запитів, де є SCAN таблиці без індексу.
+    Потребує контексту Flask, щоб усі функції використали одне з'єднання.
+    """
+    conn = get_db_connection()
+    if not conn.request_bound:
+        conn.close()
+        raise RuntimeError("check_query_plans потребує контексту застосунку Flask")
+    
+    cursor = conn.cursor()
+    session = cursor.execute("SELECT id, film_id, hall_id FROM sessions ORDER BY id LIMIT 1").fetchone()
+    user = cursor.execute("SELECT id, email FROM users ORDER BY id LIMIT 1").fetchone()
+    booking = cursor.execute("SELECT booking_code FROM bookings ORDER BY id LIMIT 1").fetchone()
+    
+    statements = []
+    conn.set_trace_callback(statements.append)
+    try:
+        # Функції каталогу викликаються в обхід кешу, щоб SQL справді виконався
+        get_films_with_sessions.uncached()
+        if session:
+            get_film_by_id.uncached(session['film_id'])
+            get_unique_sessions_for_film.uncached(session['film_id'])
+            get_session_by_id(session['id'])
+            get_hall_layout.uncached(session['hall_id'])
+            get_available_seats(session['id'])
+            get_seat_map(session['id'], since=0)
+        if booking:
+            get_booking_by_code(booking['booking_code'])
+        if user:
+            get_bookings_by_email(user['email'])
+            get_user_bookings(user['id'])
+            get_profile_dashboard(user['id'])
+            get_user_notifications(user['id'])
+            get_user_notifications(user['id'], unread_only=True)
+            # Наступні сторінки - пошук по індексу від курсора
+            last_page = encode_cursor('9999-12-31 23:59:59', 2 ** 62)
+            get_bookings_by_email(user['email'], after=last_page)
+            get_user_notifications(user['id'], after=last_page)
+            get_user_notifications(user['id'], unread_only=True, after=last_page)
+            get_unread_count(user['id'])
+        search_films('а', upcoming_only=True)
+        search_films('а', after=encode_cursor(0.0, 0))
+    finally:
+        conn.set_trace_callback(None)
+    
+    problems = []
+    for sql in dict.fromkeys(statements):
+        if not sql.lstrip().upper().startswith('SELECT'):
+            continue
+        # Службові запити FTS5 до власних таблиць (films_fts_config тощо),
+        # які він виконує при першому пошуку на з'єднанні
+        if "'main'." in sql:
+            continue
+        plan = [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql)]
+        if any(_is_full_scan(detail) for detail in plan):
+            problems.append((sql, plan))
+    return problems
+
 if __name__ == "__main__":
     recreate_database()
\ No newline at end of file
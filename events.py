@@ -0,0 +1,66 @@
+"""Pub/sub брокер змін схеми місць у межах процесу
+
+database.py публікує зміну стану місць сеансу один раз, а брокер розсилає
+її в черги всіх підписників (SSE-з'єднань) цього сеансу - без окремого
+запиту до БД на кожного клієнта. Брокер живе в пам'яті процесу: клієнти
+іншого воркера отримують зміни, зроблені в їхньому процесі, а решту
+побачать при повному перезавантаженні схеми (подія resync).
+"""
+import queue
+import threading
+from collections import defaultdict
+
+from config import Config
+
+class SeatEventBroker:
+    """Розсилка подій по сеансах у черги підписників"""
+
+    def __init__(self, queue_size=None):
+        self.queue_size = queue_size or Config.SEAT_EVENTS_QUEUE_SIZE
+        self._subscribers = defaultdict(set)  # session_id -> {queue.Queue}
+        self._lock = threading.Lock()
+
+    def subscribe(self, session_id):
+        """Підписатися на події сеансу; повертає чергу подій"""
+        subscription = queue.Queue(maxsize=self.queue_size)
+        with self._lock:
+            self._subscribers[session_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, session_id, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(session_id)
+            if subscribers is None:
+                return
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[session_id]
+
+    def publish(self, session_id, event):
+        """Надіслати подію всім підписникам сеансу"""
+        with self._lock:
+            subscribers = list(self._subscribers.get(session_id, ()))
+        for subscription in subscribers:
+            try:
+                subscription.put_nowait(event)
+            except queue.Full:
+                # Повільний клієнт: старі зміни вже неактуальні, хай перечитає схему
+                self._reset(subscription)
+        return len(subscribers)
+
+    @staticmethod
+    def _reset(subscription):
+        try:
+            while True:
+                subscription.get_nowait()
+        except queue.Empty:
+            pass
+        subscription.put_nowait({'type': 'resync'})
+
+    def subscriber_count(self, session_id=None):
+        with self._lock:
+            if session_id is not None:
+                return len(self._subscribers.get(session_id, ()))
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+seat_events = SeatEventBroker()
@@ -0,0 +1,147 @@
+"""Потокове вивантаження бронювань (CSV / NDJSON) для фінансових звітів
+
+Рядок звіту - одне заброньоване місце з даними бронювання, сеансу, фільму й
+залу. Запит виконується на окремому з'єднанні лише для читання
+(file:...?mode=ro): у режимі WAL воно читає знімок бази і не блокує
+create_booking, а сама база не може бути змінена через нього. Рядки
+читаються курсором пачками по Config.EXPORT_BATCH_SIZE (fetchmany) і
+одразу віддаються генератором, тож у пам'яті ніколи не лежить увесь звіт.
+У CSV текстові комірки, схожі на формули, екрануються (csv_safe); NDJSON
+віддає значення як є.
+"""
+import csv
+import io
+import json
+import pathlib
+import sqlite3
+
+from config import Config
+
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+COLUMNS = (
+    'booking_code', 'status', 'booked_at', 'customer_email', 'customer_name',
+    'session_id', 'session_date', 'session_time', 'film_id', 'film_title',
+    'hall_id', 'hall_name', 'hall_type', 'row_number', 'seat_number', 'seat_category', 'price',
+)
+
+def open_readonly_connection(path=None):
+    """З'єднання з базою лише для читання (без пулу і PRAGMA запису)"""
+    uri = pathlib.Path(path or Config.DATABASE_PATH).resolve().as_uri() + '?mode=ro'
+    conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+    conn.execute(f"PRAGMA busy_timeout = {int(Config.SQLITE_BUSY_TIMEOUT_MS)}")
+    return conn
+
+def _booking_query(date_from=None, date_to=None, film_id=None, hall_id=None):
+    """SQL і параметри вивантаження; дати - межі дати сеансу включно (YYYY-MM-DD)"""
+    conditions = []
+    params = []
+    if date_from:
+        conditions.append("s.session_date >= ?")
+        params.append(date_from)
+    if date_to:
+        conditions.append("s.session_date <= ?")
+        params.append(date_to)
+    if film_id is not None:
+        conditions.append("s.film_id = ?")
+        params.append(film_id)
+    if hall_id is not None:
+        conditions.append("s.hall_id = ?")
+        params.append(hall_id)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    # CROSS JOIN фіксує порядок: сеанси по індексу дати (фільму, залу), далі
+    # бронювання і місця по індексах сеансу і бронювання. Сортується лише
+    # кожен день окремо, тож перші рядки віддаються одразу, а не після
+    # сортування всього звіту.
+    sql = f"""
+    SELECT b.booking_code, b.status, b.created_at, b.customer_email, b.customer_name,
+           s.id, s.session_date, s.session_time, f.id, f.title,
+           h.id, h.name, h.hall_type, st.row_number, st.seat_number, st.category, s.price
+    FROM sessions s
+    CROSS JOIN bookings b ON b.session_id = s.id
+    CROSS JOIN booked_seats bs ON bs.booking_id = b.id
+    JOIN films f ON f.id = s.film_id
+    JOIN halls h ON h.id = s.hall_id
+    JOIN seats st ON st.id = bs.seat_id
+    {where}
+    ORDER BY s.session_date, s.id, b.id
+    """
+    return sql, params
+
+def iter_booking_rows(date_from=None, date_to=None, film_id=None, hall_id=None, batch_size=None, path=None):
+    """Кортежі рядків звіту (порядок COLUMNS), прочитані пачками fetchmany"""
+    batch_size = batch_size or Config.EXPORT_BATCH_SIZE
+    sql, params = _booking_query(date_from, date_to, film_id, hall_id)
+    conn = open_readonly_connection(path)
+    try:
+        cursor = conn.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            yield from rows
+    finally:
+        conn.close()
+
+# Текст, що починається з цих символів, Excel/LibreOffice виконують як формулу
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+def csv_safe(value):
+    """Значення комірки CSV, яке табличний редактор не прийме за формулу
+
+    Рядки на зразок "=HYPERLINK(...)" (ім'я чи email покупця) отримують
+    префікс-апостроф; числа й інші значення не змінюються.
+    """
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+def _csv_chunks(rows, batch_size):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMNS)
+    pending = 0
+    for row in rows:
+        writer.writerow([csv_safe(value) for value in row])
+        pending += 1
+        if pending == batch_size:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    yield buffer.getvalue()
+
+def _ndjson_chunks(rows, batch_size):
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(dict(zip(COLUMNS, row)), ensure_ascii=False))
+        if len(lines) == batch_size:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+def export_bookings(fmt='csv', date_from=None, date_to=None, film_id=None, hall_id=None, batch_size=None,
+                    path=None):
+    """Генератор текстових частин звіту у форматі fmt ('csv' або 'ndjson')
+
+    Кожна частина - до batch_size рядків. З'єднання відкривається при
+    читанні першої частини і закривається, коли генератор вичерпано або
+    закрито (наприклад, клієнт обірвав завантаження).
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Невідомий формат вивантаження: {fmt}")
+    batch_size = batch_size or Config.EXPORT_BATCH_SIZE
+    rows = iter_booking_rows(date_from, date_to, film_id, hall_id, batch_size, path)
+    chunks = _csv_chunks if fmt == 'csv' else _ndjson_chunks
+    return _closing(chunks(rows, batch_size), rows)
+
+def _closing(chunks, rows):
+    # Закриття відповіді закриває і курсор з з'єднанням, не чекаючи збирача сміття
+    try:
+        yield from chunks
+    finally:
+        rows.close()
@@ -0,0 +1,114 @@
+"""Декларативні схеми залів
+
+Схема залу - список рядків-сіток, по одному на ряд (ряди нумеруються з 1):
+  S - звичайне місце, V - VIP, L - диван для двох, A - для людей з інвалідністю,
+  . - прохід (займає колонку, але не номер місця).
+Префікс "N*" повторює рядок N разів, наприклад "10*SSSSS.SSSSS".
+
+Схеми всіх залів зберігаються в Config.HALL_LAYOUTS_PATH (JSON). database.py
+звіряє їх з таблицею seats і записує лише різницю, а для сторінки бронювання
+тримає в пам'яті HallLayout - паралельні масиви в порядку (ряд, місце).
+"""
+import functools
+import json
+import re
+from array import array
+
+from config import Config
+
+CATEGORIES = {'S': 'standard', 'V': 'vip', 'L': 'love', 'A': 'accessible'}
+CATEGORY_NAMES = tuple(CATEGORIES.values())
+AISLE = '.'
+
+_REPEAT = re.compile(r'^(\d+)\*(.*)$')
+
+def parse_grid(grid):
+    """Розібрати сітку залу на список (ряд, місце, колонка, категорія)"""
+    seats = []
+    row_number = 0
+    for line in grid:
+        repeat = 1
+        match = _REPEAT.match(line.strip())
+        if match:
+            repeat, line = int(match.group(1)), match.group(2)
+        line = line.strip()
+        if not line.strip(AISLE):
+            raise ValueError(f"Рядок схеми без місць: {line!r}")
+        for _ in range(repeat):
+            row_number += 1
+            seat_number = 0
+            for column, char in enumerate(line, start=1):
+                if char == AISLE:
+                    continue
+                if char not in CATEGORIES:
+                    raise ValueError(f"Невідомий символ {char!r} у схемі, ряд {row_number}")
+                seat_number += 1
+                seats.append((row_number, seat_number, column, CATEGORIES[char]))
+    return seats
+
+@functools.lru_cache(maxsize=4)
+def _load_definitions(path):
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    return {
+        hall['id']: {
+            'name': hall['name'],
+            'hall_type': hall.get('hall_type', '2D'),
+            'seats': parse_grid(hall['grid']),
+        }
+        for hall in data['halls']
+    }
+
+def load_definitions(path=None):
+    """Схеми залів з JSON: {hall_id: {'name', 'hall_type', 'seats'}}
+
+    Результат кешується за шляхом файлу і спільний - його не можна змінювати.
+    """
+    return _load_definitions(path or Config.HALL_LAYOUTS_PATH)
+
+class HallLayout:
+    """Схема залу в пам'яті: паралельні масиви в порядку (ряд, місце)"""
+
+    def __init__(self, hall_id):
+        self.hall_id = hall_id
+        self.seat_ids = array('q')
+        self.row_numbers = array('H')
+        self.seat_numbers = array('H')
+        self.columns = array('H')
+        self.categories = array('B')  # індекс у CATEGORY_NAMES
+
+    def append(self, seat_id, row_number, seat_number, column, category):
+        self.seat_ids.append(seat_id)
+        self.row_numbers.append(row_number)
+        self.seat_numbers.append(seat_number)
+        self.columns.append(column)
+        self.categories.append(CATEGORY_NAMES.index(category) if category in CATEGORY_NAMES else 0)
+
+    def __len__(self):
+        return len(self.seat_ids)
+
+    def render_rows(self, seats):
+        """Ряди для шаблону: [{'number', 'cells'}], де cells - місця або None (прохід)
+
+        seats - стан місць сеансу (словники з 'id'), категорія додається з схеми.
+        """
+        states = {seat['id']: seat for seat in seats}
+        rows = []
+        current = None
+        for index in range(len(self.seat_ids)):
+            row_number = self.row_numbers[index]
+            if current is None or current['number'] != row_number:
+                current = {'number': row_number, 'cells': []}
+                rows.append(current)
+            cells = current['cells']
+            column = self.columns[index]
+            while len(cells) < column - 1:
+                cells.append(None)
+            state = states.get(self.seat_ids[index], {'id': self.seat_ids[index], 'is_available': False})
+            cells.append({
+                **state,
+                'row_number': row_number,
+                'seat_number': self.seat_numbers[index],
+                'category': CATEGORY_NAMES[self.categories[index]],
+            })
+        return rows
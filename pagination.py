@@ -0,0 +1,38 @@
+"""Курсорна (keyset) пагінація за (created_at, id)
+
+Сторінка - {'items': [...], 'next_cursor': str або None}. Курсор кодує
+(created_at, id) останнього запису сторінки; наступна сторінка читається
+пошуком по індексу "(created_at, id) < курсор", тож її вартість не залежить
+від номера сторінки (на відміну від OFFSET). Для клієнта курсор непрозорий.
+Результати повнотекстового пошуку так само гортаються за (rank, id).
+"""
+import base64
+import json
+
+def encode_cursor(created_at, row_id):
+    raw = json.dumps([created_at, row_id], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor, key_type=str):
+    """(created_at, id) з курсора; ValueError для пошкодженого курсора
+
+    key_type - очікуваний тип першого значення (float для рангу пошуку).
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, TypeError, UnicodeError) as e:
+        raise ValueError("Некоректний курсор сторінки") from e
+    if key_type is float and isinstance(created_at, int) and not isinstance(created_at, bool):
+        created_at = float(created_at)
+    if not isinstance(created_at, key_type) or not isinstance(row_id, int):
+        raise ValueError("Некоректний курсор сторінки")
+    return created_at, row_id
+
+def make_page(rows, limit, key='created_at'):
+    """Сторінка з limit + 1 прочитаних рядків (зайвий рядок означає, що є наступна)"""
+    items = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit and items:
+        next_cursor = encode_cursor(items[-1][key], items[-1]['id'])
+    return {'items': items, 'next_cursor': next_cursor}
@@ -0,0 +1,187 @@
+"""Генератор розкладу сеансів з перевіркою накладок у залах
+
+Розклад будується на days днів від start_date: кожен зал заповнюється від
+відкриття до закриття фільмами по черзі (спільна черга для всіх залів, тож
+фільми рівномірно розходяться по залах), старт округлюється до step хвилин,
+між сеансами - прибирання cleaning_gap хвилин. Закриття раніше за відкриття
+(наприклад, 10:00-01:00) означає роботу після півночі; сеанс належить даті
+свого початку.
+
+Зайнятість кожного залу - відсортований індекс непересічних інтервалів
+(HallTimeline): перевірка й додавання сеансу - бінарний пошук, а не
+порівняння з усіма сеансами залу. Індекс заповнюється наявними сеансами
+залу з бази, тож новий розклад не накладається на вже створені сеанси.
+Планування й вставка виконуються в одній транзакції BEGIN IMMEDIATE.
+"""
+import bisect
+import datetime
+
+import cache
+from config import Config
+from database import begin_immediate, ensure_database, get_db_connection
+
+MINUTES_PER_DAY = 24 * 60
+
+class HallTimeline:
+    """Зайнятість залу: відсортовані непересічні інтервали [початок, кінець) у хвилинах"""
+    __slots__ = ('starts', 'ends')
+
+    def __init__(self):
+        self.starts = []
+        self.ends = []
+
+    def conflict(self, start, end):
+        """Кінець інтервалу, що перетинається з [start, end), або None, якщо зал вільний"""
+        index = bisect.bisect_right(self.ends, start)
+        if index < len(self.starts) and self.starts[index] < end:
+            return self.ends[index]
+        return None
+
+    def add(self, start, end):
+        """Додати інтервал; інтервали, що з ним перетинаються, зливаються в один"""
+        first = bisect.bisect_right(self.ends, start)
+        last = bisect.bisect_left(self.starts, end, first)
+        if first < last:
+            start = min(start, self.starts[first])
+            end = max(end, self.ends[last - 1])
+        self.starts[first:last] = [start]
+        self.ends[first:last] = [end]
+
+    def __len__(self):
+        return len(self.starts)
+
+def parse_minutes(value):
+    """'HH:MM' або 'HH:MM:SS' -> хвилини від півночі; ValueError для некоректного часу"""
+    try:
+        parsed = datetime.datetime.strptime(value, '%H:%M:%S' if value.count(':') == 2 else '%H:%M')
+    except (ValueError, AttributeError) as e:
+        raise ValueError(f"Некоректний час: {value!r} (очікується HH:MM)") from e
+    return parsed.hour * 60 + parsed.minute
+
+def plan_sessions(films, halls, start_date, days=7, opening='10:00', closing='23:30', cleaning_gap=20,
+                  step=5, prices=None, timelines=None):
+    """Розклад сеансів: список (film_id, hall_id, session_date, session_time, price)
+
+    films - [(id, тривалість у хвилинах)], halls - [(id, hall_type)],
+    prices - ціна за типом залу. timelines - {hall_id: HallTimeline} з
+    наявною зайнятістю (хвилини від start_date 00:00); доповнюється
+    запланованими сеансами.
+    """
+    if not films:
+        raise ValueError("Немає фільмів для розкладу")
+    if step < 1 or cleaning_gap < 0:
+        raise ValueError("Крок розкладу має бути додатним, а прибирання - невід'ємним")
+    prices = prices or Config.SCHEDULE_PRICES
+    timelines = {} if timelines is None else timelines
+    open_at = parse_minutes(opening)
+    close_at = parse_minutes(closing)
+    if close_at <= open_at:
+        close_at += MINUTES_PER_DAY
+
+    rows = []
+    queue_position = 0
+    for day in range(days):
+        session_date = (start_date + datetime.timedelta(days=day)).isoformat()
+        day_start = day * MINUTES_PER_DAY
+        for hall_id, hall_type in halls:
+            timeline = timelines.setdefault(hall_id, HallTimeline())
+            price = prices.get(hall_type, Config.SCHEDULE_PRICES['2D'])
+            moment = day_start + open_at
+            close = day_start + close_at
+            while True:
+                start = -(-moment // step) * step
+                # Наступний фільм черги, що встигає закінчитися до закриття
+                for attempt in range(len(films)):
+                    film_id, duration = films[(queue_position + attempt) % len(films)]
+                    if start + duration <= close:
+                        break
+                else:
+                    break
+                end = start + duration + cleaning_gap
+                busy_until = timeline.conflict(start, end)
+                if busy_until is not None:
+                    moment = busy_until
+                    continue
+                timeline.add(start, end)
+                queue_position = (queue_position + attempt + 1) % len(films)
+                offset = start - day_start
+                rows.append((film_id, hall_id, session_date,
+                             f'{offset // 60 % 24:02d}:{offset % 60:02d}:00', price))
+                moment = end
+    return rows
+
+def _load_timelines(cursor, hall_ids, start_date, days, cleaning_gap):
+    """Зайнятість залів наявними сеансами (з прибиранням після кожного)
+
+    Береться і день перед start_date: його нічні сеанси можуть тривати
+    після півночі.
+    """
+    date_from = (start_date - datetime.timedelta(days=1)).isoformat()
+    date_to = (start_date + datetime.timedelta(days=days)).isoformat()
+    timelines = {}
+    for hall_id in hall_ids:
+        timeline = timelines[hall_id] = HallTimeline()
+        cursor.execute("""
+            SELECT s.session_date, s.session_time, f.duration
+            FROM sessions s
+            JOIN films f ON f.id = s.film_id
+            WHERE s.hall_id = ? AND s.session_date BETWEEN ? AND ?
+        """, (hall_id, date_from, date_to))
+        for session_date, session_time, duration in cursor.fetchall():
+            days_from_start = (datetime.date.fromisoformat(session_date) - start_date).days
+            start = days_from_start * MINUTES_PER_DAY + parse_minutes(session_time)
+            timeline.add(start, start + duration + cleaning_gap)
+    return timelines
+
+def schedule_sessions(start_date, days=7, film_ids=None, hall_ids=None, opening=None, closing=None,
+                      cleaning_gap=None, step=None, prices=None, dry_run=False):
+    """Спланувати й створити сеанси однією транзакцією
+
+    film_ids / hall_ids - None для всіх фільмів / залів. Решта параметрів
+    за замовчуванням - з Config.SCHEDULE_*. dry_run - лише спланувати, не
+    записуючи. Повертає {'sessions', 'date_from', 'date_to', 'rows'}.
+    """
+    opening = opening or Config.SCHEDULE_OPENING
+    closing = closing or Config.SCHEDULE_CLOSING
+    cleaning_gap = Config.SCHEDULE_CLEANING_GAP if cleaning_gap is None else cleaning_gap
+    step = step or Config.SCHEDULE_STEP
+    ensure_database()
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        # Блокування на запис до планування: паралельний запуск не побачить
+        # розклад без щойно створених сеансів
+        begin_immediate(conn)
+        films = cursor.execute("SELECT id, duration FROM films ORDER BY id").fetchall()
+        halls = cursor.execute("SELECT id, hall_type FROM halls ORDER BY id").fetchall()
+        if film_ids is not None:
+            film_ids = set(film_ids)
+            films = [film for film in films if film[0] in film_ids]
+        if hall_ids is not None:
+            hall_ids = set(hall_ids)
+            halls = [hall for hall in halls if hall[0] in hall_ids]
+        timelines = _load_timelines(cursor, [hall_id for hall_id, _ in halls], start_date, days, cleaning_gap)
+        rows = plan_sessions(films, halls, start_date, days, opening, closing, cleaning_gap, step, prices,
+                             timelines)
+        if dry_run:
+            conn.rollback()
+        else:
+            cursor.executemany("""
+                INSERT INTO sessions (film_id, hall_id, session_date, session_time, price)
+                VALUES (?, ?, ?, ?, ?)
+            """, rows)
+            conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    if rows and not dry_run:
+        cache.invalidate('catalog')
+    return {
+        'sessions': len(rows),
+        'date_from': start_date.isoformat(),
+        'date_to': (start_date + datetime.timedelta(days=days - 1)).isoformat(),
+        'rows': rows,
+    }
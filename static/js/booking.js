@@ -3,7 +3,12 @@ class BookingManager {
         this.selectedSeats = new Set();
         this.seatPrice = parseInt(document.getElementById('seat-price').dataset.price);
         this.sessionId = parseInt(document.getElementById('session-id').dataset.id);
+        // Версія схеми місць, стан якої зараз показано
+        this.seatMapVersion = parseInt(document.getElementById('session-id').dataset.version) || 0;
         this.maxSeats = 10; // Максимальна кількість місць
+        this.holdToken = null; // Токен утримання обраних місць на сервері
+        // Ключ ідемпотентності поточної спроби: повтор після збою мережі не створить друге бронювання
+        this.idempotencyKey = null;
         
         this.init();
     }
@@ -11,6 +16,58 @@ class BookingManager {
     init() {
         this.bindEvents();
         this.setupFormValidation();
+        this.subscribeToSeatChanges();
+    }
+    
+    subscribeToSeatChanges() {
+        if (!window.EventSource) {
+            return;
+        }
+        this.seatStream = new EventSource(`/api/sessions/${this.sessionId}/seats/stream`);
+        
+        // Після (пере)підключення підтягнути зміни, пропущені до відкриття потоку
+        this.seatStream.addEventListener('open', () => this.loadSeatMap());
+        this.seatStream.addEventListener('seats', (e) => {
+            const event = JSON.parse(e.data);
+            if (event.version <= this.seatMapVersion) {
+                return; // Вже застосовано
+            }
+            if (event.version > this.seatMapVersion + 1) {
+                // Пропущені версії (зміни з іншого процесу) - дочитати різницю
+                this.loadSeatMap();
+                return;
+            }
+            event.changes.forEach(change => this.applySeatState(change.seat_id, change.state));
+            this.seatMapVersion = event.version;
+        });
+        this.seatStream.addEventListener('resync', () => this.loadSeatMap());
+    }
+    
+    applySeatState(seatId, state) {
+        const checkbox = document.getElementById(`seat-${seatId}`);
+        if (!checkbox) {
+            return;
+        }
+        const seatLabel = checkbox.nextElementSibling;
+        const isMine = this.selectedSeats.has(String(seatId));
+        
+        if (state === 'free') {
+            if (!isMine) {
+                checkbox.disabled = false;
+                seatLabel.classList.remove('btn-outline-secondary');
+                seatLabel.classList.add('btn-outline-primary');
+            }
+            return;
+        }
+        
+        // Власні утримання та бронювання приходять і нам - їх пропускаємо
+        if (isMine) {
+            return;
+        }
+        checkbox.checked = false;
+        checkbox.disabled = true;
+        seatLabel.classList.remove('btn-outline-primary', 'btn-warning');
+        seatLabel.classList.add('btn-outline-secondary');
     }
     
     bindEvents() {
@@ -24,6 +81,14 @@ class BookingManager {
         
         // Обробник підтвердження бронювання
         document.getElementById('confirm-booking').addEventListener('click', () => this.confirmBooking());
+        
+        // Звільнити утримані місця, якщо користувач пішов зі сторінки
+        window.addEventListener('pagehide', () => {
+            this.releaseAllSeats();
+            if (this.seatStream) {
+                this.seatStream.close();
+            }
+        });
     }
     
     setupFormValidation() {
@@ -43,7 +108,7 @@ class BookingManager {
         });
     }
     
-    handleSeatSelection(event) {
+    async handleSeatSelection(event) {
         const checkbox = event.target;
         const seatId = checkbox.dataset.seatId;
         const seatLabel = checkbox.nextElementSibling;
@@ -58,16 +123,80 @@ class BookingManager {
             this.selectedSeats.add(seatId);
             seatLabel.classList.remove('btn-outline-primary');
             seatLabel.classList.add('btn-warning');
+            
+            // Утримати місце, поки користувач заповнює форму
+            const held = await this.holdSeat(seatId);
+            if (!held) {
+                this.selectedSeats.delete(seatId);
+                checkbox.checked = false;
+                checkbox.disabled = true;
+                seatLabel.classList.remove('btn-warning');
+                seatLabel.classList.add('btn-outline-secondary');
+            }
         } else {
             this.selectedSeats.delete(seatId);
             seatLabel.classList.remove('btn-warning');
             seatLabel.classList.add('btn-outline-primary');
+            this.releaseSeats([seatId]);
         }
         
         this.updateBookingSummary();
         this.hideMaxSeatsWarning();
     }
     
+    async holdSeat(seatId) {
+        try {
+            const response = await fetch(`/api/sessions/${this.sessionId}/hold`, {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                },
+                body: JSON.stringify({
+                    seat_ids: [parseInt(seatId)],
+                    hold_token: this.holdToken
+                })
+            });
+            const result = await response.json();
+            
+            if (result.success) {
+                this.holdToken = result.hold_token;
+                return true;
+            }
+            this.showErrorMessage(result.message);
+            return false;
+        } catch (error) {
+            // Без утримання бронювання все одно перевіряється на сервері
+            console.error('Помилка утримання місця:', error);
+            return true;
+        }
+    }
+    
+    releaseSeats(seatIds) {
+        if (!this.holdToken) {
+            return;
+        }
+        fetch(`/api/sessions/${this.sessionId}/release`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({
+                seat_ids: seatIds.map(id => parseInt(id)),
+                hold_token: this.holdToken
+            })
+        }).catch(error => console.error('Помилка звільнення місця:', error));
+    }
+    
+    releaseAllSeats() {
+        if (!this.holdToken || this.selectedSeats.size === 0) {
+            return;
+        }
+        navigator.sendBeacon(
+            `/api/sessions/${this.sessionId}/release`,
+            JSON.stringify({ hold_token: this.holdToken })
+        );
+    }
+    
     showMaxSeatsWarning() {
         const warning = document.getElementById('max-seats-warning');
         warning.classList.remove('d-none');
@@ -158,25 +287,29 @@ class BookingManager {
             session_id: this.sessionId,
             customer_email: document.getElementById('customer_email').value,
             customer_name: document.getElementById('customer_name').value,
-            selected_seats: Array.from(this.selectedSeats).map(id => parseInt(id))
+            selected_seats: Array.from(this.selectedSeats).map(id => parseInt(id)),
+            hold_token: this.holdToken
         };
         
+        const body = JSON.stringify(formData);
+        if (!this.idempotencyKey || this.idempotencyKeyBody !== body) {
+            this.idempotencyKey = newIdempotencyKey();
+            this.idempotencyKeyBody = body;
+        }
+        
         try {
-            const response = await fetch('/api/book', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                },
-                body: JSON.stringify(formData)
-            });
-            
+            const response = await this.postBooking(body);
             const result = await response.json();
+            // Сервер відповів - наступна спроба буде новим запитом
+            this.idempotencyKey = null;
             
             // Закрити модальне вікно
             const modal = bootstrap.Modal.getInstance(document.getElementById('confirmationModal'));
             modal.hide();
             
             if (result.success) {
+                // Місця вже заброньовані, утримання знято сервером
+                this.selectedSeats.clear();
                 this.showSuccessMessage(result.booking_code, formData.customer_email);
             } else {
                 this.showErrorMessage(result.message);
@@ -191,6 +324,23 @@ class BookingManager {
         }
     }
     
+    async postBooking(body) {
+        const request = () => fetch('/api/book', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'Idempotency-Key': this.idempotencyKey
+            },
+            body: body
+        });
+        try {
+            return await request();
+        } catch (error) {
+            // Відповідь могла загубитися після створення бронювання - повтор з тим самим ключем безпечний
+            return await request();
+        }
+    }
+    
     showSuccessMessage(bookingCode, email) {
         const message = `✅ Бронювання успішне!\n\nВаш код: ${bookingCode}\nДеталі надіслано на: ${email}\n\nНатисніть OK для переходу до деталей бронювання.`;
         
@@ -209,29 +359,70 @@ class BookingManager {
         const loader = document.getElementById('loading-spinner');
         const container = document.getElementById('seats-container');
         
-        loader.style.display = 'block';
+        if (loader) {
+            loader.style.display = 'block';
+        }
         container.style.opacity = '0.5';
         
         try {
-            const response = await fetch(`/api/sessions/${this.sessionId}/seats`);
-            const seats = await response.json();
-            this.renderSeatMap(seats);
+            // Лише зміни після показаної версії; повна схема приходить бітовим рядком
+            const params = new URLSearchParams({ since: this.seatMapVersion, format: 'bitmap' });
+            if (this.holdToken) {
+                params.set('hold_token', this.holdToken);
+            }
+            const response = await fetch(`/api/sessions/${this.sessionId}/seats?${params}`);
+            const seatMap = await response.json();
+            if (seatMap.version < this.seatMapVersion) {
+                return; // Поки йшов запит, новіші зміни вже прийшли потоком
+            }
+            if (seatMap.full) {
+                this.applySeatBitmap(seatMap.available, seatMap.count);
+            } else {
+                this.renderSeatMap(seatMap.seats);
+            }
+            this.seatMapVersion = seatMap.version;
         } catch (error) {
             console.error('Помилка завантаження схеми місць:', error);
             this.showErrorMessage('Не вдалося завантажити схему місць');
         } finally {
-            loader.style.display = 'none';
+            if (loader) {
+                loader.style.display = 'none';
+            }
             container.style.opacity = '1';
         }
     }
     
+    applySeatBitmap(encoded, count) {
+        // Місця на сторінці йдуть у тому ж порядку (ряд, місце), що й біти
+        const checkboxes = document.querySelectorAll('.seat-checkbox');
+        if (checkboxes.length !== count) {
+            window.location.reload(); // Схема залу змінилась
+            return;
+        }
+        const bytes = atob(encoded);
+        checkboxes.forEach((checkbox, index) => {
+            const available = (bytes.charCodeAt(index >> 3) >> (7 - (index & 7))) & 1;
+            this.applySeatState(checkbox.dataset.seatId, available ? 'free' : 'booked');
+        });
+    }
+    
     renderSeatMap(seats) {
-        // Цей метод може бути використаний для динамічного оновлення схеми місць
-        console.log('Оновлення схеми місць:', seats);
+        // Оновлюємо лише стан існуючих місць, без перемальовування сітки
+        seats.forEach(seat => {
+            const state = seat.is_available ? 'free' : (seat.is_held ? 'held' : 'booked');
+            this.applySeatState(seat.id, state);
+        });
+    }
+}
+
+function newIdempotencyKey() {
+    if (window.crypto && crypto.randomUUID) {
+        return crypto.randomUUID();
     }
+    return Date.now().toString(36) + '-' + Math.random().toString(36).slice(2);
 }
 
 // Ініціалізація при завантаженні сторінки
 document.addEventListener('DOMContentLoaded', function() {
     window.bookingManager = new BookingManager();
-});
\ No newline at end of file
+});
@@ -0,0 +1,319 @@
+"""Синтетичні дані заданого розміру для бенчмарків і навантажувальних тестів
+
+generate() додає до вже створеної схеми фільми, зали з N місцями, сеанси
+(по слотах без накладок у кожному залі), бронювання з місцями, користувачів
+і сповіщення. Попит нерівномірний, як у житті: популярність фільмів спадає
+за Ципфом, вечірні сеанси й вихідні продаються краще, тож частина сеансів
+розпродана, а частина майже порожня.
+
+Завантаження розраховане на мільйони рядків: явні id (booked_seats не
+потребують зворотних SELECT), executemany пачками по BATCH_SIZE з commit
+після кожної, synchronous = OFF і великий кеш на час завантаження, а
+вторинні індекси великих таблиць знімаються і будуються заново в кінці.
+Однакові seed і start_date на однаковій базі дають однакові дані (крім солі
+спільного хешу пароля).
+"""
+import bisect
+import contextlib
+import datetime
+import itertools
+import random
+
+from werkzeug.security import generate_password_hash
+
+import cache
+from booking_codes import format_booking_code
+from database import begin_immediate, apply_connection_pragmas
+
+GENRES = ('Драма', 'Комедія', 'Фантастика', 'Екшн', 'Мультфільм', 'Трилер', 'Жахи', 'Пригоди')
+HALL_TYPES = ('2D', '3D', 'IMAX', 'VIP')
+# Слот показу і його відносний попит
+SESSION_TIMES = (('10:00:00', 0.4), ('12:30:00', 0.6), ('15:00:00', 0.8),
+                 ('17:30:00', 1.2), ('20:00:00', 1.5), ('22:30:00', 0.9))
+WEEKEND_DEMAND = 1.6
+SEATS_PER_ROW = 20
+NOTIFICATION_TYPES = ('booking', 'system', 'promo')
+SYNTHETIC_PASSWORD = 'synthetic123'
+BATCH_SIZE = 50000
+# Таблиці, вторинні індекси яких будуються після завантаження, а не під час
+BULK_TABLES = ('bookings', 'booked_seats', 'notifications')
+
+def _next_id(cursor, table):
+    cursor.execute(f"SELECT COALESCE(MAX(id), 0) + 1 FROM {table}")
+    return cursor.fetchone()[0]
+
+def _bulk_insert(conn, sql, rows):
+    """executemany пачками по BATCH_SIZE, кожна пачка - окрема транзакція"""
+    rows = iter(rows)
+    count = 0
+    while True:
+        batch = list(itertools.islice(rows, BATCH_SIZE))
+        if not batch:
+            return count
+        begin_immediate(conn)
+        conn.executemany(sql, batch)
+        conn.commit()
+        count += len(batch)
+
+@contextlib.contextmanager
+def loading_mode(conn, tables=BULK_TABLES):
+    """Налаштування з'єднання для масового завантаження
+
+    Вторинні індекси tables знімаються і після завантаження створюються
+    заново з того ж SQL - одне сортування замість мільйонів вставок у
+    випадкові місця B-дерева. Унікальні індекси при цьому перевіряють
+    згенеровані дані. PRAGMA з'єднання потім повертаються до Config.
+    """
+    placeholders = ', '.join('?' for _ in tables)
+    indexes = conn.execute(f"""
+        SELECT name, sql FROM sqlite_master
+        WHERE type = 'index' AND sql IS NOT NULL AND tbl_name IN ({placeholders})
+    """, tables).fetchall()
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute("PRAGMA cache_size = -262144")  # 256 МБ
+    conn.execute("PRAGMA temp_store = MEMORY")
+    begin_immediate(conn)
+    for name, _ in indexes:
+        conn.execute(f"DROP INDEX IF EXISTS {name}")
+    conn.commit()
+    try:
+        yield
+    finally:
+        try:
+            # Незавершена пачка після помилки - відкотити, інакше індекси
+            # не відновити (begin_immediate не вкладає транзакції)
+            if conn.in_transaction:
+                conn.rollback()
+            begin_immediate(conn)
+            for _, sql in indexes:
+                conn.execute(sql)
+            conn.commit()
+            conn.execute("PRAGMA optimize")
+        finally:
+            apply_connection_pragmas(conn)
+
+def _insert_films(conn, rnd, count, created_at):
+    first = _next_id(conn.cursor(), 'films')
+    _bulk_insert(conn, "INSERT INTO films (id, title, description, duration, genre, created_at) "
+                       "VALUES (?, ?, ?, ?, ?, ?)",
+                 ((first + n, f'Синтетичний фільм {first + n}', 'Згенеровано для бенчмарків',
+                   rnd.randint(80, 180), rnd.choice(GENRES), created_at) for n in range(count)))
+    return list(range(first, first + count))
+
+def _insert_halls(conn, rnd, count, seats_per_hall):
+    """Зали по seats_per_hall місць рядами по SEATS_PER_ROW; {hall_id: перший seat_id}"""
+    cursor = conn.cursor()
+    first_hall = _next_id(cursor, 'halls')
+    hall_ids = list(range(first_hall, first_hall + count))
+    _bulk_insert(conn, "INSERT INTO halls (id, name, seats_count, hall_type) VALUES (?, ?, ?, ?)",
+                 ((hall_id, f'Синтетичний зал {hall_id}', seats_per_hall, rnd.choice(HALL_TYPES))
+                  for hall_id in hall_ids))
+    first_seat = _next_id(cursor, 'seats')
+    seats = {hall_id: first_seat + n * seats_per_hall for n, hall_id in enumerate(hall_ids)}
+
+    def rows():
+        for hall_id, seat_id in seats.items():
+            for index in range(seats_per_hall):
+                row_number, seat_number = divmod(index, SEATS_PER_ROW)
+                yield seat_id + index, hall_id, row_number + 1, seat_number + 1
+
+    _bulk_insert(conn, "INSERT INTO seats (id, hall_id, row_number, seat_number) VALUES (?, ?, ?, ?)", rows())
+    return seats
+
+def _insert_sessions(conn, rnd, count, film_ids, hall_ids, start_date, days):
+    """count сеансів рівномірно на days днів по вільних слотах залів
+
+    Повертає [(session_id, hall_id, session_date, попит)]; попит - відносна
+    вага сеансу для бронювань (популярність фільму, час, вихідні).
+    """
+    slots = [(time, demand, hall_id) for time, demand in SESSION_TIMES for hall_id in hall_ids]
+    per_day = len(slots) if not days else min(len(slots), -(-count // days))
+    # Популярність фільму за Ципфом: k-й за популярністю має вагу 1/k
+    ranking = film_ids[:]
+    rnd.shuffle(ranking)
+    popularity = {film_id: 1 / (rank + 1) for rank, film_id in enumerate(ranking)}
+
+    first = _next_id(conn.cursor(), 'sessions')
+    rows = []
+    sessions = []
+    day = 0
+    while len(rows) < count:
+        date = start_date + datetime.timedelta(days=day)
+        weekend = WEEKEND_DEMAND if date.weekday() >= 5 else 1
+        for time, demand, hall_id in sorted(rnd.sample(slots, per_day)):
+            if len(rows) == count:
+                break
+            session_id = first + len(rows)
+            film_id = rnd.choice(film_ids)
+            rows.append((session_id, film_id, hall_id, date.isoformat(), time,
+                         float(rnd.choice((120, 140, 160, 180, 220)))))
+            sessions.append((session_id, hall_id, date.isoformat(), popularity[film_id] * demand * weekend))
+        day += 1
+    _bulk_insert(conn, "INSERT INTO sessions (id, film_id, hall_id, session_date, session_time, price) "
+                       "VALUES (?, ?, ?, ?, ?, ?)", rows)
+    return sessions
+
+def _insert_users(conn, count, password, created_at):
+    """count користувачів customer{id}@example.com з одним паролем; діапазон їхніх id"""
+    first = _next_id(conn.cursor(), 'users')
+    # Хеш рахується один раз: PBKDF2 на кожного з мільйона забрав би години.
+    # Його сіль випадкова - єдине, що відрізняє прогони з однаковим seed.
+    password_hash = generate_password_hash(password)
+    _bulk_insert(conn, "INSERT INTO users (id, email, username, password_hash, full_name, created_at) "
+                       "VALUES (?, ?, ?, ?, ?, ?)",
+                 ((user_id, f'customer{user_id}@example.com', f'customer{user_id}', password_hash,
+                   f'Покупець {user_id}', created_at) for user_id in range(first, first + count)))
+    return range(first, first + count)
+
+def _booking_rows(rnd, count, sessions, seats, seats_per_hall, customers, cancelled_share, state):
+    """Бронювання по 1-4 місця в сеансах, обраних пропорційно попиту
+
+    Зайняті місця сеансу - bytearray на seats_per_hall байтів; розпродані
+    сеанси пропускаються. Рядки booked_seats накопичуються в state і
+    вставляються після пачки бронювань, на які посилаються.
+    """
+    if not sessions:
+        raise ValueError("Немає сеансів для бронювань: задайте sessions > 0 або bookings = 0")
+    cum_weights = list(itertools.accumulate(weight for _, _, _, weight in sessions))
+    total = cum_weights[-1]
+    taken = {}
+    free = {}
+    attempts = 0
+    made = 0
+    while made < count and attempts < count * 10:
+        attempts += 1
+        index = bisect.bisect_right(cum_weights, rnd.random() * total)
+        session_id, hall_id, session_date, _ = sessions[min(index, len(sessions) - 1)]
+        occupied = taken.get(session_id)
+        if occupied is None:
+            occupied = taken[session_id] = bytearray(seats_per_hall)
+            free[session_id] = seats_per_hall
+        if not free[session_id]:
+            continue
+        wanted = min(rnd.randint(1, 4), free[session_id])
+        if free[session_id] * 4 > seats_per_hall:
+            chosen = set()
+            while len(chosen) < wanted:
+                position = rnd.randrange(seats_per_hall)
+                if not occupied[position]:
+                    chosen.add(position)
+            chosen = sorted(chosen)
+        else:
+            # Майже повний зал: вибір серед вільних, а не вгадування
+            chosen = rnd.sample([n for n in range(seats_per_hall) if not occupied[n]], wanted)
+
+        booking_id = state['booking_id']
+        state['booking_id'] += 1
+        state['code'] += 1
+        customer = customers[rnd.randrange(len(customers))]
+        is_active = rnd.random() >= cancelled_share
+        created_at = datetime.datetime.fromisoformat(session_date) - datetime.timedelta(
+            seconds=rnd.randint(60, 30 * 24 * 3600))
+        if is_active:
+            for position in chosen:
+                occupied[position] = 1
+            free[session_id] -= wanted
+        for position in chosen:
+            state['seats'].append((state['booked_seat_id'], booking_id, seats[hall_id] + position,
+                                   session_id, int(is_active)))
+            state['booked_seat_id'] += 1
+        made += 1
+        yield (booking_id, session_id, f'customer{customer}@example.com', f'Покупець {customer}',
+               format_booking_code(state['code']), 'active' if is_active else 'cancelled',
+               created_at.strftime('%Y-%m-%d %H:%M:%S'))
+
+def _insert_bookings(conn, rnd, count, sessions, seats, seats_per_hall, customers, cancelled_share=0.1):
+    cursor = conn.cursor()
+    state = {
+        'booking_id': _next_id(cursor, 'bookings'),
+        'booked_seat_id': _next_id(cursor, 'booked_seats'),
+        'code': cursor.execute(
+            "SELECT COALESCE(MAX(value), 0) FROM sequences WHERE name = 'booking_code'").fetchone()[0],
+        'seats': [],
+    }
+    rows = _booking_rows(rnd, count, sessions, seats, seats_per_hall, customers, cancelled_share, state)
+    bookings = booked_seats = 0
+    while True:
+        batch = list(itertools.islice(rows, BATCH_SIZE))
+        if not batch:
+            break
+        begin_immediate(conn)
+        conn.executemany(
+            "INSERT INTO bookings (id, session_id, customer_email, customer_name, booking_code, status, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)", batch
+        )
+        conn.executemany(
+            "INSERT INTO booked_seats (id, booking_id, seat_id, session_id, is_active) VALUES (?, ?, ?, ?, ?)",
+            state['seats']
+        )
+        # Наступні справжні бронювання продовжать лічильник кодів
+        conn.execute("""
+            INSERT INTO sequences (name, value) VALUES ('booking_code', ?)
+            ON CONFLICT (name) DO UPDATE SET value = MAX(value, excluded.value)
+        """, (state['code'],))
+        conn.commit()
+        bookings += len(batch)
+        booked_seats += len(state['seats'])
+        state['seats'] = []
+    return bookings, booked_seats
+
+def _insert_notifications(conn, rnd, count, user_ids, start_date, days, read_share=0.7):
+    """count особистих сповіщень випадковим користувачам; лічильники непрочитаних ведуть тригери"""
+    first = _next_id(conn.cursor(), 'notifications')
+    span = max(1, days) * 24 * 3600
+    start = datetime.datetime.combine(start_date, datetime.time())
+    titles = {'booking': 'Бронювання підтверджено', 'system': 'Оновлення сервісу', 'promo': 'Знижка на сеанси'}
+
+    def rows():
+        for notification_id in range(first, first + count):
+            notification_type = rnd.choice(NOTIFICATION_TYPES)
+            created_at = start + datetime.timedelta(seconds=rnd.randrange(span))
+            yield (notification_id, user_ids[rnd.randrange(len(user_ids))], notification_type,
+                   titles[notification_type], 'Згенеровано для навантажувального тесту',
+                   int(rnd.random() < read_share), created_at.strftime('%Y-%m-%d %H:%M:%S'))
+
+    return _bulk_insert(conn, "INSERT INTO notifications (id, user_id, type, title, message, is_read, created_at) "
+                              "VALUES (?, ?, ?, ?, ?, ?, ?)", rows())
+
+def generate(conn, films=50, halls=20, seats_per_hall=150, sessions=2000, bookings=100000,
+             users=0, notifications=0, days=None, seed=42, start_date=None, password=SYNTHETIC_PASSWORD):
+    """Додати синтетичні дані в базу conn; повертає кількості доданих записів
+
+    days - на скільки днів розподілити сеанси (None - щільно, всі слоти
+    підряд). Якщо users > 0, бронювання й сповіщення належать створеним
+    користувачам (пароль password), інакше - випадковим email без акаунтів.
+    Кеші каталогу і схем залів після завантаження інвалідуються.
+    """
+    rnd = random.Random(seed)
+    start_date = start_date or datetime.date.today()
+    created_at = f'{start_date.isoformat()} 00:00:00'
+    with loading_mode(conn):
+        film_ids = _insert_films(conn, rnd, films, created_at)
+        seats = _insert_halls(conn, rnd, halls, seats_per_hall)
+        session_rows = _insert_sessions(conn, rnd, sessions, film_ids, list(seats), start_date, days)
+        user_ids = _insert_users(conn, users, password, created_at) if users else range(1, max(2, bookings // 5))
+        booking_count = seat_count = 0
+        if bookings:
+            booking_count, seat_count = _insert_bookings(conn, rnd, bookings, session_rows, seats, seats_per_hall,
+                                                         user_ids)
+        notification_count = 0
+        if notifications:
+            if not users:
+                user_ids = [row[0] for row in conn.execute("SELECT id FROM users ORDER BY id")]
+            if session_rows:
+                span = (datetime.date.fromisoformat(session_rows[-1][2]) - start_date).days + 1
+            else:
+                span = days or 1
+            notification_count = _insert_notifications(conn, rnd, notifications, user_ids, start_date, span)
+    cache.invalidate('catalog')
+    cache.invalidate('hall_layout')
+    return {
+        'films': films,
+        'halls': halls,
+        'seats': halls * seats_per_hall,
+        'sessions': len(session_rows),
+        'bookings': booking_count,
+        'booked_seats': seat_count,
+        'users': users,
+        'notifications': notification_count,
+    }
@@ -0,0 +1,29 @@
+"""Спільні фікстури: кожен тест отримує власну свіжу базу в tmp_path
+
+Фонові потоки застосунку в тестах не запускаються.
+"""
+import os
+
+os.environ.setdefault('START_BACKGROUND_WORKERS', '0')
+
+import pytest
+
+import cache
+import database
+from config import Config
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """Нова база через init_database() (схема, міграції, тестові дані); повертає шлях"""
+    monkeypatch.setattr(Config, 'DATABASE_PATH', str(tmp_path / 'cinema.db'))
+    database.close_pool()
+    cache.set_backend(cache.DictCache())
+    database.init_database()
+    yield Config.DATABASE_PATH
+    database.close_pool()
+
+@pytest.fixture
+def app(db):
+    from app import app as flask_app
+    flask_app.config['TESTING'] = True
+    return flask_app
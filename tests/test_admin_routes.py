@@ -0,0 +1,29 @@
+"""Службова статистика - лише адміністраторам; перевірка живості - усім"""
+import pytest
+
+STATS_ROUTES = ('/api/health/db', '/api/cache/stats', '/api/waiting-room/stats')
+
+def login(client, email, password):
+    client.post('/login', data={'email': email, 'password': password})
+    return client
+
+@pytest.mark.parametrize('path', STATS_ROUTES)
+def test_stats_hidden_from_anonymous(app, path):
+    response = app.test_client().get(path)
+    assert response.status_code == 302
+    assert '/login' in response.headers['Location']
+
+@pytest.mark.parametrize('path', STATS_ROUTES)
+def test_stats_forbidden_for_regular_user(app, path):
+    client = login(app.test_client(), 'anna.petrova@gmail.com', 'anna123')
+    assert client.get(path).status_code == 403
+
+@pytest.mark.parametrize('path', STATS_ROUTES)
+def test_stats_available_to_admin(app, path):
+    client = login(app.test_client(), 'admin@cinema.com', 'admin123')
+    assert client.get(path).status_code == 200
+
+def test_liveness_probe_is_public_and_minimal(app):
+    response = app.test_client().get('/api/health')
+    assert response.status_code == 200
+    assert response.get_json() == {'status': 'ok'}
@@ -0,0 +1,71 @@
+"""Зведення продажів: завершені бронювання - продані, скасовані віднімаються"""
+import analytics
+import database
+
+def total_revenue():
+    return sum(item['revenue'] for item in analytics.get_revenue('hall'))
+
+def direct_revenue():
+    """Виручка напряму з бронювань (усі, крім скасованих)"""
+    conn = database.get_db_connection()
+    try:
+        return conn.execute("""
+            SELECT COALESCE(SUM(s.price), 0)
+            FROM bookings b
+            JOIN sessions s ON s.id = b.session_id
+            JOIN booked_seats bs ON bs.booking_id = b.id
+            WHERE b.status != 'cancelled'
+        """).fetchone()[0]
+    finally:
+        conn.close()
+
+def set_status(booking_code, status):
+    conn = database.get_db_connection()
+    try:
+        conn.execute("UPDATE bookings SET status = ? WHERE booking_code = ?", (status, booking_code))
+        conn.commit()
+    finally:
+        conn.close()
+
+def book(seat_count=2):
+    session_id = 1
+    seats = [seat['id'] for seat in database.get_available_seats(session_id) if seat['is_available']][:seat_count]
+    return database.create_booking(session_id, 'analytics@cinema.com', 'Аналітика', seats)
+
+def test_rollup_matches_bookings(db):
+    analytics.run_rollup()
+    assert total_revenue() == direct_revenue()
+
+def test_completing_booking_keeps_revenue(db):
+    code = book()
+    analytics.run_rollup()
+    before = total_revenue()
+
+    set_status(code, 'completed')
+    result = analytics.run_rollup()
+
+    assert result['cancellations'] == 0
+    assert total_revenue() == before == direct_revenue()
+
+def test_completed_booking_after_high_water_mark_is_counted(db):
+    analytics.run_rollup()
+    before = total_revenue()
+    code = book()
+    set_status(code, 'completed')
+
+    analytics.run_rollup()
+
+    assert total_revenue() > before
+    assert total_revenue() == direct_revenue()
+
+def test_cancellation_is_subtracted(db):
+    code = book()
+    analytics.run_rollup()
+    before = total_revenue()
+
+    assert database.cancel_booking(code)
+    result = analytics.run_rollup()
+
+    assert result['cancellations'] == 1
+    assert total_revenue() < before
+    assert total_revenue() == direct_revenue()
@@ -0,0 +1,132 @@
+"""Гонки за одні й ті самі місця: жодне місце не продається і не утримується двічі
+
+Потоки стартують одночасно (Barrier) і викликають функції database.py
+напряму, кожен зі своїм з'єднанням з пулу, як паралельні запити.
+"""
+import sqlite3
+import threading
+
+import pytest
+
+import database
+
+pytestmark = pytest.mark.slow
+
+THREADS = 16
+
+def race(action, threads=THREADS):
+    """Виконати action(index) у threads потоках одночасно; повертає (успіхи, помилки)"""
+    barrier = threading.Barrier(threads)
+    successes = []
+    failures = []
+    lock = threading.Lock()
+
+    def worker(index):
+        barrier.wait()
+        try:
+            result = action(index)
+        except Exception as e:
+            with lock:
+                failures.append(str(e))
+        else:
+            with lock:
+                successes.append(result)
+
+    workers = [threading.Thread(target=worker, args=(index,)) for index in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return successes, failures
+
+def free_seats(session_id, count):
+    seats = [seat['id'] for seat in database.get_available_seats(session_id) if seat['is_available']]
+    assert len(seats) >= count
+    return seats[:count]
+
+def active_rows_per_seat(session_id, seat_ids):
+    conn = database.get_db_connection()
+    try:
+        placeholders = ', '.join('?' * len(seat_ids))
+        rows = conn.execute(f"""
+            SELECT seat_id, COUNT(*) FROM booked_seats
+            WHERE session_id = ? AND is_active = 1 AND seat_id IN ({placeholders})
+            GROUP BY seat_id
+        """, (session_id, *seat_ids)).fetchall()
+        return {seat_id: count for seat_id, count in rows}
+    finally:
+        conn.close()
+
+@pytest.fixture
+def session_id(db):
+    conn = database.get_db_connection()
+    try:
+        return conn.execute("SELECT id FROM sessions ORDER BY id LIMIT 1").fetchone()[0]
+    finally:
+        conn.close()
+
+def test_concurrent_bookings_sell_each_seat_once(session_id):
+    seats = free_seats(session_id, 3)
+    successes, failures = race(lambda index: database.create_booking(
+        session_id, f'race{index}@cinema.com', 'Гонка', seats))
+
+    assert len(successes) == 1
+    assert len(failures) == THREADS - 1
+    assert all('вже зайняте' in message for message in failures)
+    assert active_rows_per_seat(session_id, seats) == {seat_id: 1 for seat_id in seats}
+
+def test_concurrent_holds_hold_each_seat_once(session_id):
+    seats = free_seats(session_id, 3)
+    successes, failures = race(lambda index: database.hold_seats(session_id, seats, f'token-{index}'))
+
+    assert len(successes) == 1
+    assert len(failures) == THREADS - 1
+    assert all('утримується іншим покупцем' in message for message in failures)
+    winner = successes[0]['hold_token']
+    conn = database.get_db_connection()
+    try:
+        holds = conn.execute("SELECT seat_id, hold_token FROM seat_holds WHERE session_id = ?",
+                             (session_id,)).fetchall()
+    finally:
+        conn.close()
+    assert sorted((row['seat_id'], row['hold_token']) for row in holds) == [(seat_id, winner) for seat_id in seats]
+
+    # Утримані місця може забронювати лише власник утримання
+    with pytest.raises(Exception, match='утримується іншим покупцем'):
+        database.create_booking(session_id, 'other@cinema.com', 'Інший', seats, hold_token='token-other')
+    assert database.create_booking(session_id, 'owner@cinema.com', 'Власник', seats, hold_token=winner)
+    assert active_rows_per_seat(session_id, seats) == {seat_id: 1 for seat_id in seats}
+
+def test_cancel_then_rebook_race(session_id):
+    seats = free_seats(session_id, 2)
+    code = database.create_booking(session_id, 'first@cinema.com', 'Перший', seats)
+    for _ in range(3):
+        assert database.cancel_booking(code)
+        successes, failures = race(lambda index: database.create_booking(
+            session_id, f'rebook{index}@cinema.com', 'Повторно', seats))
+        assert len(successes) == 1
+        assert len(failures) == THREADS - 1
+        assert all('вже зайняте' in message for message in failures)
+        # Скасовані рядки лишаються (is_active = 0), активний - лише один на місце
+        assert active_rows_per_seat(session_id, seats) == {seat_id: 1 for seat_id in seats}
+        code = successes[0]
+
+def test_partial_unique_index_rejects_second_active_row(session_id):
+    """Навіть в обхід перевірок create_booking база не прийме другий активний рядок місця"""
+    seat_id, other_seat = free_seats(session_id, 2)
+    first = database.get_booking_by_code(
+        database.create_booking(session_id, 'index@cinema.com', 'Індекс', [seat_id]))['id']
+    second = database.get_booking_by_code(
+        database.create_booking(session_id, 'index@cinema.com', 'Індекс', [other_seat]))['id']
+    insert = "INSERT INTO booked_seats (booking_id, seat_id, session_id) VALUES (?, ?, ?)"
+    conn = database.get_db_connection()
+    try:
+        with pytest.raises(sqlite3.IntegrityError, match='booked_seats.session_id'):
+            conn.execute(insert, (second, seat_id, session_id))
+        conn.rollback()
+        # Неактивний (скасований) рядок місце не блокує
+        conn.execute("UPDATE booked_seats SET is_active = 0 WHERE booking_id = ?", (first,))
+        conn.execute(insert, (second, seat_id, session_id))
+        conn.rollback()
+    finally:
+        conn.close()
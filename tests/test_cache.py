@@ -0,0 +1,56 @@
+"""Версії просторів імен кешу: спільні через базу, в пам'яті - обмежені"""
+import pytest
+
+import cache
+import database
+
+@pytest.fixture
+def local_versions(monkeypatch):
+    store = cache.LocalVersions(max_namespaces=2)
+    monkeypatch.setattr(cache, '_version_store', store)
+    cache.set_backend(cache.DictCache())
+    return store
+
+def test_local_namespaces_are_bounded(local_versions):
+    for session_id in range(100):
+        cache.invalidate(f'seat_map:{session_id}')
+    assert local_versions.stats()['namespaces'] == 2
+
+def test_evicted_namespace_does_not_serve_stale_entries(local_versions):
+    calls = []
+
+    @cache.cached('seat_map:1')
+    def load():
+        calls.append(1)
+        return [len(calls)]
+
+    assert load() == [1]
+    cache.invalidate('seat_map:1')
+    assert load() == [2]
+    # Витіснення seat_map:1 іншими сеансами
+    cache.get_version('seat_map:2')
+    cache.get_version('seat_map:3')
+    # Старі записи версій 0 і 1 лишились у сховищі, але недосяжні
+    assert load() == [3]
+    assert cache.get_version('seat_map:1') > 1
+
+def test_recently_used_namespace_survives(local_versions):
+    cache.invalidate('catalog')
+    cache.get_version('seat_map:1')
+    cache.get_version('catalog')
+    cache.get_version('seat_map:2')
+    assert cache.get_version('catalog') == 1
+
+def test_versions_are_shared_through_database(db):
+    assert isinstance(cache._version_store, database.DatabaseVersions)
+    before = cache.get_version('catalog')
+    # Інший процес (CLI, воркер) бачить ту саму таблицю cache_versions
+    database.DatabaseVersions().bump('catalog')
+    assert cache.get_version('catalog') == before + 1
+
+def test_booking_changes_seat_map_version(db):
+    namespace = database.seat_map_namespace(1)
+    before = cache.get_version(namespace)
+    seats = [seat['id'] for seat in database.get_available_seats(1) if seat['is_available']][:1]
+    database.create_booking(1, 'versions@cinema.com', 'Версії', seats)
+    assert cache.get_version(namespace) == before + 1
@@ -0,0 +1,45 @@
+"""Вивантаження бронювань: комірки CSV не виконуються як формули"""
+import csv
+import io
+import json
+
+import pytest
+
+import database
+import exports
+from config import Config
+
+HOSTILE_NAME = '=HYPERLINK("http://evil.example","Натисніть")'
+
+@pytest.fixture
+def hostile_booking(db):
+    seats = [seat['id'] for seat in database.get_available_seats(1) if seat['is_available']][:1]
+    return database.create_booking(1, '+380@cinema.com', HOSTILE_NAME, seats)
+
+def export_rows(fmt):
+    return ''.join(exports.export_bookings(fmt, path=Config.DATABASE_PATH))
+
+@pytest.mark.parametrize('value, expected', [
+    ('=1+1', "'=1+1"),
+    ('+380501234567', "'+380501234567"),
+    ('-2', "'-2"),
+    ('@SUM(A1)', "'@SUM(A1)"),
+    ('\tx', "'\tx"),
+    ('\rx', "'\rx"),
+    ('Анна', 'Анна'),
+    (-120.0, -120.0),
+    (None, None),
+])
+def test_csv_safe(value, expected):
+    assert exports.csv_safe(value) == expected
+
+def test_csv_escapes_formulas(hostile_booking):
+    rows = list(csv.DictReader(io.StringIO(export_rows('csv'))))
+    row = next(row for row in rows if row['booking_code'] == hostile_booking)
+    assert row['customer_name'] == "'" + HOSTILE_NAME
+    assert row['customer_email'] == "'+380@cinema.com"
+
+def test_ndjson_keeps_raw_values(hostile_booking):
+    rows = [json.loads(line) for line in export_rows('ndjson').splitlines()]
+    row = next(row for row in rows if row['booking_code'] == hostile_booking)
+    assert row['customer_name'] == HOSTILE_NAME
@@ -0,0 +1,48 @@
+"""Idempotency-Key: повтор виконаного бронювання не проходить через чергу сеансу"""
+import pytest
+
+import database
+import waiting_room
+
+@pytest.fixture
+def full_room(app):
+    """Черга на один слот, який уже зайняв інший покупець"""
+    previous = waiting_room.get_backend()
+    room = waiting_room.MemoryWaitingRoom(concurrency=1, queue_size=10, pass_ttl=60, queue_ttl=30, retry_after=3)
+    waiting_room.set_backend(room)
+    yield room
+    waiting_room.set_backend(previous)
+
+def booking_payload(session_id=1, seat_count=2):
+    seats = [seat['id'] for seat in database.get_available_seats(session_id) if seat['is_available']][:seat_count]
+    return {
+        'session_id': session_id,
+        'customer_email': 'retry@cinema.com',
+        'customer_name': 'Повтор',
+        'selected_seats': seats,
+    }
+
+def test_replay_skips_waiting_room(app, full_room):
+    client = app.test_client()
+    payload = booking_payload()
+    headers = {'Idempotency-Key': 'booking-1'}
+
+    first = client.post('/api/book', json=payload, headers=headers)
+    assert first.status_code == 200
+    # Після бронювання слот зайняв інший покупець - нових запитів черга не пропускає
+    assert full_room.admit(payload['session_id'], 'other-buyer').admitted
+    assert client.post('/api/book', json=booking_payload(), headers={'Idempotency-Key': 'booking-2'}).status_code == 429
+
+    retry = client.post('/api/book', json=payload, headers=headers)
+    assert retry.status_code == 200
+    assert retry.headers['Idempotent-Replayed'] == 'true'
+    assert retry.get_json()['booking_code'] == first.get_json()['booking_code']
+
+def test_reused_key_with_other_data_is_rejected(app):
+    client = app.test_client()
+    payload = booking_payload()
+    headers = {'Idempotency-Key': 'booking-3'}
+    assert client.post('/api/book', json=payload, headers=headers).status_code == 200
+
+    other = dict(payload, customer_name='Інше імʼя')
+    assert client.post('/api/book', json=other, headers=headers).status_code == 422
@@ -0,0 +1,30 @@
+"""Схема свіжої бази після init_database()"""
+import database
+
+def query_plan(conn, sql, params=()):
+    return [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+
+def test_schema_is_current(db):
+    conn = database.get_db_connection()
+    try:
+        assert database.get_schema_version(conn) == database.SCHEMA_VERSION
+    finally:
+        conn.close()
+
+def test_broadcast_delete_uses_index(db):
+    conn = database.get_db_connection()
+    try:
+        plan = query_plan(conn, "DELETE FROM broadcast_reads WHERE broadcast_id = ?", (1,))
+    finally:
+        conn.close()
+    assert any('idx_broadcast_reads_broadcast' in step for step in plan), plan
+
+def index_definition(conn, name):
+    return conn.execute("SELECT sql FROM sqlite_master WHERE type = 'index' AND name = ?", (name,)).fetchone()[0]
+
+def test_notifications_index_is_ascending(db):
+    conn = database.get_db_connection()
+    try:
+        assert 'DESC' not in index_definition(conn, 'idx_notifications_user_read_created').upper()
+    finally:
+        conn.close()
@@ -0,0 +1,30 @@
+"""Кеш сторінок і ETag/304: зміна даних з іншого процесу одразу дає нову сторінку"""
+import sqlite3
+
+import database
+
+def change_title_elsewhere(path, film_id, title):
+    """Як CLI-команда чи інший воркер: власне з'єднання і власна копія версій"""
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute("UPDATE films SET title = ? WHERE id = ?", (title, film_id))
+        database.DatabaseVersions().bump('catalog', conn)
+        conn.commit()
+    finally:
+        conn.close()
+
+def test_repeat_request_is_not_modified(app):
+    client = app.test_client()
+    first = client.get('/api/films')
+    assert first.status_code == 200
+    again = client.get('/api/films', headers={'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 304
+
+def test_change_from_another_process_invalidates_page(app, db):
+    client = app.test_client()
+    first = client.get('/api/films')
+    change_title_elsewhere(db, 1, 'Дюна: нова назва')
+    again = client.get('/api/films', headers={'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 200
+    assert again.headers['ETag'] != first.headers['ETag']
+    assert 'Дюна: нова назва' in [film['title'] for film in again.get_json()]
@@ -0,0 +1,49 @@
+"""EXPLAIN QUERY PLAN гарячих запитів: жодного повного сканування таблиці"""
+import pytest
+
+import database
+
+def traced_plans(conn, call):
+    """Виконати call() і повернути {sql: [рядки плану]} для виконаних SELECT"""
+    statements = []
+    conn.set_trace_callback(statements.append)
+    try:
+        call()
+    finally:
+        conn.set_trace_callback(None)
+    return {
+        sql: [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql)]
+        for sql in dict.fromkeys(statements)
+        if sql.lstrip().upper().startswith('SELECT')
+    }
+
+def sample_ids(conn):
+    return conn.execute("""
+        SELECT s.id AS session_id, s.film_id, b.booking_code
+        FROM bookings b JOIN sessions s ON s.id = b.session_id
+        ORDER BY b.id LIMIT 1
+    """).fetchone()
+
+HOT_QUERIES = {
+    'seat_map': lambda ids: database.get_seat_map(ids['session_id']),
+    'seat_map_since': lambda ids: database.get_seat_map(ids['session_id'], since=0),
+    'booking_by_code': lambda ids: database.get_booking_by_code(ids['booking_code']),
+    'session_list': lambda ids: database.get_unique_sessions_for_film.uncached(ids['film_id']),
+    'session': lambda ids: database.get_session_by_id(ids['session_id']),
+}
+
+@pytest.mark.parametrize('name', sorted(HOT_QUERIES))
+def test_hot_query_has_no_table_scan(app, name):
+    with app.app_context():
+        conn = database.get_db_connection()
+        ids = sample_ids(conn)
+        assert ids is not None, "тестові дані без бронювань"
+        plans = traced_plans(conn, lambda: HOT_QUERIES[name](ids))
+    assert plans, f"{name}: не виконано жодного SELECT"
+    scans = {sql: plan for sql, plan in plans.items() if any(database._is_full_scan(step) for step in plan)}
+    assert scans == {}
+
+def test_check_query_plans_finds_no_scans(app):
+    """Та сама перевірка, що й flask check-query-plans, по всіх гарячих функціях"""
+    with app.app_context():
+        assert database.check_query_plans() == []
@@ -0,0 +1,27 @@
+"""Спільне з'єднання запиту: невдалий запис не лишає відкритої транзакції"""
+import pytest
+
+import database
+
+def assert_connection_usable():
+    conn = database.get_db_connection()
+    assert conn.request_bound
+    assert not conn.in_transaction
+    database.begin_immediate(conn)
+    conn.rollback()
+
+def test_failed_create_user_rolls_back(app):
+    with app.app_context():
+        database.create_user('twice@cinema.com', 'twice', 'hash')
+        with pytest.raises(Exception, match='email'):
+            database.create_user('twice@cinema.com', 'twice-again', 'hash')
+        assert_connection_usable()
+
+def test_failed_notification_rolls_back(app):
+    with app.app_context():
+        with pytest.raises(Exception):
+            database.add_notification(1, 'system', None, 'Без заголовка')
+        assert_connection_usable()
+        with pytest.raises(Exception):
+            database.broadcast_notification('system', None, 'Без заголовка')
+        assert_connection_usable()
@@ -0,0 +1,22 @@
+"""Ліміт місць однаковий для утримання і бронювання (Config.MAX_SEATS_PER_BOOKING)"""
+import database
+from config import Config
+
+def free_seats(session_id, count):
+    return [seat['id'] for seat in database.get_available_seats(session_id) if seat['is_available']][:count]
+
+def test_hold_and_booking_share_limit(app, monkeypatch):
+    monkeypatch.setattr(Config, 'MAX_SEATS_PER_BOOKING', 2)
+    client = app.test_client()
+    seats = free_seats(1, 3)
+
+    hold = client.post('/api/sessions/1/hold', json={'seat_ids': seats})
+    assert hold.status_code == 400
+    assert 'Максимум 2' in hold.get_json()['message']
+
+    booking = client.post('/api/book', json={'session_id': 1, 'customer_email': 'limit@cinema.com',
+                                             'customer_name': 'Ліміт', 'selected_seats': seats})
+    assert booking.status_code == 400
+    assert 'Максимум 2' in booking.get_json()['message']
+
+    assert client.post('/api/sessions/1/hold', json={'seat_ids': seats[:2]}).status_code == 200
@@ -0,0 +1,26 @@
+"""get_seat_map на спільному з'єднанні запиту не чіпає транзакцію викликача"""
+import database
+
+def test_seat_map_keeps_callers_transaction(app):
+    with app.app_context():
+        conn = database.get_db_connection()
+        database.set_meta(conn, 'pending_write', 'yes')
+        assert conn.in_transaction
+
+        seat_map = database.get_seat_map(1)
+
+        assert seat_map['seats']
+        assert conn.in_transaction
+        assert database.get_db_connection() is conn
+        assert database.get_meta(conn, 'pending_write') == 'yes'
+        conn.rollback()
+        assert database.get_meta(conn, 'pending_write') is None
+
+def test_seat_map_outside_transaction_leaves_none_open(app):
+    with app.app_context():
+        conn = database.get_db_connection()
+        full = database.get_seat_map(1)
+        changes = database.get_seat_map(1, since=full['version'])
+        assert not conn.in_transaction
+    assert full['full'] and full['seats']
+    assert changes == {'version': full['version'], 'full': False, 'seats': []}
@@ -0,0 +1,46 @@
+"""Масове завантаження synthetic_data: індекси й PRAGMA відновлюються навіть після помилки"""
+import pytest
+
+import database
+import synthetic_data
+
+def index_sql(conn):
+    return sorted(tuple(row) for row in conn.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL"))
+
+def test_bookings_without_sessions_raise_clear_error(db):
+    conn = database.get_db_connection()
+    try:
+        before = index_sql(conn)
+        with pytest.raises(ValueError, match='Немає сеансів'):
+            synthetic_data.generate(conn, films=1, halls=1, seats_per_hall=10, sessions=0, bookings=10)
+        assert index_sql(conn) == before
+    finally:
+        conn.close()
+
+def test_loading_mode_restores_indexes_after_failed_batch(db):
+    conn = database.get_db_connection()
+    try:
+        before = index_sql(conn)
+        films = conn.execute("SELECT COUNT(*) FROM films").fetchone()[0]
+        with pytest.raises(RuntimeError, match='пачка'):
+            with synthetic_data.loading_mode(conn):
+                database.begin_immediate(conn)
+                conn.execute("INSERT INTO films (title, duration) VALUES ('Незавершена', 90)")
+                raise RuntimeError('пачка не завершена')
+        assert not conn.in_transaction
+        assert index_sql(conn) == before
+        assert conn.execute("SELECT COUNT(*) FROM films").fetchone()[0] == films
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] != 0
+    finally:
+        conn.close()
+
+def test_generate_without_sessions(db):
+    conn = database.get_db_connection()
+    try:
+        counts = synthetic_data.generate(conn, films=2, halls=1, seats_per_hall=10, sessions=0, bookings=0,
+                                         users=2, notifications=5)
+    finally:
+        conn.close()
+    assert counts['sessions'] == 0
+    assert counts['notifications'] == 5
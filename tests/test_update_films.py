@@ -0,0 +1,33 @@
+"""update_films_data: нова афіша без залишків старих сеансів і бронювань"""
+import analytics
+import database
+
+def count(conn, table):
+    return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+def test_update_films_clears_dependent_tables(db):
+    seats = [seat['id'] for seat in database.get_available_seats(1) if seat['is_available']]
+    database.create_booking(1, 'films@cinema.com', 'Афіша', seats[:2], idempotency_key='update-films',
+                            fingerprint='update-films')
+    database.hold_seats(1, seats[2:4])
+    analytics.run_rollup()
+
+    database.update_films_data()
+
+    conn = database.get_db_connection()
+    try:
+        for table in ('bookings', 'booked_seats', 'seat_holds', 'seat_map_changes', 'seat_map_versions',
+                      'idempotency_keys', 'sales_daily', 'sales_hourly', 'seat_sales', 'rollup_cancellations'):
+            assert count(conn, table) == 0, table
+        assert database.get_meta(conn, analytics.HIGH_WATER_MARK) is None
+        assert count(conn, 'films') == 10
+        sessions = count(conn, 'sessions')
+        assert sessions == 17
+        occupancy = conn.execute("""
+            SELECT COUNT(*), SUM(sold), SUM(held), SUM(o.capacity = (SELECT COUNT(*) FROM seats WHERE hall_id = s.hall_id))
+            FROM session_occupancy o JOIN sessions s ON s.id = o.session_id
+        """).fetchone()
+        assert tuple(occupancy) == (sessions, 0, 0, sessions)
+    finally:
+        conn.close()
+    assert [film['title'] for film in database.search_films('Оппенгеймер')['items']] == ['Оппенгеймер']
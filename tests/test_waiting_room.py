@@ -0,0 +1,35 @@
+"""Черга на сеанс у пам'яті: кімнати сеансів без перепусток і черги видаляються"""
+import waiting_room
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+def make_room(clock):
+    return waiting_room.MemoryWaitingRoom(concurrency=1, queue_size=10, pass_ttl=60, queue_ttl=30,
+                                          retry_after=3, clock=clock)
+
+def test_expired_rooms_are_removed_without_release():
+    clock = Clock()
+    room = make_room(clock)
+    for session_id in range(100):
+        assert room.admit(session_id, 'buyer').status == waiting_room.ADMITTED
+    assert room.stats()['sessions'] == 100
+    clock.now += 61
+    assert room.stats()['sessions'] == 0
+    room.admit(1000, 'buyer')
+    assert room.stats()['sessions'] == 1
+
+def test_active_rooms_are_kept():
+    clock = Clock()
+    room = make_room(clock)
+    room.admit(1, 'first')
+    assert room.admit(1, 'second').status == waiting_room.QUEUED
+    clock.now += 20
+    room.admit(2, 'other')
+    stats = room.stats()
+    assert stats['sessions'] == 2
+    assert stats['waiting'] == 1
@@ -0,0 +1,210 @@
+"""Віртуальна черга (waiting room) для сеансів з великим попитом
+
+Кожен сеанс одночасно обслуговує не більше Config.WAITING_ROOM_CONCURRENCY
+покупців. Покупець, що потрапив усередину, отримує перепустку, яка
+продовжується з кожним його запитом і спливає через WAITING_ROOM_PASS_TTL
+секунд бездіяльності (або звільняється після бронювання). Решта стають у
+FIFO-чергу і опитують свою позицію; хто перестав опитувати довше за
+WAITING_ROOM_QUEUE_TTL, випадає з черги. Коли черга заповнена, нові
+покупці одразу отримують відмову.
+
+Усе рішення приймається в пам'яті процесу, без звернень до БД, тому
+відповідь 429 коштує мікросекунди навіть під перевантаженням.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from config import Config
+
+ADMITTED = 'admitted'
+QUEUED = 'queued'
+REJECTED = 'rejected'
+
+class Admission:
+    """Результат спроби пройти в сеанс"""
+
+    __slots__ = ('status', 'position', 'retry_after')
+
+    def __init__(self, status, position=0, retry_after=0):
+        self.status = status
+        self.position = position
+        self.retry_after = retry_after
+
+    @property
+    def admitted(self):
+        return self.status == ADMITTED
+
+    def to_dict(self):
+        return {'status': self.status, 'position': self.position, 'retry_after': self.retry_after}
+
+class WaitingRoomBackend:
+    """Інтерфейс сховища черги"""
+
+    def admit(self, session_id, ticket):
+        """Пропустити або поставити в чергу покупця ticket; повертає Admission"""
+        raise NotImplementedError
+
+    def release(self, session_id, ticket):
+        """Звільнити місце покупця (після бронювання)"""
+        raise NotImplementedError
+
+    def stats(self):
+        return {}
+
+class OpenWaitingRoom(WaitingRoomBackend):
+    """Без обмежень: пропускає всіх (черга вимкнена)"""
+
+    def admit(self, session_id, ticket):
+        return Admission(ADMITTED)
+
+    def release(self, session_id, ticket):
+        pass
+
+    def stats(self):
+        return {'backend': 'off'}
+
+class _Room:
+    __slots__ = ('passes', 'queue', 'next_number', 'purged_at')
+
+    def __init__(self):
+        self.passes = {}            # ticket -> коли спливає перепустка
+        self.queue = OrderedDict()  # ticket -> [номер у черзі, коли спливає]
+        self.next_number = 0
+        self.purged_at = 0.0
+
+class MemoryWaitingRoom(WaitingRoomBackend):
+    """Черга в пам'яті процесу з окремим лічильником місць для кожного сеансу
+
+    clock можна підмінити в тестах, щоб керувати часом.
+    """
+
+    def __init__(self, concurrency, queue_size, pass_ttl, queue_ttl, retry_after, clock=time.monotonic):
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.pass_ttl = pass_ttl
+        self.queue_ttl = queue_ttl
+        self.retry_after = retry_after
+        self.clock = clock
+        self._rooms = {}
+        self._lock = threading.Lock()
+        self._swept_at = 0.0
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = 0
+
+    def _purge(self, room, now):
+        # Повний прохід не частіше разу на секунду; між ними черга лише росте
+        if now - room.purged_at < 1:
+            return
+        room.purged_at = now
+        for ticket in [t for t, expires_at in room.passes.items() if expires_at <= now]:
+            del room.passes[ticket]
+        for ticket in [t for t, (_, expires_at) in room.queue.items() if expires_at <= now]:
+            del room.queue[ticket]
+
+    def _sweep(self, now):
+        # Сеанси, де перепустки спливли без release(), інакше лишались би назавжди
+        if now - self._swept_at < 1:
+            return
+        self._swept_at = now
+        for session_id, room in list(self._rooms.items()):
+            self._purge(room, now)
+            if not room.passes and not room.queue:
+                del self._rooms[session_id]
+
+    def _position(self, room, number):
+        # Верхня оцінка: номер мінус номер голови черги (вибулі посередині не віднімаються)
+        head_number = next(iter(room.queue.values()))[0]
+        return number - head_number + 1
+
+    def admit(self, session_id, ticket):
+        now = self.clock()
+        with self._lock:
+            self._sweep(now)
+            room = self._rooms.get(session_id)
+            if room is None:
+                room = self._rooms[session_id] = _Room()
+            self._purge(room, now)
+
+            if ticket in room.passes:
+                room.passes[ticket] = now + self.pass_ttl
+                return Admission(ADMITTED)
+
+            free = self.concurrency - len(room.passes)
+            entry = room.queue.get(ticket)
+            if entry is None:
+                if not room.queue and free > 0:
+                    room.passes[ticket] = now + self.pass_ttl
+                    self.admitted += 1
+                    return Admission(ADMITTED)
+                if len(room.queue) >= self.queue_size:
+                    self.rejected += 1
+                    return Admission(REJECTED, retry_after=self.retry_after * 10)
+                entry = room.queue[ticket] = [room.next_number, 0]
+                room.next_number += 1
+                self.queued += 1
+
+            position = self._position(room, entry[0])
+            if position <= free:
+                del room.queue[ticket]
+                room.passes[ticket] = now + self.pass_ttl
+                self.admitted += 1
+                return Admission(ADMITTED)
+            entry[1] = now + self.queue_ttl
+            return Admission(QUEUED, position=position, retry_after=self.retry_after)
+
+    def release(self, session_id, ticket):
+        with self._lock:
+            room = self._rooms.get(session_id)
+            if room is None:
+                return
+            room.passes.pop(ticket, None)
+            if not room.passes and not room.queue:
+                del self._rooms[session_id]
+
+    def stats(self):
+        with self._lock:
+            self._sweep(self.clock())
+            return {
+                'backend': 'memory',
+                'concurrency': self.concurrency,
+                'sessions': len(self._rooms),
+                'active': sum(len(room.passes) for room in self._rooms.values()),
+                'waiting': sum(len(room.queue) for room in self._rooms.values()),
+                'admitted': self.admitted,
+                'queued': self.queued,
+                'rejected': self.rejected,
+            }
+
+def create_backend(name=None):
+    """Створити сховище черги за назвою з Config.WAITING_ROOM_BACKEND"""
+    name = (name or Config.WAITING_ROOM_BACKEND).lower()
+    if name == 'memory' and Config.WAITING_ROOM_CONCURRENCY > 0:
+        return MemoryWaitingRoom(
+            concurrency=Config.WAITING_ROOM_CONCURRENCY,
+            queue_size=Config.WAITING_ROOM_QUEUE_SIZE,
+            pass_ttl=Config.WAITING_ROOM_PASS_TTL,
+            queue_ttl=Config.WAITING_ROOM_QUEUE_TTL,
+            retry_after=Config.WAITING_ROOM_RETRY_AFTER,
+        )
+    if name in ('memory', 'off'):
+        return OpenWaitingRoom()
+    raise ValueError(f"Невідомий тип черги: {name}")
+
+_backend = None
+_lock = threading.Lock()
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        with _lock:
+            if _backend is None:
+                _backend = create_backend()
+    return _backend
+
+def set_backend(backend):
+    """Підмінити сховище (наприклад, MemoryWaitingRoom з іншим clock у тестах)"""
+    global _backend
+    with _lock:
+        _backend = backend